@@ -1,84 +1,500 @@
 import os
+import json
+import time
 import logging
-from flask import Flask, render_template, request, jsonify, send_file
+import click
+from flask import Flask, Blueprint, Response, current_app, g, has_app_context, render_template, request, jsonify, send_file, url_for, stream_with_context
 from io import BytesIO
-from utils.youtube import get_video_transcript, get_video_info
-from utils.summarizer import generate_summary
-from models import VideoHistory
+from utils.youtube import (
+    extract_video_id, parse_languages, language_key, list_transcripts, select_track, available_tracks,
+    transcript_lists, transcript_segments
+)
+from utils.summarizer import backend_stats
+from utils.http_client import latency_stats
+from utils.ratelimit import limiters, RateLimitExceeded
+from utils.breaker import breakers, CircuitOpen
+from utils.metrics import registry
+from utils.tracing import trace, span
+from utils.transcript_export import EXPORT_MIMETYPES, export_chunks, gzip_chunks
+from models import VideoHistory, VideoTranscript, ProcessingJob, IngestRun
+from pipeline import result_cache, result_key, inflight, run_job, job_status, stream_video
+from jobs import JobQueue, QueueFullError
+from batch import run_batch, parse_concurrency, BATCH_MAX_URLS
+from ingest import run_ingest, run_status, parse_source
+import search as search_index
+from qa import answer_question, TranscriptNotStored, QA_TOP_K, QA_MAX_QUESTION_CHARS
+from migrations import upgrade_schema, check_schema
+from history import recent_history, history_page, history_item, InvalidCursor
 from db import db
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# create the app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET")
+# Every route and command is registered on this blueprint, which
+# create_app() attaches to each app it builds
+bp = Blueprint('main', __name__, cli_group=None)
 
-# configure the database
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
+def configure_logging():
+    """Set up root logging for the entry points (main.py, asgi.py, batch.py)."""
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 
-# initialize the app with the extension
-db.init_app(app)
+def is_memory_database(uri):
+    return uri is not None and uri.split('?', 1)[0] in ('sqlite://', 'sqlite:///:memory:')
 
-with app.app_context():
-    db.create_all()
+def create_app():
+    """Build the Flask app.
 
-@app.route('/')
+    Start-up does no network or database I/O: provider clients are built on
+    first use and the schema is created by `flask --app main init-db`.
+    """
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SESSION_SECRET")
+
+    # configure the database
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    }
+
+    # initialize the app with the extension
+    db.init_app(app)
+    app.register_blueprint(bp)
+
+    # An in-memory database lives only in this process, so nothing else can create its tables
+    if is_memory_database(app.config["SQLALCHEMY_DATABASE_URI"]):
+        with app.app_context():
+            db.create_all()
+
+    # Local worker pool that runs the processing pipeline outside the request
+    app.extensions['job_queue'] = JobQueue(
+        app,
+        run_job,
+        max_workers=int(os.environ.get("JOB_WORKERS", 4)),
+        max_pending=int(os.environ.get("JOB_MAX_PENDING", 100))
+    )
+    return app
+
+request_seconds = registry.histogram(
+    'ytt_http_request_duration_seconds',
+    'Time to produce a response (headers only for streamed responses).',
+    ['endpoint', 'method']
+)
+request_count = registry.counter(
+    'ytt_http_requests_total',
+    'HTTP requests served.',
+    ['endpoint', 'method', 'status']
+)
+
+@bp.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@bp.after_app_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_seconds.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+        request_count.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+@registry.collector
+def collect_app_stats():
+    """Expose the cache, upstream HTTP, summarizer and queue stats at scrape time."""
+    cache = result_cache.stats()
+    yield 'ytt_cache_lookups_total', 'counter', 'Result cache lookups by outcome.', [
+        ({'result': 'memory_hit'}, cache['memory_hits']),
+        ({'result': 'backing_hit'}, cache['backing_hits']),
+        ({'result': 'miss'}, cache['misses'])
+    ]
+    yield 'ytt_cache_hit_ratio', 'gauge', 'Share of result cache lookups served from memory or history.', [({}, cache['hit_ratio'])]
+    yield 'ytt_cache_entries', 'gauge', 'Entries in the in-process result cache.', [({}, cache['size'])]
+
+    upstream = latency_stats.snapshot()
+    for name, key in (('requests', 'requests'), ('errors', 'errors'), ('retries', 'retries')):
+        yield f'ytt_upstream_{name}_total', 'counter', f'Outbound API {name} by endpoint.', [
+            ({'endpoint': endpoint}, stats[key]) for endpoint, stats in upstream.items()
+        ]
+
+    yield 'ytt_summary_requests_total', 'counter', 'Summaries produced by backend.', [
+        ({'backend': backend}, count) for backend, count in backend_stats['requests'].items()
+    ]
+    yield 'ytt_summary_fallbacks_total', 'counter', 'Summaries served by a fallback backend.', [({}, backend_stats['fallbacks'])]
+    yield 'ytt_inflight_requests_total', 'counter', 'Processing requests that led or joined a shared run.', [
+        ({'role': role}, count) for role, count in inflight.stats.items()
+    ]
+    limits = {provider: limiter.stats() for provider, limiter in limiters.items()}
+    yield 'ytt_ratelimit_remaining', 'gauge', 'Units left in each client-side rate limit budget.', [
+        ({'provider': provider, 'budget': budget}, values['remaining'])
+        for provider, stats in limits.items() for budget, values in stats['budgets'].items()
+    ]
+    yield 'ytt_ratelimit_wait_seconds_total', 'counter', 'Time calls spent queued for rate limit budget.', [
+        ({'provider': provider}, stats['wait_seconds']) for provider, stats in limits.items()
+    ]
+    circuits = {name: breaker.stats() for name, breaker in breakers.items()}
+    yield 'ytt_circuit_state', 'gauge', 'Circuit breaker state per dependency (1 for the current state).', [
+        ({'dependency': name, 'state': state}, int(stats['state'] == state))
+        for name, stats in circuits.items() for state in ('closed', 'open', 'half_open')
+    ]
+    yield 'ytt_circuit_rejected_total', 'counter', 'Calls failed fast by an open circuit breaker.', [
+        ({'dependency': name}, stats['rejected']) for name, stats in circuits.items()
+    ]
+    # The queue of the app serving /metrics, which need not be the module-level app
+    if has_app_context():
+        yield 'ytt_job_queue_pending', 'gauge', 'Jobs queued or running in this process.', [
+            ({}, current_app.extensions['job_queue'].pending())
+        ]
+
+@bp.route('/metrics')
+def metrics():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/')
 def index():
     # Get the last 5 processed videos
-    history = VideoHistory.query.order_by(VideoHistory.created_at.desc()).limit(5).all()
+    history = recent_history(5)
     return render_template('index.html', history=history)
 
-@app.route('/process', methods=['POST'])
+@bp.route('/process', methods=['POST'])
 def process_video():
+    with trace('process'):
+        try:
+            youtube_url = request.form.get('youtube_url')
+            summary_length = request.form.get('summary_length', 'medium')
+
+            if not youtube_url:
+                return jsonify({'error': 'Please provide a YouTube URL'}), 400
+
+            try:
+                with span('parse_url'):
+                    video_id = extract_video_id(youtube_url)
+            except (ValueError, KeyError, IndexError):
+                return jsonify({'error': 'Invalid YouTube URL format'}), 400
+
+            try:
+                languages = language_key(request.form.get('languages'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+            # Serve repeat requests from the cache without calling YouTube or OpenAI
+            cache_key = result_key(video_id, summary_length, languages)
+            with span('cache_lookup'):
+                cached = result_cache.get(cache_key)
+            if cached is not None:
+                return jsonify({'success': True, 'status': 'completed', 'cached': True, 'video_id': video_id, **cached})
+
+            # Hand the pipeline to the worker pool and let the client poll for progress
+            try:
+                job = current_app.extensions['job_queue'].submit(youtube_url, video_id, summary_length, languages)
+            except QueueFullError as e:
+                return jsonify({'error': str(e)}), 503
+
+            return jsonify({
+                'success': True,
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': url_for('.get_job', job_id=job.id)
+            }), 202
+
+        except Exception as e:
+            logger.error(f"Error processing video: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+
+def sse_event(event, data):
+    """Format a Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@bp.route('/process/stream')
+def process_video_stream():
+    youtube_url = request.args.get('youtube_url')
+    summary_length = request.args.get('summary_length', 'medium')
+
+    if not youtube_url:
+        return jsonify({'error': 'Please provide a YouTube URL'}), 400
+
     try:
-        youtube_url = request.form.get('youtube_url')
-        summary_length = request.form.get('summary_length', 'medium')
+        video_id = extract_video_id(youtube_url)
+    except (ValueError, KeyError, IndexError):
+        return jsonify({'error': 'Invalid YouTube URL format'}), 400
 
-        if not youtube_url:
-            return jsonify({'error': 'Please provide a YouTube URL'}), 400
+    try:
+        languages = language_key(request.args.get('languages'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        # Get video information
-        video_info = get_video_info(youtube_url)
+    def generate():
+        with trace('stream', video_id=video_id):
+            try:
+                for event, data in stream_video(youtube_url, video_id, summary_length, languages):
+                    yield sse_event(event, data)
+            except Exception as e:
+                logger.error(f"Error streaming video: {str(e)}")
+                yield sse_event('failed', {'error': str(e)})
 
-        # Get video transcript
-        transcript = get_video_transcript(youtube_url)
-        if not transcript:
-            return jsonify({'error': 'Could not extract transcript from the video'}), 400
-
-        # Generate summary
-        summary = generate_summary(transcript, summary_length)
-
-        # Save to history
-        history = VideoHistory(
-            video_url=youtube_url,
-            video_title=video_info['title'],
-            video_duration=video_info['duration'],
-            video_thumbnail=video_info['thumbnail'],
-            transcript=transcript,
-            summary=summary,
-            summary_length=summary_length
-        )
-        db.session.add(history)
-        db.session.commit()
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route('/batch', methods=['POST'])
+def process_batch():
+    """Process many URLs, streaming one JSON status line per video."""
+    payload = request.get_json(silent=True) or {}
+    urls = payload.get('urls')
+    if urls is None:
+        urls = request.get_data(as_text=True).splitlines()
+    urls = [url for url in urls if url and url.strip()]
+    summary_length = payload.get('summary_length', request.args.get('summary_length', 'medium'))
+    concurrency = payload.get('concurrency', request.args.get('concurrency'))
+    languages = payload.get('languages', request.args.get('languages'))
+
+    if not urls:
+        return jsonify({'error': 'Please provide at least one YouTube URL'}), 400
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({'error': f'A batch may contain at most {BATCH_MAX_URLS} URLs'}), 400
+    try:
+        concurrency = parse_concurrency(concurrency)
+        languages = language_key(languages)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        try:
+            for status in run_batch(urls, summary_length, concurrency, languages=languages):
+                yield json.dumps(status) + '\n'
+        except Exception as e:
+            logger.error(f"Error processing batch: {str(e)}")
+            yield json.dumps({'error': str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@bp.route('/ingest', methods=['POST'])
+def ingest_source():
+    """Process the new and changed videos of a playlist or channel, streaming one JSON status line per step."""
+    payload = request.get_json(silent=True) or {}
+    source_url = payload.get('url', request.args.get('url'))
+    summary_length = payload.get('summary_length', request.args.get('summary_length', 'medium'))
+    concurrency = payload.get('concurrency', request.args.get('concurrency'))
+    restart = bool(payload.get('restart', request.args.get('restart', type=int)))
+
+    if not source_url:
+        return jsonify({'error': 'Please provide a playlist or channel URL'}), 400
+    try:
+        parse_source(source_url)
+        concurrency = parse_concurrency(concurrency)
+        languages = language_key(payload.get('languages', request.args.get('languages')))
+    except (ValueError, KeyError, IndexError) as e:
+        message = str(e) if isinstance(e, ValueError) else 'Invalid YouTube URL format'
+        return jsonify({'error': message}), 400
+
+    def generate():
+        try:
+            for status in run_ingest(source_url, summary_length, concurrency, languages, restart):
+                yield json.dumps(status) + '\n'
+        except Exception as e:
+            logger.error(f"Error ingesting {source_url}: {str(e)}")
+            yield json.dumps({'error': str(e)}) + '\n'
 
-        return jsonify({
-            'success': True,
-            'video_info': video_info,
-            'transcript': transcript,
-            'summary': summary
-        })
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
+@bp.route('/ingest/<int:run_id>')
+def get_ingest_run(run_id):
+    run = db.session.get(IngestRun, run_id)
+    if run is None:
+        return jsonify({'error': 'Ingestion run not found'}), 404
+    return jsonify(run_status(run))
+
+@bp.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = db.session.get(ProcessingJob, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_status(job))
+
+@bp.route('/history')
+def list_history():
+    """Newest-first processed videos, paginated with an opaque cursor."""
+    try:
+        return jsonify(history_page(
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int),
+            video_id=request.args.get('video_id')
+        ))
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+@bp.route('/history/<int:history_id>')
+def get_history(history_id):
+    history = db.session.get(VideoHistory, history_id)
+    if history is None:
+        return jsonify({'error': 'History entry not found'}), 404
+    item = history_item(history)
+    item['summary'] = history.summary_text
+    return jsonify(item)
+
+@bp.route('/search')
+def search():
+    """Ranked full-text search over processed titles, summaries and transcripts."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Please provide a search query'}), 400
+
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 10, type=int)
+    try:
+        return jsonify(search_index.search(query, page, per_page))
     except Exception as e:
-        logger.error(f"Error processing video: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+        logger.error(f"Error searching: {str(e)}")
+        return jsonify({'error': 'Search failed'}), 500
+
+@bp.cli.command('init-db')
+@click.option('--check', is_flag=True, help="Only report how the database differs from the models.")
+def init_db(check):
+    """Create missing tables and add the columns and indexes existing tables lack.
+
+    Exits with status 1 while the database still differs from the models.
+    """
+    if check:
+        unresolved = check_schema()
+    else:
+        applied, unresolved = upgrade_schema()
+        for change in applied:
+            print(change)
+    for difference in unresolved:
+        print(difference)
+    if unresolved:
+        action = "to apply" if check else "to resolve by hand"
+        raise click.ClickException(f"{len(unresolved)} schema differences {action}")
+    print("Database schema matches the models")
+
+@bp.cli.command('search-reindex')
+def search_reindex():
+    """Rebuild the full-text search index from history."""
+    print(f"Indexed {search_index.reindex()} videos")
+
+@bp.route('/cache/stats')
+def cache_stats():
+    stats = result_cache.stats()
+    stats['inflight'] = dict(inflight.stats)
+    stats['transcripts'] = {'tracks': transcript_lists.stats(), 'segments': transcript_segments.stats()}
+    return jsonify(stats)
+
+@bp.route('/http/stats')
+def http_stats():
+    return jsonify(latency_stats.snapshot())
+
+@bp.route('/ratelimit/stats')
+def ratelimit_stats():
+    return jsonify({provider: limiter.stats() for provider, limiter in limiters.items()})
+
+@bp.route('/breakers/stats')
+def breaker_stats():
+    return jsonify({name: breaker.stats() for name, breaker in breakers.items()})
+
+# Browsers and proxies may reuse a transcript export this long before revalidating
+TRANSCRIPT_EXPORT_MAX_AGE = int(os.environ.get("TRANSCRIPT_EXPORT_MAX_AGE", 3600))
+
+@bp.route('/videos/<video_id>/languages')
+def video_languages(video_id):
+    """List a video's caption tracks and the track a language preference resolves to."""
+    try:
+        languages = parse_languages(request.args.get('languages'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        tracks, translation_languages = available_tracks(video_id)
+        _, selected = select_track(list_transcripts(video_id), languages)
+    except RateLimitExceeded as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': str(max(1, round(e.retry_after)))}
+    except CircuitOpen as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(max(1, round(e.retry_after)))}
+    except Exception as e:
+        logger.error(f"Error listing transcripts: {str(e)}")
+        return jsonify({'error': 'No transcripts found for this video'}), 404
+
+    return jsonify({
+        'video_id': video_id,
+        'languages': list(languages),
+        'selected': selected,
+        'tracks': tracks,
+        'translation_languages': translation_languages
+    })
+
+@bp.route('/videos/<video_id>/ask')
+def ask_video(video_id):
+    """Answer a question about a processed video from its most relevant transcript chunks."""
+    question = (request.args.get('q') or '').strip()
+    if not question:
+        return jsonify({'error': 'Please provide a question'}), 400
+    if len(question) > QA_MAX_QUESTION_CHARS:
+        return jsonify({'error': f'Questions may be at most {QA_MAX_QUESTION_CHARS} characters long'}), 400
+    try:
+        languages = language_key(request.args.get('languages'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    with trace('ask', video_id=video_id):
+        try:
+            result = answer_question(video_id, question, languages, request.args.get('k', QA_TOP_K, type=int))
+        except TranscriptNotStored:
+            return jsonify({'error': 'Transcript not found, please process the video first'}), 404
+        except RateLimitExceeded as e:
+            return jsonify({'error': str(e)}), 429, {'Retry-After': str(max(1, round(e.retry_after)))}
+        except CircuitOpen as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': str(max(1, round(e.retry_after)))}
+        except Exception as e:
+            logger.error(f"Error answering question: {str(e)}")
+            return jsonify({'error': 'Failed to answer the question'}), 500
+
+    return jsonify({'video_id': video_id, 'question': question, **result})
 
-@app.route('/download-transcript', methods=['POST'])
+@bp.route('/videos/<video_id>/transcript.<export_format>')
+def export_transcript(video_id, export_format):
+    """Stream a stored transcript as txt, srt, vtt or json; ?lang= picks a language preference."""
+    if export_format not in EXPORT_MIMETYPES:
+        return jsonify({'error': f'Unsupported format, use one of: {", ".join(EXPORT_MIMETYPES)}'}), 404
+
+    try:
+        languages = language_key(request.args.get('lang'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    stored = VideoTranscript.query.filter_by(video_id=video_id, languages=languages).first()
+    if stored is None:
+        return jsonify({'error': 'Transcript not found'}), 404
+
+    use_gzip = request.accept_encodings['gzip'] > 0
+    etag = f"{video_id}-{export_format}-{stored.segment_count}-{int(stored.updated_at.timestamp())}"
+    if languages:
+        etag += f"-{languages.replace(',', '_')}"
+    if use_gzip:
+        etag += '-gzip'
+    last_modified = stored.updated_at.replace(microsecond=0)
+
+    headers = {
+        'Cache-Control': f'public, max-age={TRANSCRIPT_EXPORT_MAX_AGE}',
+        'Vary': 'Accept-Encoding'
+    }
+    if request.if_none_match.contains(etag) or (
+        not request.if_none_match and request.if_modified_since is not None
+        and request.if_modified_since.replace(tzinfo=None) >= last_modified
+    ):
+        response = Response(status=304, headers=headers)
+    else:
+        chunks = export_chunks(stored.packed(), export_format, video_id)
+        if use_gzip:
+            chunks = gzip_chunks(chunks)
+            headers['Content-Encoding'] = 'gzip'
+        response = Response(chunks, content_type=EXPORT_MIMETYPES[export_format], headers=headers)
+        response.headers['Content-Disposition'] = f'attachment; filename="{video_id}.{export_format}"'
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+@bp.route('/download-transcript', methods=['POST'])
 def download_transcript():
     try:
         transcript = request.form.get('transcript')
@@ -102,5 +518,9 @@ def download_transcript():
         logger.error(f"Error downloading transcript: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+app = create_app()
+job_queue = app.extensions['job_queue']
+
 if __name__ == '__main__':
+    configure_logging()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""ASGI entry point, for any ASGI server:
+
+    pip install ".[asgi]"
+    uvicorn asgi:application --workers 2
+
+/process and /process/stream run the async pipeline on the event loop, so
+one process can hold hundreds of in-flight summaries without a thread
+each. Every other route (pages, history, search, exports, metrics) is
+served by the Flask app in a worker thread, with the same templates and
+models.
+"""
+import sys
+import json
+import time
+import asyncio
+import contextvars
+import logging
+from io import BytesIO
+from werkzeug.wrappers import Request
+from app import app, configure_logging, sse_event, request_seconds, request_count
+from pipeline import process_video_async, stream_video_async
+from utils.youtube import extract_video_id, language_key
+from utils.http_client import close_async_client
+from utils.ratelimit import RateLimitExceeded
+from utils.breaker import CircuitOpen
+from utils.tracing import trace, span
+
+logger = logging.getLogger(__name__)
+
+def wsgi_environ(scope, body):
+    """Build a WSGI environ for an ASGI HTTP scope and its request body."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name not in ('content-length', 'transfer-encoding'):
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    # The body has already been read in full
+    environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+async def read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        body.extend(message.get('body', b''))
+        if not message.get('more_body'):
+            return bytes(body)
+
+async def send_json(send, status, payload, headers=()):
+    body = json.dumps(payload).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+        *headers
+    ]})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+class ASGIApp:
+    """Serve the pipeline routes natively and delegate the rest to a Flask app."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.routes = {
+            ('POST', '/process'): self.process,
+            ('GET', '/process/stream'): self.process_stream
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+
+        body = await read_body(receive)
+        if body is None:
+            return
+
+        route = (scope['method'], scope['path'])
+        handler = self.routes.get(route)
+        if handler is None:
+            return await self.call_wsgi(scope, body, send)
+
+        started = time.perf_counter()
+        status = await handler(Request(wsgi_environ(scope, body)), receive, send)
+        request_seconds.observe(time.perf_counter() - started, endpoint=route[1], method=route[0])
+        request_count.inc(endpoint=route[1], method=route[0], status=status)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_async_client()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def process(self, request, receive, send):
+        with trace('process'):
+            youtube_url = request.form.get('youtube_url')
+            summary_length = request.form.get('summary_length', 'medium')
+            if not youtube_url:
+                await send_json(send, 400, {'error': 'Please provide a YouTube URL'})
+                return 400
+
+            try:
+                with span('parse_url'):
+                    video_id = extract_video_id(youtube_url)
+            except (ValueError, KeyError, IndexError):
+                await send_json(send, 400, {'error': 'Invalid YouTube URL format'})
+                return 400
+
+            try:
+                languages = language_key(request.form.get('languages'))
+            except ValueError as e:
+                await send_json(send, 400, {'error': str(e)})
+                return 400
+
+            # No job queue here: the request simply awaits the pipeline
+            try:
+                history_id, result = await process_video_async(self.flask_app, youtube_url, video_id, summary_length,
+                                                               languages=languages)
+            except RateLimitExceeded as e:
+                retry_after = str(max(1, round(e.retry_after))).encode()
+                await send_json(send, 429, {'error': str(e)}, [(b'retry-after', retry_after)])
+                return 429
+            except CircuitOpen as e:
+                # YouTube is down and nothing is stored for the video; a summarizer outage still returns 200
+                retry_after = str(max(1, round(e.retry_after))).encode()
+                await send_json(send, 503, {'error': str(e)}, [(b'retry-after', retry_after)])
+                return 503
+            except Exception as e:
+                logger.error(f"Error processing video: {str(e)}")
+                await send_json(send, 500, {'error': str(e)})
+                return 500
+
+            await send_json(send, 200, {
+                'success': True,
+                'status': 'completed',
+                'cached': history_id is None,
+                'video_id': video_id,
+                **result
+            })
+            return 200
+
+    async def process_stream(self, request, receive, send):
+        youtube_url = request.args.get('youtube_url')
+        summary_length = request.args.get('summary_length', 'medium')
+        if not youtube_url:
+            await send_json(send, 400, {'error': 'Please provide a YouTube URL'})
+            return 400
+        try:
+            video_id = extract_video_id(youtube_url)
+        except (ValueError, KeyError, IndexError):
+            await send_json(send, 400, {'error': 'Invalid YouTube URL format'})
+            return 400
+        try:
+            languages = language_key(request.args.get('languages'))
+        except ValueError as e:
+            await send_json(send, 400, {'error': str(e)})
+            return 400
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]})
+
+        async def stream():
+            with trace('stream', video_id=video_id):
+                try:
+                    async for event, data in stream_video_async(self.flask_app, youtube_url, video_id, summary_length,
+                                                               languages=languages):
+                        await send({'type': 'http.response.body', 'body': sse_event(event, data).encode('utf-8'),
+                                    'more_body': True})
+                except Exception as e:
+                    logger.error(f"Error streaming video: {str(e)}")
+                    await send({'type': 'http.response.body', 'body': sse_event('failed', {'error': str(e)}).encode('utf-8'),
+                                'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        # Stop the pipeline if the client goes away, as the Flask route does
+        stream_task = asyncio.ensure_future(stream())
+        disconnect_task = asyncio.ensure_future(wait_for_disconnect(receive))
+        done, _ = await asyncio.wait((stream_task, disconnect_task), return_when=asyncio.FIRST_COMPLETED)
+        if stream_task in done:
+            disconnect_task.cancel()
+            stream_task.result()
+        else:
+            stream_task.cancel()
+            try:
+                await stream_task
+            except asyncio.CancelledError:
+                pass
+        return 200
+
+    async def call_wsgi(self, scope, body, send):
+        """Run the Flask app in worker threads, passing its (possibly streamed) response through."""
+        loop = asyncio.get_running_loop()
+        # Every step of one response runs in the same context, so Flask's
+        # request context survives across the threads that iterate it
+        context = contextvars.copy_context()
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            return lambda data: None
+
+        def call(fn, *args):
+            return loop.run_in_executor(None, context.run, fn, *args)
+
+        iterable = await call(self.flask_app, wsgi_environ(scope, body), start_response)
+        iterator = iter(iterable)
+        finished = object()
+        try:
+            chunk = await call(next, iterator, finished)
+            await send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+            while chunk is not finished:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await call(next, iterator, finished)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(iterable, 'close'):
+                await call(iterable.close)
+
+configure_logging()
+application = ASGIApp(app)
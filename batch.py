@@ -0,0 +1,234 @@
+"""Process many YouTube URLs at once.
+
+Used by the /batch endpoint and as a command-line tool:
+
+    python batch.py urls.txt --summary-length short --concurrency 8
+    python batch.py urls.txt --languages de,en
+    cat urls.txt | python batch.py - > results.ndjson
+"""
+import argparse
+import json
+import os
+import sys
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import current_app
+from utils.youtube import extract_video_id, join_segments, language_key
+from utils.ratelimit import priority
+from utils.summarizer import generate_summary
+from utils.preprocess import prepare_transcript
+from utils.tracing import trace, span
+from pipeline import result_cache, result_key, fetch_video_data, stored_video_data, store_transcripts, store_summaries
+from models import VideoHistory
+from search import index_videos
+from db import db
+
+logger = logging.getLogger(__name__)
+
+# Batch settings. BATCH_MAX_CONCURRENCY caps the worker threads a single
+# batch may ask for.
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 4))
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", 16))
+BATCH_INSERT_SIZE = int(os.environ.get("BATCH_INSERT_SIZE", 50))
+BATCH_MAX_URLS = int(os.environ.get("BATCH_MAX_URLS", 1000))
+
+def summarize_url(youtube_url, summary_length, languages=None, stored=None):
+    """Fetch and summarize one video.
+
+    Its YouTube and OpenAI calls queue behind interactive requests for the
+    shared rate limits. `stored` is (video_info, segments) from an earlier
+    run, in which case YouTube is not called at all.
+    """
+    with priority('background'), trace('batch_item', url=youtube_url):
+        if stored is not None:
+            video_info, segments = stored
+        else:
+            video_info, segments = fetch_video_data(youtube_url, languages)
+        if not segments:
+            raise ValueError('Could not extract transcript from the video')
+
+        texts, preprocessing = prepare_transcript(segments)
+        with span('summary'):
+            summary = generate_summary(texts, summary_length)
+        return video_info, segments, summary, preprocessing
+
+def summarize_video(app, youtube_url, video_id, summary_length, languages=None):
+    """summarize_url for a worker thread, reading the video's stored data there.
+
+    Only the videos being worked on have their transcripts decoded, in the
+    worker's own app context. Returns (summarize_url result, whether the
+    video was fetched from YouTube).
+    """
+    with app.app_context():
+        stored = stored_video_data(video_id, languages)
+    return summarize_url(youtube_url, summary_length, languages, stored), stored is None
+
+def parse_concurrency(value):
+    """Validate a requested worker count: None for the default, else 1 to BATCH_MAX_CONCURRENCY."""
+    if value is None or value == '':
+        return None
+    try:
+        if isinstance(value, bool):
+            raise ValueError
+        concurrency = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('concurrency must be a whole number')
+    if not 1 <= concurrency <= BATCH_MAX_CONCURRENCY:
+        raise ValueError(f'concurrency must be between 1 and {BATCH_MAX_CONCURRENCY}')
+    return concurrency
+
+def flush_results(pending, summary_length, languages=None):
+    """Bulk insert processed videos in a single commit and prime the result cache.
+
+    `pending` holds (history row, segments, summary, fetched) tuples;
+    transcripts that were read from the store are not written again.
+    """
+    if not pending:
+        return
+    transcripts = {row.video_id: join_segments(segments) for row, segments, _, _ in pending}
+    summaries = {row.video_id: summary for row, _, summary, _ in pending}
+    with span('db_commit'):
+        store_transcripts({row.video_id: segments for row, segments, _, fetched in pending if fetched}, languages)
+        records = store_summaries(summaries, summary_length, languages)
+        for row, _, _, _ in pending:
+            row.stored_summary = records[row.video_id]
+        index_videos(
+            (row.video_id, row.video_title, row.video_thumbnail, summaries[row.video_id], transcripts[row.video_id])
+            for row, _, _, _ in pending
+        )
+        db.session.add_all([row for row, _, _, _ in pending])
+        db.session.commit()
+    for row, _, _, _ in pending:
+        # Fallback summaries are not cached, so the next request asks the primary backend again
+        if records[row.video_id].fallback:
+            continue
+        result_cache.set(result_key(row.video_id, row.summary_length, languages), {
+            'video_info': {
+                'title': row.video_title,
+                'duration': row.video_duration,
+                'thumbnail': row.video_thumbnail
+            },
+            'transcript': transcripts[row.video_id],
+            'summary': summaries[row.video_id]
+        })
+    pending.clear()
+
+def run_batch(urls, summary_length='medium', concurrency=None, insert_size=None, languages=None):
+    """Process a list of URLs, yielding a status dict per item as it finishes.
+
+    URLs are deduplicated by video ID, already processed videos are served
+    from the result cache, stored transcripts are summarized without
+    calling YouTube, and new results are written to history in bulk.
+    `languages` is a transcript language preference, applied to every URL.
+    A final dict with a 'summary' key reports the totals.
+    """
+    languages = language_key(languages)
+    concurrency = min(concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    insert_size = insert_size or BATCH_INSERT_SIZE
+    totals = {'completed': 0, 'cached': 0, 'duplicate': 0, 'invalid': 0, 'failed': 0}
+
+    def report(status):
+        totals[status['status']] += 1
+        return status
+
+    seen = set()
+    work = []
+    for index, youtube_url in enumerate(urls):
+        youtube_url = youtube_url.strip()
+        if not youtube_url:
+            continue
+
+        try:
+            video_id = extract_video_id(youtube_url)
+        except (ValueError, KeyError, IndexError):
+            yield report({'index': index, 'url': youtube_url, 'status': 'invalid', 'error': 'Invalid YouTube URL format'})
+            continue
+
+        if video_id in seen:
+            yield report({'index': index, 'url': youtube_url, 'video_id': video_id, 'status': 'duplicate'})
+            continue
+        seen.add(video_id)
+
+        cached = result_cache.get(result_key(video_id, summary_length, languages))
+        if cached is not None:
+            yield report({'index': index, 'url': youtube_url, 'video_id': video_id, 'status': 'cached',
+                          'title': cached['video_info']['title']})
+            continue
+
+        work.append((index, youtube_url, video_id))
+
+    app = current_app._get_current_object()
+    pending = []
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch')
+    try:
+        futures = {
+            executor.submit(summarize_video, app, youtube_url, video_id, summary_length, languages): (index, youtube_url, video_id)
+            for index, youtube_url, video_id in work
+        }
+        for future in as_completed(futures):
+            index, youtube_url, video_id = futures[future]
+            try:
+                (video_info, segments, summary, preprocessing), fetched = future.result()
+            except Exception as e:
+                logger.error(f"Error processing {youtube_url}: {str(e)}")
+                yield report({'index': index, 'url': youtube_url, 'video_id': video_id, 'status': 'failed', 'error': str(e)})
+                continue
+
+            pending.append((VideoHistory(
+                video_url=youtube_url,
+                video_id=video_id,
+                video_title=video_info['title'],
+                video_duration=video_info['duration'],
+                video_thumbnail=video_info['thumbnail'],
+                summary_length=summary_length,
+                languages=languages
+            ), segments, summary, fetched))
+            if len(pending) >= insert_size:
+                flush_results(pending, summary_length, languages)
+
+            yield report({'index': index, 'url': youtube_url, 'video_id': video_id, 'status': 'completed',
+                          'title': video_info['title'], 'preprocessing': preprocessing})
+    finally:
+        # Queued items are dropped; running ones finish their reads before the final commit
+        executor.shutdown(wait=True, cancel_futures=True)
+        flush_results(pending, summary_length, languages)
+
+    yield {'summary': totals}
+
+def read_urls(path):
+    """Read URLs from a file, one per line; '-' reads standard input."""
+    handle = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        return [line.strip() for line in handle if line.strip() and not line.startswith('#')]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe and summarize many YouTube videos.")
+    parser.add_argument('sources', nargs='+', help="YouTube URLs, files with one URL per line, or '-' for stdin")
+    parser.add_argument('--summary-length', choices=['short', 'medium', 'long'], default='medium')
+    parser.add_argument('--concurrency', type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument('--languages', help="Preferred transcript languages, comma-separated (e.g. 'de,en')")
+    args = parser.parse_args(argv)
+    try:
+        parse_concurrency(args.concurrency)
+    except ValueError as e:
+        parser.error(str(e))
+
+    urls = []
+    for source in args.sources:
+        if source == '-' or os.path.isfile(source):
+            urls.extend(read_urls(source))
+        else:
+            urls.append(source)
+
+    from app import app, configure_logging
+
+    configure_logging()
+    with app.app_context():
+        for status in run_batch(urls, args.summary_length, args.concurrency, languages=args.languages):
+            print(json.dumps(status), flush=True)
+
+if __name__ == '__main__':
+    main()
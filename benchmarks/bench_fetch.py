@@ -0,0 +1,60 @@
+"""Compare sequential and concurrent metadata/transcript fetching.
+
+Upstream calls are replaced with stubs that sleep for a configurable
+latency, so the benchmark runs offline:
+
+    python benchmarks/bench_fetch.py --info-ms 300 --transcript-ms 800 --runs 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import pipeline
+
+def stub(latency_ms, value):
+    def call(url, *args, **kwargs):
+        time.sleep(latency_ms / 1000)
+        return value
+    return call
+
+def run_sequential(url):
+    return pipeline.get_video_info(url), pipeline.get_video_segments(url)
+
+def measure(fn, url, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(url)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--info-ms', type=float, default=300)
+    parser.add_argument('--transcript-ms', type=float, default=800)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    url = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+    info = {'title': 'Benchmark', 'duration': 'PT1M', 'thumbnail': ''}
+    segments = [{'text': 'transcript', 'start': 0.0, 'duration': 1.0}]
+    with patch.object(pipeline, 'get_video_info', stub(args.info_ms, info)), \
+            patch.object(pipeline, 'get_video_segments', stub(args.transcript_ms, segments)):
+        sequential = measure(run_sequential, url, args.runs)
+        concurrent = measure(pipeline.fetch_video_data, url, args.runs)
+
+    seq_median = statistics.median(sequential)
+    con_median = statistics.median(concurrent)
+    print(f"stub latencies: info={args.info_ms:.0f}ms transcript={args.transcript_ms:.0f}ms runs={args.runs}")
+    print(f"sequential  median {seq_median:8.1f} ms")
+    print(f"concurrent  median {con_median:8.1f} ms")
+    print(f"speedup     {seq_median / con_median:8.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,379 @@
+"""Load-test the app against local fake YouTube and OpenAI servers.
+
+Every request runs the full pipeline (metadata, captions, summary and
+database writes) against stand-ins with configurable latency and error
+rates. Each concurrency level reports throughput, end-to-end latency and
+p50/p95/p99 per pipeline stage, and the run is saved as JSON:
+
+    python benchmarks/bench_load.py --concurrency 1,4,16 --requests 40
+    python benchmarks/bench_load.py --server --workers 2 --threads 8
+    python benchmarks/bench_load.py --baseline benchmarks/results/previous.json
+
+With --baseline the exit status is 1 when a level got slower (or its
+throughput dropped) by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.fakes import FakeUpstreams, Upstream, use_fake_watch_url
+
+STAGE_BUCKET = re.compile(r'^ytt_stage_duration_seconds_bucket\{stage="([^"]*)",le="([^"]+)"\} (\S+)$')
+
+def percentile(values, q):
+    """Linearly interpolated percentile of values (q in 0-100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def summarize_ms(seconds):
+    return {
+        'count': len(seconds),
+        'p50': round(percentile(seconds, 50) * 1000, 2),
+        'p95': round(percentile(seconds, 95) * 1000, 2),
+        'p99': round(percentile(seconds, 99) * 1000, 2),
+        'max': round(max(seconds) * 1000, 2)
+    } if seconds else {'count': 0}
+
+def parse_stage_buckets(text):
+    """{stage: [(upper bound, cumulative count), ...]} from a /metrics scrape."""
+    stages = {}
+    for line in text.splitlines():
+        match = STAGE_BUCKET.match(line)
+        if match:
+            stage, bound, count = match.groups()
+            stages.setdefault(stage, []).append((float('inf') if bound == '+Inf' else float(bound), float(count)))
+    return stages
+
+def bucket_quantile(buckets, q):
+    """Estimate a quantile from cumulative histogram buckets, as Prometheus' histogram_quantile does."""
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return None
+    rank = total * q / 100
+    lower_bound, lower_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float('inf'):
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+def stage_deltas(before, after):
+    """Per-stage summaries from two /metrics scrapes taken around one level."""
+    result = {}
+    for stage, buckets in after.items():
+        previous = dict(before.get(stage, []))
+        delta = [(bound, count - previous.get(bound, 0)) for bound, count in buckets]
+        if not delta or not delta[-1][1]:
+            continue
+        result[stage] = {'count': int(delta[-1][1]), 'estimated': True}
+        for q in (50, 95, 99):
+            result[stage][f'p{q}'] = round(bucket_quantile(delta, q) * 1000, 2)
+    return result
+
+
+class InProcessClient:
+    """Drive the app through Flask's test client, collecting exact stage timings."""
+
+    mode = 'in-process'
+
+    def __init__(self):
+        from app import app
+        from utils.tracing import add_listener
+        self.app = app
+        self.spans = {}
+        self._lock = threading.Lock()
+        add_listener(self._record)
+
+    def _record(self, finished):
+        with self._lock:
+            for stage, seconds, _ in finished.spans:
+                self.spans.setdefault(stage, []).append(seconds)
+
+    def request(self, method, path, data=None):
+        client = self.app.test_client()
+        response = client.open(path, method=method, data=data)
+        return response.status_code, response.get_data(as_text=True)
+
+    def begin_level(self):
+        with self._lock:
+            self.spans = {}
+
+    def end_level(self):
+        with self._lock:
+            return {stage: summarize_ms(seconds) for stage, seconds in sorted(self.spans.items())}
+
+    def close(self):
+        pass
+
+
+class ServerClient:
+    """Drive the app under gunicorn over HTTP.
+
+    Stage timings are estimated from /metrics histogram buckets. Each
+    gunicorn worker keeps its own registry, so they are only complete with
+    --workers 1.
+    """
+
+    mode = 'gunicorn'
+
+    def __init__(self, env, workers, threads, port):
+        self.base_url = f"http://127.0.0.1:{port}"
+        command = [
+            sys.executable, '-m', 'gunicorn', '--chdir', ROOT,
+            '--workers', str(workers), '--worker-class', 'gthread', '--threads', str(threads),
+            '--bind', f"127.0.0.1:{port}", '--log-level', 'warning', 'benchmarks.wsgi:app'
+        ]
+        self.process = subprocess.Popen(command, env=env)
+        self._wait_ready()
+        self._before = {}
+
+    def _wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with status {self.process.returncode}")
+            try:
+                self.request('GET', '/metrics')
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError("gunicorn did not start in time")
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=300) as response:
+                return response.status, response.read().decode('utf-8')
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode('utf-8')
+
+    def begin_level(self):
+        self._before = parse_stage_buckets(self.request('GET', '/metrics')[1])
+
+    def end_level(self):
+        return stage_deltas(self._before, parse_stage_buckets(self.request('GET', '/metrics')[1]))
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+def run_stream(client, video_id, summary_length):
+    query = urllib.parse.urlencode({
+        'youtube_url': f"https://www.youtube.com/watch?v={video_id}",
+        'summary_length': summary_length
+    })
+    status, body = client.request('GET', f"/process/stream?{query}")
+    return status == 200 and 'event: done' in body
+
+def run_job(client, video_id, summary_length, poll_seconds=0.05):
+    status, body = client.request('POST', '/process', {
+        'youtube_url': f"https://www.youtube.com/watch?v={video_id}",
+        'summary_length': summary_length
+    })
+    if status not in (200, 202):
+        return False
+    payload = json.loads(body)
+    status_url = payload.get('status_url')
+    while payload.get('status') not in ('completed', 'failed'):
+        time.sleep(poll_seconds)
+        status, body = client.request('GET', status_url)
+        if status != 200:
+            return False
+        payload = json.loads(body)
+    return payload['status'] == 'completed'
+
+def run_level(client, endpoint, concurrency, requests, summary_length, tag):
+    run = run_stream if endpoint == 'stream' else run_job
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def one(index):
+        nonlocal errors
+        # Unique IDs so no request is answered from the result cache
+        video_id = f"{tag}{concurrency:03d}{index:04d}"
+        start = time.perf_counter()
+        try:
+            ok = run(client, video_id, summary_length)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    client.begin_level()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    duration = time.perf_counter() - started
+
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': errors,
+        'error_rate': round(errors / requests, 4),
+        'duration_seconds': round(duration, 3),
+        'throughput_rps': round(requests / duration, 3),
+        'latency_ms': summarize_ms(latencies),
+        'stages_ms': client.end_level()
+    }
+
+def compare(result, baseline, tolerance):
+    """Regressions of result against a baseline run, matched by concurrency level."""
+    previous = {level['concurrency']: level for level in baseline.get('levels', [])}
+    regressions = []
+    for level in result['levels']:
+        old = previous.get(level['concurrency'])
+        if old is None:
+            continue
+        for q in ('p50', 'p95', 'p99'):
+            before, after = old['latency_ms'].get(q), level['latency_ms'].get(q)
+            if before and after and after > before * (1 + tolerance):
+                regressions.append(f"c={level['concurrency']} latency {q} {before:.1f}ms -> {after:.1f}ms")
+        before, after = old['throughput_rps'], level['throughput_rps']
+        if before and after < before * (1 - tolerance):
+            regressions.append(f"c={level['concurrency']} throughput {before:.2f} -> {after:.2f} req/s")
+    return regressions
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', default='1,4,16', help='comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=20, help='requests per level (at least the concurrency)')
+    parser.add_argument('--endpoint', choices=('stream', 'job'), default='stream',
+                        help='GET /process/stream, or POST /process and poll the job')
+    parser.add_argument('--summary-length', default='medium')
+    parser.add_argument('--server', action='store_true', help='run the app under gunicorn instead of the test client')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--database-url', help='defaults to a fresh SQLite file')
+    parser.add_argument('--youtube-ms', type=float, default=80, help='median YouTube Data API latency')
+    parser.add_argument('--transcript-ms', type=float, default=250, help='median caption page latency')
+    parser.add_argument('--openai-ms', type=float, default=1500, help='median chat completion latency')
+    parser.add_argument('--jitter', type=float, default=0.25, help='log-normal sigma applied to every latency')
+    parser.add_argument('--youtube-errors', type=float, default=0.0, help='fraction of failed API calls')
+    parser.add_argument('--transcript-errors', type=float, default=0.0)
+    parser.add_argument('--openai-errors', type=float, default=0.0)
+    parser.add_argument('--segments', type=int, default=300, help='caption segments per fake video')
+    parser.add_argument('--output', help='defaults to benchmarks/results/load-<timestamp>.json')
+    parser.add_argument('--baseline', help='previous result JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown before flagging')
+    args = parser.parse_args()
+
+    fakes = FakeUpstreams(
+        youtube=Upstream(args.youtube_ms, args.jitter, args.youtube_errors),
+        transcript=Upstream(args.transcript_ms, args.jitter, args.transcript_errors, error_status=429),
+        openai=Upstream(args.openai_ms, args.jitter, args.openai_errors, error_status=500),
+        segments=args.segments
+    ).start()
+
+    workdir = tempfile.mkdtemp(prefix='ytt-bench-')
+    env = {
+        **fakes.environment(),
+        'DATABASE_URL': args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+        'SLOW_REQUEST_SECONDS': '0',
+        'JOB_MAX_PENDING': '10000',
+        # Measure the app, not the client-side provider limits
+        'YOUTUBE_REQUESTS_PER_MINUTE': '0',
+        'YOUTUBE_QUOTA_UNITS_PER_DAY': '0',
+        'OPENAI_REQUESTS_PER_MINUTE': '0',
+        'OPENAI_TOKENS_PER_MINUTE': '0'
+    }
+    os.environ.update(env)
+    # The app expects the schema to exist, as in a deployment
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'main', 'init-db'], cwd=ROOT, check=True)
+
+    if args.server:
+        client = ServerClient({**os.environ, **env}, args.workers, args.threads, args.port)
+    else:
+        use_fake_watch_url(env['BENCH_WATCH_URL'])
+        client = InProcessClient()
+
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    tag = uuid.uuid4().hex[:4]
+    result = {
+        'benchmark': 'load',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'mode': client.mode,
+        'endpoint': args.endpoint,
+        'upstreams': fakes.config(),
+        'levels': []
+    }
+
+    try:
+        for concurrency in levels:
+            level = run_level(client, args.endpoint, concurrency, max(args.requests, concurrency),
+                              args.summary_length, tag)
+            result['levels'].append(level)
+            latency = level['latency_ms']
+            print(f"c={concurrency:<4} {level['throughput_rps']:7.2f} req/s  "
+                  f"p50 {latency.get('p50', 0):8.1f}  p95 {latency.get('p95', 0):8.1f}  "
+                  f"p99 {latency.get('p99', 0):8.1f} ms  errors {level['errors']}/{level['requests']}")
+            for stage, timing in level['stages_ms'].items():
+                print(f"       {stage:<16} p50 {timing['p50']:8.1f}  p95 {timing['p95']:8.1f}  "
+                      f"p99 {timing['p99']:8.1f} ms  n={timing['count']}")
+    finally:
+        client.close()
+        fakes.stop()
+    result['upstream_calls'] = dict(fakes.counts)
+
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"load-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (baseline.get('mode'), baseline.get('endpoint')) != (result['mode'], result['endpoint']):
+            print(f"note: baseline ran {baseline.get('mode')}/{baseline.get('endpoint')}, "
+                  f"this run {result['mode']}/{result['endpoint']}")
+        regressions = compare(result, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Measure worker cold start: the time a fresh interpreter takes to import the app.
+
+Each run starts a new Python process, as a gunicorn or uvicorn worker
+does, and times the import of the entry point module:
+
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --module asgi --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+def environment():
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    return env
+
+def measure(module, runs):
+    """Return (import seconds, process wall seconds) for each run."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_SNIPPET.format(module=module)],
+            cwd=ROOT, env=environment(), capture_output=True, text=True, check=True
+        ).stdout
+        timings.append((float(output.strip().splitlines()[-1]), time.perf_counter() - start))
+    return timings
+
+def slowest_imports(module, top):
+    """Packages by cumulative import time, from `python -X importtime`.
+
+    A package's time includes the packages it imports, so nested ones are
+    counted again under their parent.
+    """
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=ROOT, env=environment(), capture_output=True, text=True, check=True
+    ).stderr
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if '.' not in name and name != module:
+            packages[name] = int(cumulative) / 1e6
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='main', help='entry point to import (main, app or asgi)')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='list the N slowest imports (0 to skip)')
+    args = parser.parse_args()
+
+    timings = measure(args.module, args.runs)
+    imports = [seconds * 1000 for seconds, _ in timings]
+    processes = [seconds * 1000 for _, seconds in timings]
+    print(f"module={args.module} runs={args.runs}")
+    print(f"import   median {statistics.median(imports):8.1f} ms  min {min(imports):8.1f} ms")
+    print(f"process  median {statistics.median(processes):8.1f} ms  min {min(processes):8.1f} ms")
+
+    if args.top:
+        print(f"slowest imports of {args.module}:")
+        for name, seconds in slowest_imports(args.module, args.top):
+            print(f"  {name:<32} {seconds * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Local stand-ins for the YouTube Data API, YouTube caption pages and an
+OpenAI-compatible chat completions endpoint, served from one HTTP server.
+
+Each upstream gets its own latency and error distribution:
+
+    from benchmarks.fakes import FakeUpstreams, Upstream
+    fakes = FakeUpstreams(openai=Upstream(latency_ms=800, error_rate=0.02))
+    fakes.start()
+    fakes.environment()   # env vars pointing the app at the fakes
+"""
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+
+WORDS = ("cache latency request server python video transcript summary model token "
+         "queue worker database index stream batch metric trace budget retry").split()
+
+
+@dataclass
+class Upstream:
+    """Latency (log-normal around a median) and error behaviour of one upstream."""
+    latency_ms: float = 50.0
+    jitter: float = 0.25        # sigma of the log-normal; 0 makes every call take latency_ms
+    error_rate: float = 0.0
+    error_status: int = 503
+
+    def delay(self):
+        if self.latency_ms <= 0:
+            return
+        seconds = self.latency_ms / 1000
+        if self.jitter > 0:
+            seconds = random.lognormvariate(math.log(seconds), self.jitter)
+        time.sleep(seconds)
+
+    def fails(self):
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+def caption_text(video_id, index):
+    rng = random.Random(f"{video_id}:{index}")
+    return ' '.join(rng.choice(WORDS) for _ in range(8))
+
+
+class FakeUpstreams:
+    """Serve the three fake upstreams on one local port."""
+
+    def __init__(self, youtube=None, transcript=None, openai=None, segments=300, summary_chunks=20):
+        self.youtube = youtube or Upstream(latency_ms=80)
+        self.transcript = transcript or Upstream(latency_ms=250)
+        self.openai = openai or Upstream(latency_ms=1500)
+        self.segments = segments
+        self.summary_chunks = summary_chunks
+        self.counts = {'youtube': 0, 'watch': 0, 'captions': 0, 'openai': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host='127.0.0.1', port=0):
+        fakes = self
+
+        class Handler(FakeHandler):
+            upstreams = fakes
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-upstreams', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def count(self, name, error=False):
+        with self._lock:
+            self.counts[name] += 1
+            if error:
+                self.counts['errors'] += 1
+
+    def environment(self):
+        """Environment variables that point the app at these fakes."""
+        return {
+            'YOUTUBE_API_BASE_URL': f"{self.url}/youtube/v3",
+            'YOUTUBE_API_KEY': 'benchmark',
+            'OPENAI_BASE_URL': f"{self.url}/v1",
+            'OPENAI_API_KEY': 'benchmark',
+            'BENCH_WATCH_URL': f"{self.url}/watch?v={{video_id}}"
+        }
+
+    def config(self):
+        return {
+            'youtube': asdict(self.youtube),
+            'transcript': asdict(self.transcript),
+            'openai': asdict(self.openai),
+            'segments': self.segments,
+            'summary_chunks': self.summary_chunks
+        }
+
+
+def use_fake_watch_url(watch_url):
+    """Point youtube-transcript-api's watch page requests at the fake server.
+
+    The library has no setting for this, so the benchmark overrides the
+    module constant it formats watch URLs from.
+    """
+    from youtube_transcript_api import _transcripts
+    _transcripts.WATCH_URL = watch_url
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    upstreams = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json'):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _fail(self, name, upstream):
+        self.upstreams.count(name, error=True)
+        self._send(upstream.error_status, json.dumps({'error': {'message': 'injected failure'}}))
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        fakes = self.upstreams
+
+        if parsed.path == '/youtube/v3/videos':
+            fakes.youtube.delay()
+            if fakes.youtube.fails():
+                return self._fail('youtube', fakes.youtube)
+            fakes.count('youtube')
+            ids = query.get('id', [''])[0].split(',')
+            items = [{
+                'id': video_id,
+                'snippet': {'title': f'Benchmark video {video_id}',
+                            'thumbnails': {'high': {'url': f'{fakes.url}/thumb/{video_id}.jpg'}}},
+                'contentDetails': {'duration': 'PT10M'}
+            } for video_id in ids if video_id]
+            return self._send(200, json.dumps({'items': items}))
+
+        if parsed.path == '/watch':
+            fakes.transcript.delay()
+            if fakes.transcript.fails():
+                return self._fail('watch', fakes.transcript)
+            fakes.count('watch')
+            video_id = query.get('v', [''])[0]
+            player = {
+                'playabilityStatus': {'status': 'OK'},
+                'captions': {'playerCaptionsTracklistRenderer': {'captionTracks': [{
+                    'baseUrl': f'{fakes.url}/api/timedtext?v={video_id}',
+                    'name': {'simpleText': 'English (auto-generated)'},
+                    'languageCode': 'en',
+                    'kind': 'asr'
+                }]}}
+            }
+            html = f"<html><body><script>var ytInitialPlayerResponse = {json.dumps(player)};</script></body></html>"
+            return self._send(200, html, 'text/html; charset=utf-8')
+
+        if parsed.path == '/api/timedtext':
+            fakes.count('captions')
+            video_id = query.get('v', [''])[0]
+            lines = [
+                f'<text start="{index * 2.0:.2f}" dur="2.0">{escape(caption_text(video_id, index))}</text>'
+                for index in range(fakes.segments)
+            ]
+            body = '<?xml version="1.0" encoding="utf-8" ?><transcript>' + ''.join(lines) + '</transcript>'
+            return self._send(200, body, 'text/xml; charset=utf-8')
+
+        self._send(404, json.dumps({'error': 'not found'}))
+
+    def do_POST(self):
+        fakes = self.upstreams
+        if urlparse(self.path).path != '/v1/chat/completions':
+            return self._send(404, json.dumps({'error': 'not found'}))
+
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        fakes.openai.delay()
+        if fakes.openai.fails():
+            return self._fail('openai', fakes.openai)
+        fakes.count('openai')
+
+        words = [random.choice(WORDS) for _ in range(fakes.summary_chunks)]
+        created = int(time.time())
+        if payload.get('stream'):
+            events = []
+            for index, word in enumerate(words):
+                chunk = {
+                    'id': 'chatcmpl-bench', 'object': 'chat.completion.chunk', 'created': created,
+                    'model': payload.get('model', 'gpt-4o'),
+                    'choices': [{'index': 0, 'delta': {'content': word + ' '},
+                                 'finish_reason': 'stop' if index == len(words) - 1 else None}]
+                }
+                events.append(f"data: {json.dumps(chunk)}\n\n")
+            events.append("data: [DONE]\n\n")
+            return self._send(200, ''.join(events), 'text/event-stream')
+
+        return self._send(200, json.dumps({
+            'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': created,
+            'model': payload.get('model', 'gpt-4o'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': ' '.join(words)}}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': len(words), 'total_tokens': len(words)}
+        }))
@@ -0,0 +1,12 @@
+"""Gunicorn entry point used by `bench_load.py --server`.
+
+Points caption requests at the fake upstreams named in BENCH_WATCH_URL
+before the app is imported; the other upstreams are configured through
+their usual environment variables.
+"""
+import os
+from benchmarks.fakes import use_fake_watch_url
+
+use_fake_watch_url(os.environ["BENCH_WATCH_URL"])
+
+from app import app  # noqa: E402
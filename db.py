@@ -1,4 +1,5 @@
 import os
+import asyncio
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 
@@ -6,3 +7,14 @@ class Base(DeclarativeBase):
     pass
 
 db = SQLAlchemy(model_class=Base)
+
+async def run_sync(app, fn, *args):
+    """Run a database function in a worker thread inside its own app context.
+
+    Sessions are scoped to the app context and are not thread-safe, so each
+    call gets a fresh context (and session) rather than sharing the caller's.
+    """
+    def call():
+        with app.app_context():
+            return fn(*args)
+    return await asyncio.to_thread(call)
@@ -0,0 +1,86 @@
+import base64
+import json
+import logging
+from datetime import datetime
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only
+from models import VideoHistory
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DEFAULT_LIMIT = 20
+HISTORY_MAX_LIMIT = 100
+
+# Columns needed to list history; transcript and summary are left unloaded
+LIST_COLUMNS = (
+    VideoHistory.id,
+    VideoHistory.video_url,
+    VideoHistory.video_id,
+    VideoHistory.video_title,
+    VideoHistory.video_duration,
+    VideoHistory.video_thumbnail,
+    VideoHistory.summary_length,
+    VideoHistory.created_at
+)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(history):
+    """Opaque cursor pointing just after the given row in newest-first order."""
+    position = json.dumps([history.created_at.isoformat(), history.id])
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, history_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(history_id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+def slim_history_query():
+    return VideoHistory.query.options(load_only(*LIST_COLUMNS))
+
+def recent_history(limit=5):
+    """Newest history rows without their transcript and summary text."""
+    return slim_history_query().order_by(VideoHistory.created_at.desc(), VideoHistory.id.desc()).limit(limit).all()
+
+def history_item(history):
+    return {
+        'id': history.id,
+        'video_url': history.video_url,
+        'video_id': history.video_id,
+        'title': history.video_title,
+        'duration': history.video_duration,
+        'thumbnail': history.video_thumbnail,
+        'summary_length': history.summary_length,
+        'created_at': history.created_at.isoformat()
+    }
+
+def history_page(cursor=None, limit=None, video_id=None):
+    """Return one newest-first page of history using keyset pagination.
+
+    The cursor encodes the (created_at, id) of the last row of the previous
+    page, so each page is a single index range scan however deep it is.
+    """
+    limit = max(1, min(limit or HISTORY_DEFAULT_LIMIT, HISTORY_MAX_LIMIT))
+    query = slim_history_query()
+    if video_id:
+        query = query.filter(VideoHistory.video_id == video_id)
+    if cursor:
+        created_at, history_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            VideoHistory.created_at < created_at,
+            and_(VideoHistory.created_at == created_at, VideoHistory.id < history_id)
+        ))
+
+    rows = query.order_by(VideoHistory.created_at.desc(), VideoHistory.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'items': [history_item(row) for row in rows],
+        'next_cursor': encode_cursor(rows[-1]) if has_more else None
+    }
@@ -0,0 +1,290 @@
+"""Keep a playlist or channel processed, redoing only what changed since the last run.
+
+Used by the /ingest endpoint and as a command-line tool:
+
+    python ingest.py https://www.youtube.com/@channel --summary-length short
+    python ingest.py "https://www.youtube.com/playlist?list=PL..." --languages de,en
+    python ingest.py https://www.youtube.com/@channel --restart
+
+A run first lists the playlist (a channel's uploads playlist) through the
+YouTube Data API, 50 videos per page, comparing each video's metadata ETag
+with the one recorded when it was last processed. Videos without a stored
+summary, and videos whose ETag changed, are then processed like a batch.
+Every listed page and every flushed group of results is committed together
+with the run's progress, so running the same command again after a crash
+continues where the last run stopped.
+"""
+import argparse
+import json
+import os
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import func
+from utils.youtube import (
+    parse_youtube_url, language_key, get_uploads_playlist, list_playlist_page, get_videos_etags, join_segments
+)
+from utils.ratelimit import priority
+from utils.summarizer import Summary, summary_models, SUMMARY_PROMPT_VERSION
+from utils.tracing import trace
+from flask import current_app
+from pipeline import fetch_video_data, stored_summary
+from batch import summarize_url, summarize_video, flush_results, parse_concurrency, BATCH_CONCURRENCY, BATCH_INSERT_SIZE
+from models import IngestRun, IngestItem, VideoHistory, VideoSummary, VideoTranscript
+from db import db
+
+logger = logging.getLogger(__name__)
+
+# Ingestion settings. Listing stops after INGEST_MAX_VIDEOS videos, which
+# bounds the quota a single run can spend on a very large channel.
+INGEST_CONCURRENCY = int(os.environ.get("INGEST_CONCURRENCY", BATCH_CONCURRENCY))
+INGEST_MAX_VIDEOS = int(os.environ.get("INGEST_MAX_VIDEOS", 5000))
+
+def parse_source(url):
+    """Return (kind, value) for a playlist or channel URL; video URLs are rejected."""
+    kind, value = parse_youtube_url(url)
+    if kind == 'video':
+        raise ValueError("This is a video URL; use /process or /batch for single videos")
+    return kind, value
+
+def find_run(source, summary_length, languages=None):
+    """The newest unfinished run for a source and key, or None."""
+    return IngestRun.query.filter(
+        IngestRun.source == source,
+        IngestRun.summary_length == summary_length,
+        IngestRun.languages == languages,
+        IngestRun.status != 'completed'
+    ).order_by(IngestRun.created_at.desc(), IngestRun.id.desc()).first()
+
+def known_etags(video_ids):
+    """Metadata ETag each video had when it was last processed or found unchanged."""
+    etags = {}
+    rows = db.session.query(IngestItem.video_id, IngestItem.etag).filter(
+        IngestItem.video_id.in_(video_ids),
+        IngestItem.status.in_(('done', 'skipped')),
+        IngestItem.etag.isnot(None)
+    ).order_by(IngestItem.id)
+    for video_id, etag in rows:
+        etags[video_id] = etag
+    return etags
+
+def summarized(video_ids, summary_length, languages=None):
+    """The video IDs that have a summary stored by the current models and prompt version, not by a fallback."""
+    return {video_id for (video_id,) in db.session.query(VideoSummary.video_id).filter(
+        VideoSummary.video_id.in_(video_ids),
+        VideoSummary.summary_length == summary_length,
+        VideoSummary.languages == languages,
+        VideoSummary.model.in_(summary_models()),
+        VideoSummary.prompt_version == SUMMARY_PROMPT_VERSION,
+        VideoSummary.fallback.isnot(True)
+    )}
+
+def classify(etag, known_etag, has_summary):
+    """Return (change, status) for a listed video."""
+    if etag is None:
+        return 'unavailable', 'skipped'
+    if not has_summary:
+        return 'new', 'pending'
+    if known_etag is not None and known_etag != etag:
+        return 'changed', 'pending'
+    return 'unchanged', 'skipped'
+
+def list_page(run):
+    """List the run's next playlist page into IngestItem rows and advance its checkpoint, in one commit.
+
+    Returns the new items.
+    """
+    video_ids, next_page_token = list_playlist_page(run.playlist_id, run.page_token)
+    listed = {video_id for (video_id,) in db.session.query(IngestItem.video_id).filter(
+        IngestItem.run_id == run.id, IngestItem.video_id.in_(video_ids)
+    )}
+    video_ids = [video_id for video_id in dict.fromkeys(video_ids) if video_id not in listed]
+    position = IngestItem.query.filter_by(run_id=run.id).count()
+    video_ids = video_ids[:max(0, INGEST_MAX_VIDEOS - position)]
+
+    etags = get_videos_etags(video_ids) if video_ids else {}
+    previous = known_etags(video_ids)
+    stored = summarized(video_ids, run.summary_length, run.languages)
+    items = []
+    for offset, video_id in enumerate(video_ids):
+        change, status = classify(etags.get(video_id), previous.get(video_id), video_id in stored)
+        items.append(IngestItem(run_id=run.id, video_id=video_id, position=position + offset,
+                                etag=etags.get(video_id), change=change, status=status))
+    db.session.add_all(items)
+
+    run.page_token = next_page_token
+    if next_page_token is None or position + len(video_ids) >= INGEST_MAX_VIDEOS:
+        run.status = 'processing'
+    run.updated_at = datetime.utcnow()
+    db.session.commit()
+    return items
+
+def _refresh_video(youtube_url, summary_length, languages, previous):
+    """Process a video whose metadata changed.
+
+    Metadata and captions are fetched again; when the captions are the same
+    as the stored ones, the stored summary is kept instead of asking for a
+    new one. `previous` is (stored transcript text, stored summary).
+    """
+    with priority('background'), trace('ingest_item', url=youtube_url):
+        video_info, segments = fetch_video_data(youtube_url, languages)
+    if segments and join_segments(segments) == previous[0]:
+        return video_info, segments, previous[1], None
+    return summarize_url(youtube_url, summary_length, languages, stored=(video_info, segments))
+
+def _previous_result(video_id, summary_length, languages=None):
+    transcript = VideoTranscript.query.filter_by(video_id=video_id, languages=languages).first()
+    summary = stored_summary(video_id, summary_length, languages)
+    if transcript is None or summary is None:
+        return None
+    return transcript.text(), Summary(summary.summary, summary.model)
+
+def ingest_video(app, youtube_url, video_id, change, summary_length, languages=None):
+    """Process one item in a worker thread, reading what is stored for it there.
+
+    Returns (summarize_url result, whether the video was fetched from YouTube).
+    """
+    if change != 'changed':
+        return summarize_video(app, youtube_url, video_id, summary_length, languages)
+    with app.app_context():
+        previous = _previous_result(video_id, summary_length, languages)
+    if previous is not None:
+        return _refresh_video(youtube_url, summary_length, languages, previous), True
+    return summarize_url(youtube_url, summary_length, languages), True
+
+def _commit(pending, run):
+    # Results and the item statuses they complete are committed together
+    run.updated_at = datetime.utcnow()
+    flush_results(pending, run.summary_length, run.languages)
+    db.session.commit()
+
+def process_items(run, concurrency=None, insert_size=None):
+    """Process the run's pending items, yielding a status dict per item as it finishes."""
+    items = IngestItem.query.filter_by(run_id=run.id, status='pending').order_by(IngestItem.position).all()
+    pending = []
+    executor = ThreadPoolExecutor(max_workers=concurrency or INGEST_CONCURRENCY, thread_name_prefix='ingest')
+    try:
+        # Stored transcripts and summaries are read by the workers, one item at a time
+        app = current_app._get_current_object()
+        futures = {}
+        for item in items:
+            youtube_url = f"https://www.youtube.com/watch?v={item.video_id}"
+            future = executor.submit(ingest_video, app, youtube_url, item.video_id, item.change,
+                                     run.summary_length, run.languages)
+            futures[future] = (item, youtube_url)
+
+        for future in as_completed(futures):
+            item, youtube_url = futures[future]
+            status = {'video_id': item.video_id, 'change': item.change}
+            item.updated_at = datetime.utcnow()
+            try:
+                (video_info, segments, summary, _), fetched = future.result()
+            except Exception as e:
+                logger.error(f"Error ingesting {youtube_url}: {str(e)}")
+                item.status = 'failed'
+                item.error = str(e)
+                yield {**status, 'status': 'failed', 'error': str(e)}
+                continue
+
+            item.status = 'done'
+            item.error = None
+            pending.append((VideoHistory(
+                video_url=youtube_url,
+                video_id=item.video_id,
+                video_title=video_info['title'],
+                video_duration=video_info['duration'],
+                video_thumbnail=video_info['thumbnail'],
+                summary_length=run.summary_length,
+                languages=run.languages
+            ), segments, summary, fetched))
+            if len(pending) >= (insert_size or BATCH_INSERT_SIZE):
+                _commit(pending, run)
+            yield {**status, 'status': 'completed', 'title': video_info['title']}
+    finally:
+        # Queued items are dropped; running ones finish their reads before the final commit
+        executor.shutdown(wait=True, cancel_futures=True)
+        _commit(pending, run)
+
+def run_status(run):
+    """Progress of an ingestion run: its items counted by change and by status."""
+    counts = db.session.query(IngestItem.change, IngestItem.status, func.count()).filter(
+        IngestItem.run_id == run.id
+    ).group_by(IngestItem.change, IngestItem.status).all()
+    changes, statuses = {}, {}
+    for change, status, count in counts:
+        changes[change] = changes.get(change, 0) + count
+        statuses[status] = statuses.get(status, 0) + count
+    return {
+        'run_id': run.id,
+        'source': run.source,
+        'source_url': run.source_url,
+        'status': run.status,
+        'summary_length': run.summary_length,
+        'languages': run.languages,
+        'videos': sum(changes.values()),
+        'changes': changes,
+        'items': statuses,
+        'created_at': run.created_at.isoformat() if run.created_at else None,
+        'updated_at': run.updated_at.isoformat() if run.updated_at else None
+    }
+
+def run_ingest(source_url, summary_length='medium', concurrency=None, languages=None, restart=False):
+    """Ingest a playlist or channel, yielding a status dict per listed page and processed video.
+
+    An unfinished run for the same source, summary length and languages is
+    resumed unless `restart` is set. A final dict with a 'summary' key
+    reports the run's totals.
+    """
+    kind, value = parse_source(source_url)
+    languages = language_key(languages)
+    source = f"{kind}:{value}"
+
+    run = None if restart else find_run(source, summary_length, languages)
+    resumed = run is not None
+    if run is None:
+        run = IngestRun(source=source, source_url=source_url, summary_length=summary_length, languages=languages,
+                        playlist_id=value if kind == 'playlist' else None, status='listing')
+        db.session.add(run)
+        db.session.commit()
+    yield {'run_id': run.id, 'source': source, 'resumed': resumed}
+
+    # Listing queues behind interactive requests for the YouTube quota, like batch items
+    if run.playlist_id is None:
+        with priority('background'):
+            run.playlist_id = get_uploads_playlist(kind, value)
+        db.session.commit()
+    while run.status == 'listing':
+        with priority('background'):
+            items = list_page(run)
+        yield {'listed': len(items), 'new': sum(item.change == 'new' for item in items),
+               'changed': sum(item.change == 'changed' for item in items)}
+
+    yield from process_items(run, concurrency)
+
+    run.status = 'completed'
+    run.updated_at = datetime.utcnow()
+    db.session.commit()
+    yield {'summary': run_status(run)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process the new and changed videos of a playlist or channel.")
+    parser.add_argument('url', help="Playlist or channel URL (/playlist?list=…, /channel/UC…, /@handle or /user/…)")
+    parser.add_argument('--summary-length', choices=['short', 'medium', 'long'], default='medium')
+    parser.add_argument('--concurrency', type=int, default=INGEST_CONCURRENCY)
+    parser.add_argument('--languages', help="Preferred transcript languages, comma-separated (e.g. 'de,en')")
+    parser.add_argument('--restart', action='store_true', help="Start a new run instead of resuming an unfinished one")
+    args = parser.parse_args(argv)
+    try:
+        parse_concurrency(args.concurrency)
+    except ValueError as e:
+        parser.error(str(e))
+
+    from app import app, configure_logging
+
+    configure_logging()
+    with app.app_context():
+        for status in run_ingest(args.url, args.summary_length, args.concurrency, args.languages, args.restart):
+            print(json.dumps(status), flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import threading
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from models import ProcessingJob
+from db import db
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue already holds its maximum number of pending jobs."""
+
+
+class JobQueue:
+    """Bounded local worker pool for processing jobs.
+
+    Jobs are recorded in the ProcessingJob table so any web worker can report
+    their status, while the work itself runs on a thread pool inside the
+    process that accepted the job. No external broker is required.
+    """
+
+    def __init__(self, app, handler, max_workers=4, max_pending=100):
+        self.app = app
+        self.handler = handler
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-worker')
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, youtube_url, video_id, summary_length, languages=None):
+        """Record a new job and schedule it on the worker pool."""
+        with self._lock:
+            if len(self._futures) >= self.max_pending:
+                raise QueueFullError("Too many videos are being processed. Please try again shortly.")
+
+            job = ProcessingJob(
+                id=uuid.uuid4().hex,
+                video_url=youtube_url,
+                video_id=video_id,
+                summary_length=summary_length,
+                languages=languages,
+                status='queued',
+                stage='queued'
+            )
+            db.session.add(job)
+            db.session.commit()
+
+            self._futures[job.id] = self._executor.submit(self._run, job.id)
+        return job
+
+    def _run(self, job_id):
+        try:
+            with self.app.app_context():
+                self.handler(job_id)
+        except Exception as e:
+            logger.error(f"Unhandled error in job {job_id}: {str(e)}")
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+
+    def pending(self):
+        """Return the number of jobs queued or running in this process."""
+        with self._lock:
+            return len(self._futures)
+
+    def wait(self, job_id, timeout=None):
+        """Block until the given job finishes in this process."""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
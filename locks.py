@@ -0,0 +1,131 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+import logging
+from contextlib import contextmanager, asynccontextmanager
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from models import ProcessingLock
+from db import db, run_sync
+
+logger = logging.getLogger(__name__)
+
+# A lock whose holder died is taken over once it is older than the TTL. A
+# live holder renews its lock every third of the TTL, however long it runs.
+LOCK_TTL_SECONDS = int(os.environ.get("PROCESSING_LOCK_TTL_SECONDS", 600))
+LOCK_WAIT_SECONDS = int(os.environ.get("PROCESSING_LOCK_WAIT_SECONDS", 300))
+LOCK_POLL_SECONDS = float(os.environ.get("PROCESSING_LOCK_POLL_SECONDS", 0.5))
+
+
+class LockTimeout(Exception):
+    """Raised when a processing lock is not acquired within the wait limit."""
+
+
+def try_acquire(name, owner, ttl=None):
+    """Insert the lock row, replacing it if expired. Returns True if acquired."""
+    now = datetime.utcnow()
+    ProcessingLock.query.filter(ProcessingLock.name == name, ProcessingLock.expires_at < now).delete()
+    db.session.add(ProcessingLock(name=name, owner=owner, expires_at=now + timedelta(seconds=ttl or LOCK_TTL_SECONDS)))
+    try:
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+def release(name, owner):
+    try:
+        ProcessingLock.query.filter_by(name=name, owner=owner).delete()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error releasing lock {name}, it will expire after its TTL: {str(e)}")
+
+def renew(name, owner, ttl=None):
+    """Push back the expiry of a lock owner still holds. Returns False if the lock was lost."""
+    try:
+        renewed = ProcessingLock.query.filter_by(name=name, owner=owner).update(
+            {'expires_at': datetime.utcnow() + timedelta(seconds=ttl or LOCK_TTL_SECONDS)}
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error renewing lock {name}: {str(e)}")
+        return True
+    if not renewed:
+        logger.warning(f"Lock {name} expired and was taken over while still held")
+    return bool(renewed)
+
+@contextmanager
+def heartbeat(name, owner, ttl=None):
+    """Renew a held lock from a background thread, in its own app context, until the block exits."""
+    app = current_app._get_current_object()
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait((ttl or LOCK_TTL_SECONDS) / 3):
+            with app.app_context():
+                if not renew(name, owner, ttl):
+                    return
+
+    thread = threading.Thread(target=beat, name=f'lock-heartbeat-{name}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+async def heartbeat_async(app, name, owner, ttl=None):
+    """Async version of heartbeat, run as a task that is cancelled when the lock is released."""
+    while True:
+        await asyncio.sleep((ttl or LOCK_TTL_SECONDS) / 3)
+        if not await run_sync(app, renew, name, owner, ttl):
+            return
+
+@contextmanager
+def processing_lock(name, ttl=None, timeout=None, poll=None):
+    """Hold a cross-process lock stored in the processing_lock table.
+
+    Yields True if another holder had to be waited for, so the caller can
+    look for the work it just finished instead of repeating it.
+    """
+    owner = uuid.uuid4().hex
+    deadline = time.monotonic() + (LOCK_WAIT_SECONDS if timeout is None else timeout)
+    waited = False
+    while not try_acquire(name, owner, ttl):
+        waited = True
+        if time.monotonic() >= deadline:
+            raise LockTimeout(f"Timed out waiting for lock {name}")
+        time.sleep(LOCK_POLL_SECONDS if poll is None else poll)
+
+    try:
+        with heartbeat(name, owner, ttl):
+            yield waited
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        release(name, owner)
+
+@asynccontextmanager
+async def processing_lock_async(app, name, ttl=None, timeout=None, poll=None):
+    """Async version of processing_lock; polls without holding a thread."""
+    owner = uuid.uuid4().hex
+    deadline = time.monotonic() + (LOCK_WAIT_SECONDS if timeout is None else timeout)
+    waited = False
+    while not await run_sync(app, try_acquire, name, owner, ttl):
+        waited = True
+        if time.monotonic() >= deadline:
+            raise LockTimeout(f"Timed out waiting for lock {name}")
+        await asyncio.sleep(LOCK_POLL_SECONDS if poll is None else poll)
+
+    renewing = asyncio.create_task(heartbeat_async(app, name, owner, ttl))
+    try:
+        yield waited
+    finally:
+        renewing.cancel()
+        await asyncio.shield(run_sync(app, release, name, owner))
@@ -1,4 +1,6 @@
-from app import app
+from app import app, configure_logging
+
+configure_logging()
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,205 @@
+"""Bring an existing database up to the current models.
+
+`db.create_all()` only creates missing tables. Tables that already exist in
+a deployment keep the columns they were created with, so every column and
+index added to a model since then is applied here, by `flask --app main
+init-db`. Only additive changes are made: nullable columns, indexes, and
+unique constraints (as unique indexes). Anything else is reported for the
+operator to resolve by hand, and `init-db --check` only reports.
+"""
+import logging
+import warnings
+from sqlalchemy import Column, inspect, text
+from sqlalchemy.exc import SAWarning
+from utils.youtube import extract_video_id
+from db import db
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 500
+
+# Unique indexes over coalesce(languages, ''), by name: (table, the other key
+# columns, (table, column) rows that reference it). Rows saved for the
+# default preference (NULL languages) before the index existed may repeat a
+# key; the newest is kept and references are moved to it.
+DEFAULT_LANGUAGE_KEYS = {
+    'uq_video_transcript_language_key': ('video_transcript', ('video_id',), None),
+    'uq_video_summary_language_key': ('video_summary', ('video_id', 'summary_length', 'model', 'prompt_version'),
+                                      ('video_history', 'summary_id')),
+    'uq_video_embedding_language_key': ('video_embedding', ('video_id', 'model'), None),
+}
+
+def _column_ddl(column, dialect):
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+    foreign_keys = list(column.foreign_keys)
+    if len(foreign_keys) == 1:
+        target = foreign_keys[0].column
+        ddl += f" REFERENCES {target.table.name} ({target.name})"
+    return ddl
+
+def _table_indexes(table):
+    """Indexes the model declares by name, as (columns, unique, Index or None for a unique constraint).
+
+    Expression indexes have columns None: not every database reflects them,
+    so only their name is compared.
+    """
+    indexes = {}
+    for index in table.indexes:
+        expression = any(not isinstance(element, Column) for element in index.expressions)
+        indexes[index.name] = (None if expression else list(index.columns.keys()), bool(index.unique), index)
+    for constraint in table.constraints:
+        if isinstance(constraint, db.UniqueConstraint) and constraint.name:
+            indexes[constraint.name] = (list(constraint.columns.keys()), True, None)
+    return indexes
+
+def _existing_indexes(connection, table_name):
+    inspector = inspect(connection)
+    with warnings.catch_warnings():
+        # SQLite skips expression indexes with a warning; their names are read below
+        warnings.simplefilter('ignore', SAWarning)
+        indexes = {index['name']: (index['column_names'], bool(index['unique']))
+                   for index in inspector.get_indexes(table_name)}
+        for constraint in inspector.get_unique_constraints(table_name):
+            if constraint['name']:
+                indexes[constraint['name']] = (constraint['column_names'], True)
+    if connection.dialect.name == 'sqlite':
+        for (name,) in connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table_name,)):
+            indexes.setdefault(name, (None, None))
+    return indexes
+
+def schema_differences(connection):
+    """Compare the database with the models.
+
+    Returns a list of (kind, table, name, detail) tuples, kind being
+    'table', 'column', 'index' or 'unsupported'.
+    """
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    differences = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            differences.append(('table', table.name, table.name, None))
+            continue
+
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                differences.append(('unsupported', table.name, column.name,
+                                    'NOT NULL column without a server default'))
+            else:
+                differences.append(('column', table.name, column.name, column))
+
+        indexes = _existing_indexes(connection, table.name)
+        for name, (columns, unique, index) in _table_indexes(table).items():
+            if columns is None and name in indexes:
+                continue
+            if indexes.get(name) != (columns, unique):
+                differences.append(('index', table.name, name, (columns, unique, index)))
+    return differences
+
+def describe_difference(kind, table_name, name, detail):
+    """A schema_differences entry as a line for the operator."""
+    if kind == 'table':
+        return f"table {table_name} is missing"
+    if kind == 'column':
+        return f"column {table_name}.{name} is missing"
+    if kind == 'index':
+        return f"index {name} on {table_name} is missing or differs"
+    return f"column {table_name}.{name} is missing and cannot be added: {detail}"
+
+def check_schema():
+    """How the database differs from the models, as lines for the operator; empty when they match."""
+    with db.engine.connect() as connection:
+        return [describe_difference(*difference) for difference in schema_differences(connection)]
+
+def dedupe_default_languages(connection, name):
+    """Remove rows that repeat a DEFAULT_LANGUAGE_KEYS key for the default preference. Returns the count."""
+    table_name, key, reference = DEFAULT_LANGUAGE_KEYS[name]
+    rows = connection.execute(text(
+        f"SELECT id, {', '.join(key)} FROM {table_name} WHERE languages IS NULL ORDER BY id"
+    )).all()
+    newest = {}
+    for row in rows:
+        newest[tuple(row[1:])] = row[0]
+    duplicates = [(row[0], newest[tuple(row[1:])]) for row in rows if newest[tuple(row[1:])] != row[0]]
+    if reference is not None:
+        referencing_table, column = reference
+        if column not in {existing['name'] for existing in inspect(connection).get_columns(referencing_table)}:
+            reference = None
+    for row_id, kept_id in duplicates:
+        if reference is not None:
+            connection.execute(text(f"UPDATE {referencing_table} SET {column} = :kept WHERE {column} = :id"),
+                               {'kept': kept_id, 'id': row_id})
+        connection.execute(text(f"DELETE FROM {table_name} WHERE id = :id"), {'id': row_id})
+    return len(duplicates)
+
+def backfill_video_ids(connection):
+    """Fill video_history.video_id on rows saved before the column existed, from their URLs."""
+    updated = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(text(
+            "SELECT id, video_url FROM video_history WHERE video_id IS NULL AND id > :last_id ORDER BY id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': BACKFILL_BATCH_SIZE}).all()
+        if not rows:
+            return updated
+        for row_id, video_url in rows:
+            try:
+                video_id = extract_video_id(video_url)
+            except (ValueError, KeyError, IndexError):
+                logger.warning(f"Cannot backfill video_id of history row {row_id} from {video_url}")
+                continue
+            connection.execute(text("UPDATE video_history SET video_id = :video_id WHERE id = :id"),
+                               {'video_id': video_id, 'id': row_id})
+            updated += 1
+        last_id = rows[-1][0]
+
+def upgrade_schema():
+    """Create missing tables, add missing columns and indexes, and backfill new columns.
+
+    Returns (applied, unresolved): the changes made, and the differences
+    from the models that remain once they are, as human-readable lines.
+    """
+    db.create_all()
+    applied = []
+    with db.engine.begin() as connection:
+        dialect = connection.dialect
+        for kind, table_name, name, detail in schema_differences(connection):
+            if kind == 'column':
+                connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {_column_ddl(detail, dialect)}"))
+                applied.append(f"added column {table_name}.{name}")
+            elif kind == 'index':
+                columns, unique, index = detail
+                # An index over a column that could not be added is left to the report below
+                needed = index.columns.keys() if index is not None else columns
+                if not set(needed) <= {column['name'] for column in inspect(connection).get_columns(table_name)}:
+                    continue
+                if name in _existing_indexes(connection, table_name):
+                    connection.execute(text(f"DROP INDEX {name}"))
+                if name in DEFAULT_LANGUAGE_KEYS:
+                    removed = dedupe_default_languages(connection, name)
+                    if removed:
+                        applied.append(f"removed {removed} duplicate {table_name} rows for the default languages")
+                if index is not None:
+                    index.create(connection)
+                else:
+                    connection.execute(text(
+                        f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table_name} ({', '.join(columns)})"
+                    ))
+                applied.append(f"created index {name} on {table_name}")
+
+        # Cache and history lookups match on video_id, so older rows need it too
+        if 'video_history' in inspect(connection).get_table_names():
+            backfilled = backfill_video_ids(connection)
+            if backfilled:
+                applied.append(f"backfilled video_id on {backfilled} history rows")
+
+        # Compare again rather than assume every change took
+        unresolved = [describe_difference(*difference) for difference in schema_differences(connection)]
+
+    for change in applied:
+        logger.info(f"Schema upgrade: {change}")
+    return applied, unresolved
@@ -1,13 +1,218 @@
 from datetime import datetime
+from sqlalchemy import DDL, event, func
+from sqlalchemy.orm import deferred
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from db import db
+from utils.segments import PackedTranscript, pack_segments, TRANSCRIPT_CODEC
 
 class VideoHistory(db.Model):
+    # Keyset pagination walks (created_at, id) newest first; cache lookups
+    # filter on video_id and summary_length and take the newest row.
+    __table_args__ = (
+        db.Index('ix_video_history_created_at_id', 'created_at', 'id'),
+        db.Index('ix_video_history_video_id_length_created_at', 'video_id', 'summary_length', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     video_url = db.Column(db.String(255), nullable=False)
+    video_id = db.Column(db.String(20), index=True)
     video_title = db.Column(db.String(255))
     video_duration = db.Column(db.String(50))
     video_thumbnail = db.Column(db.String(255))
-    transcript = db.Column(db.Text)
-    summary = db.Column(db.Text)
+    # Large text columns are only loaded when accessed
+    transcript = deferred(db.Column(db.Text))  # only set on rows saved before VideoTranscript existed
+    summary = deferred(db.Column(db.Text))  # only set on rows saved before VideoSummary existed
     summary_length = db.Column(db.String(20))  # 'short', 'medium', or 'long'
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    languages = db.Column(db.String(80))  # transcript language preference, None for the default
+    summary_id = db.Column(db.Integer, db.ForeignKey('video_summary.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    stored_summary = db.relationship('VideoSummary')
+    stored_transcript = db.relationship(
+        'VideoTranscript',
+        # NULL languages (the default preference) must match NULL, hence coalesce
+        primaryjoin="and_(foreign(VideoHistory.video_id) == VideoTranscript.video_id, "
+                    "func.coalesce(foreign(VideoHistory.languages), '') == func.coalesce(VideoTranscript.languages, ''))",
+        uselist=False,
+        viewonly=True
+    )
+
+    @property
+    def transcript_text(self):
+        """Full transcript text, from the segment store or the legacy column."""
+        if self.transcript is not None:
+            return self.transcript
+        if self.stored_transcript is not None:
+            return self.stored_transcript.text()
+        return None
+
+    @property
+    def summary_text(self):
+        """Summary text, from the summary store or the legacy column."""
+        if self.summary is not None:
+            return self.summary
+        if self.stored_summary is not None:
+            return self.stored_summary.summary
+        return None
+
+class VideoTranscript(db.Model):
+    """Timestamped transcript segments stored once per video and language preference in packed form (see utils.segments)."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    video_id = db.Column(db.String(20), nullable=False, index=True)
+    languages = db.Column(db.String(80))  # preference it was fetched for, None for the default
+    segment_count = db.Column(db.Integer, nullable=False)
+    codec = db.Column(db.String(10), nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def set_segments(self, segments):
+        self.data = pack_segments(segments, TRANSCRIPT_CODEC)
+        self.segment_count = len(segments)
+        self.codec = TRANSCRIPT_CODEC
+        self.updated_at = datetime.utcnow()
+
+    def packed(self):
+        return PackedTranscript(self.data)
+
+    def segments(self):
+        return self.packed().segments()
+
+    def text(self):
+        return self.packed().full_text()
+
+# One row per video and preference. NULL (the default preference) counts as a
+# value, which a plain unique constraint would not enforce.
+db.Index('uq_video_transcript_language_key', VideoTranscript.video_id,
+         func.coalesce(VideoTranscript.languages, ''), unique=True)
+
+class VideoSummary(db.Model):
+    """One summary per video, length, language preference, model and prompt version.
+
+    Summarizing a stored video again with another length, model or prompt
+    only adds a row here; the transcript is read back from VideoTranscript.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    video_id = db.Column(db.String(20), nullable=False, index=True)
+    summary_length = db.Column(db.String(20), nullable=False)
+    languages = db.Column(db.String(80))  # transcript language preference, None for the default
+    model = db.Column(db.String(50), nullable=False)
+    prompt_version = db.Column(db.String(20), nullable=False)
+    summary = db.Column(db.Text, nullable=False)
+    fallback = db.Column(db.Boolean, default=False)  # written by the fallback backend after the primary failed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+db.Index('uq_video_summary_language_key', VideoSummary.video_id, VideoSummary.summary_length,
+         func.coalesce(VideoSummary.languages, ''), VideoSummary.model, VideoSummary.prompt_version, unique=True)
+
+class VideoEmbedding(db.Model):
+    """Chunk embeddings of a stored transcript, for answering questions about the video (see qa.py).
+
+    `bounds` holds the segment index each chunk starts at (packed uint32,
+    plus the segment count), so chunk text is read back from VideoTranscript;
+    `vectors` holds one float32 row of `dimensions` values per chunk.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    video_id = db.Column(db.String(20), nullable=False, index=True)
+    languages = db.Column(db.String(80))  # transcript language preference, None for the default
+    model = db.Column(db.String(80), nullable=False)
+    dimensions = db.Column(db.Integer, nullable=False)
+    chunk_count = db.Column(db.Integer, nullable=False)
+    bounds = db.Column(db.LargeBinary, nullable=False)
+    vectors = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+db.Index('uq_video_embedding_language_key', VideoEmbedding.video_id, func.coalesce(VideoEmbedding.languages, ''),
+         VideoEmbedding.model, unique=True)
+
+class ProcessingJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    video_url = db.Column(db.String(255), nullable=False)
+    video_id = db.Column(db.String(20))
+    summary_length = db.Column(db.String(20))
+    languages = db.Column(db.String(80))
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'completed' or 'failed'
+    stage = db.Column(db.String(30), default='queued')
+    error = db.Column(db.Text)
+    preprocessing = db.Column(db.JSON)  # prepare_transcript's report, when this job ran the summary itself
+    history_id = db.Column(db.Integer, db.ForeignKey('video_history.id'))
+    history = db.relationship('VideoHistory')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class IngestRun(db.Model):
+    """One ingestion of a playlist or channel (see ingest.py).
+
+    `page_token` and the run's IngestItem rows are its checkpoint: an
+    interrupted run picks up listing at the saved page and processing at
+    the first item not yet done.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(120), nullable=False, index=True)  # 'playlist:PL…', 'channel:UC…', 'handle:@name'
+    source_url = db.Column(db.String(255), nullable=False)
+    playlist_id = db.Column(db.String(64))  # the playlist listed; a channel's uploads playlist
+    summary_length = db.Column(db.String(20), nullable=False)
+    languages = db.Column(db.String(80))
+    status = db.Column(db.String(20), nullable=False, default='listing')  # 'listing', 'processing' or 'completed'
+    page_token = db.Column(db.String(120))  # next playlist page to list
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    items = db.relationship('IngestItem', back_populates='run', order_by='IngestItem.position')
+
+class IngestItem(db.Model):
+    """A video listed by an IngestRun, with the metadata ETag it was compared by."""
+    __table_args__ = (
+        db.UniqueConstraint('run_id', 'video_id', name='uq_ingest_item_run_video'),
+        db.Index('ix_ingest_item_video_id_status', 'video_id', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('ingest_run.id'), nullable=False)
+    video_id = db.Column(db.String(20), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    etag = db.Column(db.String(80))  # None when the video is private or deleted
+    change = db.Column(db.String(20), nullable=False)  # 'new', 'changed', 'unchanged' or 'unavailable'
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'done', 'failed' or 'skipped'
+    error = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    run = db.relationship('IngestRun', back_populates='items')
+
+class ProcessingLock(db.Model):
+    """Named lock shared by every worker process; see locks.py."""
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(32), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class SearchDocument(db.Model):
+    """One full-text search entry per processed video.
+
+    On PostgreSQL the text is indexed through the weighted search_vector
+    column and a GIN index; on SQLite it is mirrored into the search_fts
+    FTS5 table. See search.py.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    video_id = db.Column(db.String(20), nullable=False, unique=True, index=True)
+    title = db.Column(db.String(255))
+    thumbnail = db.Column(db.String(255))
+    summary = db.Column(db.Text)
+    search_vector = db.Column(db.Text().with_variant(TSVECTOR(), 'postgresql'))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def _sqlite_has_fts5(ddl, target, bind, **kw):
+    options = [row[0] for row in bind.exec_driver_sql("PRAGMA compile_options")]
+    return 'ENABLE_FTS5' in options
+
+event.listen(
+    SearchDocument.__table__,
+    'after_create',
+    DDL("CREATE INDEX IF NOT EXISTS ix_search_document_search_vector ON search_document USING gin (search_vector)")
+    .execute_if(dialect='postgresql')
+)
+event.listen(
+    SearchDocument.__table__,
+    'after_create',
+    DDL("CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(title, summary, transcript, tokenize='porter unicode61')")
+    .execute_if(dialect='sqlite', callable_=_sqlite_has_fts5)
+)
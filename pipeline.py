@@ -0,0 +1,725 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_EXCEPTION
+from datetime import datetime, timedelta
+from sqlalchemy.orm import undefer, load_only
+from utils.youtube import get_video_segments, get_video_info, join_segments, get_video_info_async, get_video_segments_async
+from utils.summarizer import (
+    generate_summary, stream_summary, generate_summary_async, stream_summary_async, summary_models, summary_source,
+    join_summary, SUMMARY_PROMPT_VERSION
+)
+from utils.preprocess import prepare_transcript
+from utils.breaker import CircuitOpen
+from utils.ratelimit import wait_for_capacity
+from utils.tracing import trace, span, propagate, stage_seconds
+from utils.cache import ResultCache
+from utils.singleflight import SingleFlight
+from models import VideoHistory, VideoTranscript, VideoSummary, ProcessingJob
+from search import index_video
+from locks import processing_lock, processing_lock_async, LOCK_WAIT_SECONDS
+from db import db, run_sync
+
+logger = logging.getLogger(__name__)
+
+# Result cache settings. The in-process tier is an LRU bounded by
+# CACHE_MAX_ENTRIES with a per-entry TTL; the database tier reuses rows in
+# VideoHistory no older than CACHE_DB_TTL_SECONDS (0 disables the age limit).
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 256))
+CACHE_TTL_SECONDS = int(os.environ.get("CACHE_TTL_SECONDS", 3600))
+CACHE_DB_TTL_SECONDS = int(os.environ.get("CACHE_DB_TTL_SECONDS", 0))
+
+# Pipeline stages in the order they run, as reported on ProcessingJob.stage
+STAGES = ('queued', 'fetching', 'summarizing', 'saving', 'done')
+
+# Metadata and transcript are fetched side by side on this pool, so each
+# pipeline run holds two slots while it waits on YouTube.
+FETCH_WORKERS = int(os.environ.get("FETCH_WORKERS", 8))
+fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='fetch')
+
+def history_video_info(history):
+    return {
+        'title': history.video_title,
+        'duration': history.video_duration,
+        'thumbnail': history.video_thumbnail
+    }
+
+def history_result(history):
+    """Build the /process response payload from a VideoHistory row."""
+    return {
+        'video_info': history_video_info(history),
+        'transcript': history.transcript_text,
+        'summary': history.summary_text
+    }
+
+def result_key(video_id, summary_length, languages=None):
+    """Cache, single-flight and lock key for one result.
+
+    Results for the default language preference keep the plain
+    (video_id, summary_length) key, so rows saved before language
+    preferences existed are still found.
+    """
+    if languages is None:
+        return (video_id, summary_length)
+    return (video_id, summary_length, languages)
+
+def _db_cutoff():
+    if CACHE_DB_TTL_SECONDS:
+        return datetime.utcnow() - timedelta(seconds=CACHE_DB_TTL_SECONDS)
+    return None
+
+def stored_video_info(video_id):
+    """Video information from the newest history row of a video, or None."""
+    history = VideoHistory.query.options(load_only(
+        VideoHistory.video_title, VideoHistory.video_duration, VideoHistory.video_thumbnail
+    )).filter(
+        VideoHistory.video_id == video_id,
+        VideoHistory.video_title.isnot(None)
+    ).order_by(VideoHistory.created_at.desc()).first()
+    return None if history is None else history_video_info(history)
+
+def stored_video_data(video_id, languages=None):
+    """Video information and transcript segments saved by an earlier run, or None.
+
+    Summarizing a stored video again (another length, model or prompt
+    version) starts from these instead of fetching from YouTube.
+    """
+    with span('transcript_lookup'):
+        transcript = VideoTranscript.query.filter_by(video_id=video_id, languages=languages).first()
+        if transcript is None:
+            return None
+        video_info = stored_video_info(video_id)
+        if video_info is None:
+            return None
+        return video_info, transcript.segments()
+
+def stored_summary(video_id, summary_length, languages=None):
+    """Newest VideoSummary for the key written by the current models and prompt version, not by a fallback."""
+    query = VideoSummary.query.filter_by(
+        video_id=video_id,
+        summary_length=summary_length,
+        languages=languages,
+        prompt_version=SUMMARY_PROMPT_VERSION
+    ).filter(VideoSummary.model.in_(summary_models()), VideoSummary.fallback.isnot(True))
+    cutoff = _db_cutoff()
+    if cutoff is not None:
+        query = query.filter(VideoSummary.created_at >= cutoff)
+    return query.order_by(VideoSummary.created_at.desc()).first()
+
+def store_summaries(summaries_by_video, summary_length, languages=None):
+    """Add or replace VideoSummary rows for {video_id: summary} in the current session.
+
+    Rows are keyed by the model that wrote each summary (see
+    summary_source) and the current prompt version. Returns the records by
+    video ID.
+    """
+    sources = {video_id: summary_source(summary) for video_id, summary in summaries_by_video.items()}
+    existing = {
+        (record.video_id, record.model): record
+        for record in VideoSummary.query.filter(
+            VideoSummary.video_id.in_(list(summaries_by_video)),
+            VideoSummary.summary_length == summary_length,
+            VideoSummary.languages == languages,
+            VideoSummary.model.in_({model for model, _ in sources.values()}),
+            VideoSummary.prompt_version == SUMMARY_PROMPT_VERSION
+        )
+    }
+    records = {}
+    for video_id, summary in summaries_by_video.items():
+        model, fallback = sources[video_id]
+        record = existing.get((video_id, model))
+        if record is None:
+            record = existing[video_id, model] = VideoSummary(
+                video_id=video_id,
+                summary_length=summary_length,
+                languages=languages,
+                model=model,
+                prompt_version=SUMMARY_PROMPT_VERSION
+            )
+            db.session.add(record)
+        record.summary = str(summary)
+        record.fallback = fallback
+        record.created_at = datetime.utcnow()
+        records[video_id] = record
+    return records
+
+def lookup_history_result(key):
+    """Load a previously processed result for a result_key from the database.
+
+    Summaries come from VideoSummary for the current model and prompt
+    version, with the stored transcript; history rows saved before
+    VideoSummary existed are used otherwise.
+    """
+    video_id, summary_length, *rest = key
+    languages = rest[0] if rest else None
+    summary = stored_summary(video_id, summary_length, languages)
+    if summary is not None:
+        transcript = VideoTranscript.query.filter_by(video_id=video_id, languages=languages).first()
+        video_info = stored_video_info(video_id)
+        if transcript is not None and video_info is not None:
+            return {'video_info': video_info, 'transcript': transcript.text(), 'summary': summary.summary}
+
+    query = VideoHistory.query.options(undefer(VideoHistory.summary), undefer(VideoHistory.transcript)).filter_by(
+        video_id=video_id, summary_length=summary_length, languages=languages, summary_id=None
+    )
+    cutoff = _db_cutoff()
+    if cutoff is not None:
+        query = query.filter(VideoHistory.created_at >= cutoff)
+
+    history = query.order_by(VideoHistory.created_at.desc()).first()
+    if history is None or not history.summary:
+        return None
+
+    result = history_result(history)
+    if not result['transcript']:
+        return None
+    return result
+
+result_cache = ResultCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    ttl_seconds=CACHE_TTL_SECONDS,
+    backing_lookup=lookup_history_result
+)
+
+def _fetch_info(youtube_url):
+    with span('metadata_fetch'):
+        return get_video_info(youtube_url)
+
+def _fetch_segments(youtube_url, languages=None):
+    with span('transcript_fetch'):
+        return get_video_segments(youtube_url, languages)
+
+def _submit_fetches(youtube_url, languages=None):
+    return (
+        fetch_executor.submit(propagate(_fetch_info), youtube_url),
+        fetch_executor.submit(propagate(_fetch_segments), youtube_url, languages)
+    )
+
+def fetch_video_data(youtube_url, languages=None):
+    """Fetch video information and transcript segments concurrently.
+
+    The critical path is the slower of the two calls rather than their sum.
+    If either call fails, the other is cancelled when it has not started yet
+    and its result is discarded otherwise, so the error surfaces immediately.
+    """
+    info_future, transcript_future = _submit_fetches(youtube_url, languages)
+
+    done, pending = wait((info_future, transcript_future), return_when=FIRST_EXCEPTION)
+    for future in done:
+        if future.exception() is not None:
+            for other in pending:
+                other.cancel()
+            raise future.exception()
+
+    return info_future.result(), transcript_future.result()
+
+def store_transcripts(segments_by_video, languages=None):
+    """Add or refresh packed transcripts for {video_id: segments} in the current session."""
+    existing = {
+        record.video_id: record
+        for record in VideoTranscript.query.filter(
+            VideoTranscript.video_id.in_(list(segments_by_video)),
+            VideoTranscript.languages == languages
+        )
+    }
+    for video_id, segments in segments_by_video.items():
+        record = existing.get(video_id)
+        if record is None:
+            record = VideoTranscript(video_id=video_id, languages=languages)
+            db.session.add(record)
+        record.set_segments(segments)
+
+def save_result(youtube_url, video_id, summary_length, video_info, segments, summary, transcript=None,
+                languages=None, store_transcript=True):
+    """Save a processed video to history and the result cache.
+
+    The transcript is stored once per video and language preference as
+    packed segments (pass store_transcript=False when it was read from
+    there), the summary once per key in VideoSummary; history rows only
+    keep metadata and point at the summary. A summary from the fallback
+    backend is returned marked as degraded but not cached, so the next
+    request for the key asks the primary backend again.
+    """
+    transcript = transcript if transcript is not None else join_segments(segments)
+    with span('db_commit'):
+        if store_transcript:
+            store_transcripts({video_id: segments}, languages)
+        history = VideoHistory(
+            video_url=youtube_url,
+            video_id=video_id,
+            video_title=video_info['title'],
+            video_duration=video_info['duration'],
+            video_thumbnail=video_info['thumbnail'],
+            summary_length=summary_length,
+            languages=languages,
+            stored_summary=store_summaries({video_id: summary}, summary_length, languages)[video_id]
+        )
+        index_video(video_id, video_info['title'], video_info['thumbnail'], summary, transcript)
+        db.session.add(history)
+        db.session.commit()
+
+    result = {
+        'video_info': video_info,
+        'transcript': transcript,
+        'summary': summary
+    }
+    if history.stored_summary.fallback:
+        result['degraded'] = {'summary': 'fallback', 'model': history.stored_summary.model}
+    else:
+        result_cache.set(result_key(video_id, summary_length, languages), result)
+    return history, result
+
+def stale_summary(video_id, summary_length, languages=None):
+    """Newest VideoSummary for the key written by any model or prompt version, or None."""
+    return VideoSummary.query.filter_by(
+        video_id=video_id, summary_length=summary_length, languages=languages
+    ).order_by(VideoSummary.created_at.desc()).first()
+
+def save_degraded_result(youtube_url, video_id, summary_length, video_info, segments, error, transcript=None,
+                         languages=None, store_transcript=True):
+    """Save a run whose summary was skipped because the summarizer's circuit is open.
+
+    The transcript is still stored, so the next run only has to summarize,
+    and the history row points at the newest summary stored for the key by
+    any model or prompt version, if there is one. Nothing is cached, so the
+    next request for the key tries the summarizer again.
+    """
+    transcript = transcript if transcript is not None else join_segments(segments)
+    with span('db_commit'):
+        if store_transcript:
+            store_transcripts({video_id: segments}, languages)
+        stale = stale_summary(video_id, summary_length, languages)
+        history = VideoHistory(
+            video_url=youtube_url,
+            video_id=video_id,
+            video_title=video_info['title'],
+            video_duration=video_info['duration'],
+            video_thumbnail=video_info['thumbnail'],
+            summary_length=summary_length,
+            languages=languages,
+            stored_summary=stale
+        )
+        db.session.add(history)
+        db.session.commit()
+
+    logger.error(f"Saved {video_id} without a fresh summary: {str(error)}")
+    result = {
+        'video_info': video_info,
+        'transcript': transcript,
+        'summary': stale.summary if stale is not None else None,
+        'degraded': {
+            'summary': 'unavailable' if stale is None else 'stale',
+            'dependency': error.dependency,
+            'retry_after': round(error.retry_after, 1)
+        }
+    }
+    return history, result
+
+def history_degraded(history):
+    """The 'degraded' entry for a history row saved by save_degraded_result or with a fallback summary, else None."""
+    if history.summary is not None:
+        return None
+    record = history.stored_summary
+    if record is None:
+        return {'summary': 'unavailable'}
+    if record.prompt_version == SUMMARY_PROMPT_VERSION and record.fallback:
+        return {'summary': 'fallback', 'model': record.model}
+    if record.model not in summary_models() or record.prompt_version != SUMMARY_PROMPT_VERSION:
+        return {'summary': 'stale'}
+    return None
+
+# Concurrent requests for the same result_key share one run
+inflight = SingleFlight()
+
+def lock_name(video_id, summary_length, languages=None):
+    return ':'.join(('process',) + result_key(video_id, summary_length, languages))
+
+def finished_since(video_id, summary_length, since, languages=None):
+    """History row saved for the key after `since`, by whoever held the lock."""
+    return VideoHistory.query.filter(
+        VideoHistory.video_id == video_id,
+        VideoHistory.summary_length == summary_length,
+        VideoHistory.languages == languages,
+        VideoHistory.created_at >= since
+    ).order_by(VideoHistory.created_at.desc()).first()
+
+def _process_exclusive(youtube_url, video_id, summary_length, report, languages=None):
+    started = datetime.utcnow()
+    with processing_lock(lock_name(video_id, summary_length, languages)) as waited:
+        # Another worker process may have just finished the same video
+        if waited:
+            history = finished_since(video_id, summary_length, started, languages)
+            if history is not None:
+                return history.id, history_result(history)
+
+        # Get video information and transcript, unless an earlier run stored them
+        stored = stored_video_data(video_id, languages)
+        if stored is not None:
+            video_info, segments = stored
+        else:
+            report('fetching')
+            video_info, segments = fetch_video_data(youtube_url, languages)
+        if not segments:
+            raise ValueError('Could not extract transcript from the video')
+
+        # Generate summary from the cleaned captions, chunking long transcripts on segment boundaries
+        report('summarizing')
+        texts, preprocessing = prepare_transcript(segments)
+        try:
+            with span('summary'):
+                summary = generate_summary(texts, summary_length)
+        except CircuitOpen as e:
+            # The summarizer is down: keep the transcript and answer without a fresh summary
+            report('saving', preprocessing)
+            history, result = save_degraded_result(youtube_url, video_id, summary_length, video_info, segments, e,
+                                                   languages=languages, store_transcript=stored is None)
+            return history.id, result
+
+        # Save to history
+        report('saving', preprocessing)
+        history, result = save_result(youtube_url, video_id, summary_length, video_info, segments, summary,
+                                      languages=languages, store_transcript=stored is None)
+        return history.id, result
+
+def process_video(youtube_url, video_id, summary_length, progress=None, languages=None):
+    """Fetch metadata and transcript, summarize, and save the result to history.
+
+    `languages` is the transcript language preference as stored by
+    utils.youtube.language_key, None for the default. `progress` is called
+    with each stage from STAGES, and with prepare_transcript's report as
+    the stage reaches 'saving'. Duplicate concurrent calls wait for the one
+    already running, in this process through `inflight` and across
+    processes through a lock row.
+    """
+    report = progress or (lambda stage, preprocessing=None: None)
+    (history_id, result), _ = inflight.do(
+        result_key(video_id, summary_length, languages),
+        lambda: _process_exclusive(youtube_url, video_id, summary_length, report, languages),
+        timeout=LOCK_WAIT_SECONDS
+    )
+    return db.session.get(VideoHistory, history_id), result
+
+def _replay(video_id, result):
+    yield 'video_info', result['video_info']
+    yield 'transcript', {'transcript': result['transcript'], 'video_id': video_id}
+    if result['summary'] is not None:
+        yield 'summary', {'delta': result['summary']}
+    if result.get('degraded'):
+        yield 'degraded', result['degraded']
+
+def stream_video(youtube_url, video_id, summary_length, languages=None):
+    """Run the pipeline, yielding (event, data) pairs as each piece becomes available.
+
+    Video information is sent as soon as it arrives, followed by the
+    transcript and then the summary as a series of text deltas. If the same
+    video is already being processed, its result is replayed once ready.
+    """
+    key = result_key(video_id, summary_length, languages)
+    cached = result_cache.get(key)
+    if cached is not None:
+        yield from _replay(video_id, cached)
+        yield 'done', {'cached': True}
+        return
+
+    future, leader = inflight.begin(key)
+    if not leader:
+        _, result = future.result(timeout=LOCK_WAIT_SECONDS)
+        yield from _replay(video_id, result)
+        yield 'done', {'cached': True, 'shared': True}
+        return
+
+    try:
+        history_id, result, preprocessing = yield from _stream_exclusive(youtube_url, video_id, summary_length, languages)
+    except BaseException as e:
+        # A client disconnect closes the generator; waiters still need an answer
+        error = e if isinstance(e, Exception) else Exception('Processing was cancelled')
+        inflight.finish(key, future, exception=error)
+        raise
+    inflight.finish(key, future, result=(history_id, result))
+    if preprocessing is None:
+        yield 'done', {'cached': True, 'shared': True}
+    else:
+        yield 'done', {'cached': False, 'preprocessing': preprocessing}
+
+def _stream_exclusive(youtube_url, video_id, summary_length, languages=None):
+    started = datetime.utcnow()
+    with processing_lock(lock_name(video_id, summary_length, languages)) as waited:
+        if waited:
+            history = finished_since(video_id, summary_length, started, languages)
+            if history is not None:
+                result = history_result(history)
+                yield from _replay(video_id, result)
+                return history.id, result, None
+
+        stored = stored_video_data(video_id, languages)
+        if stored is not None:
+            video_info, segments = stored
+            yield 'video_info', video_info
+        else:
+            video_info, segments = yield from _stream_fetches(youtube_url, languages)
+        if not segments:
+            raise ValueError('Could not extract transcript from the video')
+        transcript = join_segments(segments)
+        yield 'transcript', {'transcript': transcript, 'video_id': video_id}
+
+        texts, preprocessing = prepare_transcript(segments)
+        parts = []
+        try:
+            with span('summary'):
+                for delta in stream_summary(texts, summary_length):
+                    parts.append(delta)
+                    yield 'summary', {'delta': delta}
+        except CircuitOpen as e:
+            history, result = save_degraded_result(youtube_url, video_id, summary_length, video_info, segments, e,
+                                                   transcript, languages, store_transcript=stored is None)
+            if result['summary'] is not None:
+                yield 'summary', {'delta': result['summary']}
+            yield 'degraded', result['degraded']
+            return history.id, result, preprocessing
+
+        history, result = save_result(youtube_url, video_id, summary_length, video_info, segments, join_summary(parts),
+                                      transcript, languages, store_transcript=stored is None)
+        if result.get('degraded'):
+            yield 'degraded', result['degraded']
+        return history.id, result, preprocessing
+
+def _stream_fetches(youtube_url, languages=None):
+    """Fetch like fetch_video_data, yielding the video_info event as soon as it arrives."""
+    info_future, transcript_future = _submit_fetches(youtube_url, languages)
+    sent_info = False
+    for future in as_completed((info_future, transcript_future)):
+        if future.exception() is not None:
+            info_future.cancel()
+            transcript_future.cancel()
+            raise future.exception()
+        if not sent_info and info_future.done():
+            sent_info = True
+            yield 'video_info', info_future.result()
+    return info_future.result(), transcript_future.result()
+
+# Async pipeline, used by the ASGI app (asgi.py). It produces the same
+# results and events as the functions above, but waits on YouTube and
+# OpenAI on the event loop instead of holding a thread per request.
+# Database work runs in worker threads through run_sync.
+
+async def _fetch_info_async(youtube_url):
+    with span('metadata_fetch'):
+        return await get_video_info_async(youtube_url)
+
+async def _fetch_segments_async(youtube_url, languages=None):
+    with span('transcript_fetch'):
+        return await get_video_segments_async(youtube_url, languages)
+
+async def fetch_video_data_async(youtube_url, languages=None):
+    """Async version of fetch_video_data; a failure cancels the other fetch."""
+    info_task = asyncio.ensure_future(_fetch_info_async(youtube_url))
+    segments_task = asyncio.ensure_future(_fetch_segments_async(youtube_url, languages))
+    try:
+        return await asyncio.gather(info_task, segments_task)
+    except BaseException:
+        info_task.cancel()
+        segments_task.cancel()
+        raise
+
+def _finished_result(video_id, summary_length, since, languages=None):
+    history = finished_since(video_id, summary_length, since, languages)
+    return None if history is None else (history.id, history_result(history))
+
+def _save_result_id(*args):
+    history, result = save_result(*args)
+    return history.id, result
+
+def _save_degraded_result_id(*args):
+    history, result = save_degraded_result(*args)
+    return history.id, result
+
+async def _process_exclusive_async(app, youtube_url, video_id, summary_length, languages=None):
+    started = datetime.utcnow()
+    async with processing_lock_async(app, lock_name(video_id, summary_length, languages)) as waited:
+        if waited:
+            finished = await run_sync(app, _finished_result, video_id, summary_length, started, languages)
+            if finished is not None:
+                return finished
+
+        stored = await run_sync(app, stored_video_data, video_id, languages)
+        if stored is not None:
+            video_info, segments = stored
+        else:
+            video_info, segments = await fetch_video_data_async(youtube_url, languages)
+        if not segments:
+            raise ValueError('Could not extract transcript from the video')
+
+        texts, _ = await asyncio.to_thread(prepare_transcript, segments)
+        try:
+            with span('summary'):
+                summary = await generate_summary_async(texts, summary_length)
+        except CircuitOpen as e:
+            return await run_sync(app, _save_degraded_result_id, youtube_url, video_id, summary_length, video_info,
+                                  segments, e, None, languages, stored is None)
+
+        return await run_sync(app, _save_result_id, youtube_url, video_id, summary_length, video_info, segments,
+                              summary, None, languages, stored is None)
+
+async def process_video_async(app, youtube_url, video_id, summary_length, languages=None):
+    """Async version of process_video. Returns (history id, result)."""
+    key = result_key(video_id, summary_length, languages)
+    cached = await run_sync(app, result_cache.get, key)
+    if cached is not None:
+        return None, cached
+
+    (history_id, result), _ = await inflight.do_async(
+        key,
+        lambda: _process_exclusive_async(app, youtube_url, video_id, summary_length, languages),
+        timeout=LOCK_WAIT_SECONDS
+    )
+    return history_id, result
+
+async def stream_video_async(app, youtube_url, video_id, summary_length, languages=None):
+    """Async version of stream_video, yielding the same (event, data) pairs."""
+    key = result_key(video_id, summary_length, languages)
+    cached = await run_sync(app, result_cache.get, key)
+    if cached is not None:
+        for event in _replay(video_id, cached):
+            yield event
+        yield 'done', {'cached': True}
+        return
+
+    future, leader = inflight.begin(key)
+    if not leader:
+        _, result = await inflight.wait_async(future, LOCK_WAIT_SECONDS)
+        for event in _replay(video_id, result):
+            yield event
+        yield 'done', {'cached': True, 'shared': True}
+        return
+
+    outcome = {}
+    try:
+        async for event in _stream_exclusive_async(app, youtube_url, video_id, summary_length, outcome, languages):
+            yield event
+    except BaseException as e:
+        # A client disconnect cancels the stream; waiters still need an answer
+        error = e if isinstance(e, Exception) else Exception('Processing was cancelled')
+        inflight.finish(key, future, exception=error)
+        raise
+    inflight.finish(key, future, result=(outcome['history_id'], outcome['result']))
+    if outcome['preprocessing'] is None:
+        yield 'done', {'cached': True, 'shared': True}
+    else:
+        yield 'done', {'cached': False, 'preprocessing': outcome['preprocessing']}
+
+async def _stream_exclusive_async(app, youtube_url, video_id, summary_length, outcome, languages=None):
+    """Yield events for one run, leaving history_id, result and preprocessing in outcome."""
+    started = datetime.utcnow()
+    async with processing_lock_async(app, lock_name(video_id, summary_length, languages)) as waited:
+        if waited:
+            finished = await run_sync(app, _finished_result, video_id, summary_length, started, languages)
+            if finished is not None:
+                outcome.update(history_id=finished[0], result=finished[1], preprocessing=None)
+                for event in _replay(video_id, finished[1]):
+                    yield event
+                return
+
+        stored = await run_sync(app, stored_video_data, video_id, languages)
+        if stored is not None:
+            video_info, segments = stored
+            yield 'video_info', video_info
+        else:
+            info_task = asyncio.ensure_future(_fetch_info_async(youtube_url))
+            segments_task = asyncio.ensure_future(_fetch_segments_async(youtube_url, languages))
+            try:
+                for next_done in asyncio.as_completed((info_task, segments_task)):
+                    await next_done
+                    if info_task.done() and 'video_info' not in outcome:
+                        outcome['video_info'] = info_task.result()
+                        yield 'video_info', outcome['video_info']
+            except BaseException:
+                info_task.cancel()
+                segments_task.cancel()
+                raise
+
+            video_info = info_task.result()
+            segments = segments_task.result()
+        if not segments:
+            raise ValueError('Could not extract transcript from the video')
+        transcript = join_segments(segments)
+        yield 'transcript', {'transcript': transcript, 'video_id': video_id}
+
+        texts, preprocessing = await asyncio.to_thread(prepare_transcript, segments)
+        parts = []
+        try:
+            with span('summary'):
+                async for delta in stream_summary_async(texts, summary_length):
+                    parts.append(delta)
+                    yield 'summary', {'delta': delta}
+        except CircuitOpen as e:
+            history_id, result = await run_sync(app, _save_degraded_result_id, youtube_url, video_id, summary_length,
+                                                video_info, segments, e, transcript, languages, stored is None)
+            if result['summary'] is not None:
+                yield 'summary', {'delta': result['summary']}
+            yield 'degraded', result['degraded']
+            outcome.update(history_id=history_id, result=result, preprocessing=preprocessing)
+            return
+
+        history_id, result = await run_sync(app, _save_result_id, youtube_url, video_id, summary_length,
+                                             video_info, segments, join_summary(parts), transcript, languages, stored is None)
+        if result.get('degraded'):
+            yield 'degraded', result['degraded']
+        outcome.update(history_id=history_id, result=result, preprocessing=preprocessing)
+
+def run_job(job_id):
+    """Run the pipeline for a queued ProcessingJob, recording progress as it goes."""
+    job = db.session.get(ProcessingJob, job_id)
+    if job is None:
+        logger.error(f"Job {job_id} not found")
+        return
+
+    def report(stage, preprocessing=None):
+        job.status = 'running'
+        job.stage = stage
+        if preprocessing is not None:
+            job.preprocessing = preprocessing
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+
+    # The client polls for the result, so summaries wait for rate limit capacity instead of failing
+    with trace('job', job_id=job_id, video_id=job.video_id), wait_for_capacity():
+        if job.created_at is not None:
+            stage_seconds.observe((datetime.utcnow() - job.created_at).total_seconds(), stage='queue_wait')
+        try:
+            history, _ = process_video(job.video_url, job.video_id, job.summary_length, progress=report,
+                                       languages=job.languages)
+            job.history_id = history.id
+            job.status = 'completed'
+            job.stage = 'done'
+        except Exception as e:
+            logger.error(f"Error processing job {job_id}: {str(e)}")
+            db.session.rollback()
+            job.status = 'failed'
+            job.error = str(e)
+
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+
+def job_status(job):
+    """Build the /jobs/<id> response payload for a ProcessingJob."""
+    stage = job.stage or 'queued'
+    status = {
+        'job_id': job.id,
+        'status': job.status,
+        'stage': stage,
+        'progress': round(100 * STAGES.index(stage) / (len(STAGES) - 1)) if stage in STAGES else 0,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'updated_at': job.updated_at.isoformat() if job.updated_at else None
+    }
+
+    if job.status == 'failed':
+        status['error'] = job.error
+    elif job.status == 'completed' and job.history is not None:
+        status['video_id'] = job.history.video_id
+        status.update(history_result(job.history))
+        degraded = history_degraded(job.history)
+        if degraded is not None:
+            status['degraded'] = degraded
+        if job.preprocessing is not None:
+            status['preprocessing'] = job.preprocessing
+    return status
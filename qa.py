@@ -0,0 +1,111 @@
+import os
+import logging
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from models import VideoTranscript, VideoEmbedding
+from search import format_timestamp
+from utils.cache import ResultCache
+from utils.embeddings import (
+    get_embedder, chunk_segments, pack_vectors, unpack_vectors, pack_bounds, unpack_bounds, top_k
+)
+from utils.summarizer import generate_answer
+from utils.tracing import span
+from db import db
+
+logger = logging.getLogger(__name__)
+
+# Questions are answered from the QA_TOP_K transcript chunks most similar
+# to them. The chunk embeddings of the last QA_CACHE_ENTRIES videos asked
+# about stay unpacked in memory.
+QA_TOP_K = int(os.environ.get("QA_TOP_K", 4))
+QA_MAX_TOP_K = 10
+QA_MAX_QUESTION_CHARS = 500
+QA_CACHE_ENTRIES = int(os.environ.get("QA_CACHE_ENTRIES", 64))
+
+indexes = ResultCache(max_entries=QA_CACHE_ENTRIES, ttl_seconds=3600)
+
+
+class TranscriptNotStored(LookupError):
+    """Raised when a video has no stored transcript for the language preference."""
+
+
+def _embed_transcript(transcript, embedder):
+    """Chunk a stored transcript and embed the chunks into a new or refreshed VideoEmbedding row."""
+    segments = transcript.segments()
+    bounds = chunk_segments(segments)
+    texts = [' '.join(segment['text'] for segment in segments[start:stop]) for start, stop in zip(bounds, bounds[1:])]
+    with span('embed'):
+        vectors = embedder.embed(texts)
+
+    record = VideoEmbedding.query.filter_by(
+        video_id=transcript.video_id, languages=transcript.languages, model=embedder.name
+    ).first() or VideoEmbedding(video_id=transcript.video_id, languages=transcript.languages, model=embedder.name)
+    record.dimensions = len(vectors[0]) if vectors else 0
+    record.chunk_count = len(vectors)
+    record.bounds = pack_bounds(bounds)
+    record.vectors = pack_vectors(vectors)
+    record.created_at = datetime.utcnow()
+    db.session.add(record)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker embedded the same transcript first; theirs is just as good
+        db.session.rollback()
+        record = VideoEmbedding.query.filter_by(
+            video_id=transcript.video_id, languages=transcript.languages, model=embedder.name
+        ).one()
+    return record
+
+def load_index(video_id, languages=None):
+    """Return (packed transcript, chunk bounds, chunk vectors) for a stored transcript.
+
+    The transcript is embedded on the first question about it, and again
+    after it is re-fetched; later questions reuse the stored vectors.
+    """
+    embedder = get_embedder()
+    key = (video_id, languages, embedder.name)
+    index = indexes.get(key)
+    if index is not None:
+        return index
+
+    with span('transcript_lookup'):
+        transcript = VideoTranscript.query.filter_by(video_id=video_id, languages=languages).first()
+        if transcript is None:
+            raise TranscriptNotStored(f"No stored transcript for video {video_id}")
+        record = VideoEmbedding.query.filter_by(video_id=video_id, languages=languages, model=embedder.name).first()
+
+    if record is None or record.created_at < transcript.updated_at:
+        record = _embed_transcript(transcript, embedder)
+
+    vectors = unpack_vectors(record.vectors, record.dimensions) if record.chunk_count else []
+    index = (transcript.packed(), unpack_bounds(record.bounds), vectors)
+    indexes.set(key, index)
+    return index
+
+def answer_question(video_id, question, languages=None, k=None):
+    """Answer a question about a stored video from its k most relevant transcript chunks.
+
+    Returns the answer, the chunks it was based on (best match first, with
+    their start and end times and similarity scores) and the embedding model.
+    """
+    packed, bounds, vectors = load_index(video_id, languages)
+    embedder = get_embedder()
+    with span('embed'):
+        query = embedder.embed([question])[0]
+    hits = top_k(vectors, query, max(1, min(k or QA_TOP_K, QA_MAX_TOP_K)))
+
+    chunks = []
+    for index, score in hits:
+        start, stop = bounds[index], bounds[index + 1]
+        chunks.append({
+            'start': round(packed.starts[start], 3),
+            'end': round(packed.starts[stop - 1] + packed.durations[stop - 1], 3),
+            'text': ' '.join(packed.text(position) for position in range(start, stop)),
+            'score': round(score, 4)
+        })
+
+    if not chunks:
+        return {'answer': None, 'chunks': [], 'model': embedder.name}
+    with span('summary'):
+        answer = generate_answer(question, [f"[{format_timestamp(chunk['start'])}] {chunk['text']}" for chunk in chunks])
+    return {'answer': answer, 'chunks': chunks, 'model': embedder.name}
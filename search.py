@@ -0,0 +1,260 @@
+import logging
+import threading
+from datetime import datetime
+from markupsafe import escape
+from sqlalchemy import inspect, text
+from utils.textindex import InvertedIndex, tokenize, TOKEN_PATTERN
+from models import SearchDocument, VideoHistory, VideoTranscript
+from db import db
+
+logger = logging.getLogger(__name__)
+
+# Relative weight of each field in the ranking
+FIELD_WEIGHTS = {'title': 3.0, 'summary': 2.0, 'transcript': 1.0}
+MAX_MATCHES_PER_RESULT = 3
+MAX_PER_PAGE = 50
+
+
+class PostgresSearch:
+    """tsvector + GIN index on search_document.search_vector."""
+
+    name = 'postgresql'
+
+    def index(self, document, transcript):
+        db.session.execute(text(
+            "UPDATE search_document SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(:title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(:summary, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(:transcript, '')), 'C') "
+            "WHERE id = :id"
+        ), {'id': document.id, 'title': document.title, 'summary': document.summary, 'transcript': transcript})
+
+    def search(self, query, limit, offset):
+        params = {'query': query, 'limit': limit, 'offset': offset}
+        total = db.session.execute(text(
+            "SELECT count(*) FROM search_document "
+            "WHERE search_vector @@ websearch_to_tsquery('english', :query)"
+        ), params).scalar()
+        rows = db.session.execute(text(
+            "SELECT id, ts_rank_cd(search_vector, websearch_to_tsquery('english', :query)) AS score "
+            "FROM search_document WHERE search_vector @@ websearch_to_tsquery('english', :query) "
+            "ORDER BY score DESC, id LIMIT :limit OFFSET :offset"
+        ), params).all()
+        return total, [(row.id, float(row.score)) for row in rows]
+
+
+class SQLiteSearch:
+    """SQLite FTS5 virtual table search_fts, keyed by search_document.id."""
+
+    name = 'sqlite-fts5'
+
+    def index(self, document, transcript):
+        db.session.execute(text("DELETE FROM search_fts WHERE rowid = :id"), {'id': document.id})
+        db.session.execute(text(
+            "INSERT INTO search_fts (rowid, title, summary, transcript) VALUES (:id, :title, :summary, :transcript)"
+        ), {'id': document.id, 'title': document.title or '', 'summary': document.summary or '', 'transcript': transcript or ''})
+
+    def search(self, query, limit, offset):
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+
+        # Quote every term so user input is never parsed as FTS5 syntax
+        params = {
+            'match': ' '.join(f'"{term}"' for term in terms),
+            'limit': limit,
+            'offset': offset,
+            'title': FIELD_WEIGHTS['title'],
+            'summary': FIELD_WEIGHTS['summary'],
+            'transcript': FIELD_WEIGHTS['transcript']
+        }
+        total = db.session.execute(text("SELECT count(*) FROM search_fts WHERE search_fts MATCH :match"), params).scalar()
+        rows = db.session.execute(text(
+            "SELECT rowid AS id, bm25(search_fts, :title, :summary, :transcript) AS rank "
+            "FROM search_fts WHERE search_fts MATCH :match ORDER BY rank, rowid LIMIT :limit OFFSET :offset"
+        ), params).all()
+        return total, [(row.id, -float(row.rank)) for row in rows]
+
+
+class MemorySearch:
+    """In-process inverted index, loaded from the database on first use."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self.index_ = InvertedIndex(FIELD_WEIGHTS)
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        # Concurrent requests wait for the first load instead of searching a partial index;
+        # a load that fails is tried again by the next request
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            index = InvertedIndex(FIELD_WEIGHTS)
+            for document in SearchDocument.query.all():
+                index.add(document.id, {
+                    'title': document.title,
+                    'summary': document.summary,
+                    'transcript': load_transcript_text(document.video_id)
+                })
+            self.index_ = index
+            self._loaded = True
+
+    def index(self, document, transcript):
+        self._ensure_loaded()
+        self.index_.add(document.id, {'title': document.title, 'summary': document.summary, 'transcript': transcript})
+
+    def search(self, query, limit, offset):
+        self._ensure_loaded()
+        return self.index_.search(query, limit, offset)
+
+_backends = {}
+
+def get_backend():
+    """Pick the best full-text backend for the configured database."""
+    engine = db.engine
+    key = str(engine.url)
+    backend = _backends.get(key)
+    if backend is None:
+        if engine.dialect.name == 'postgresql':
+            backend = PostgresSearch()
+        elif engine.dialect.name == 'sqlite' and inspect(db.session.connection()).has_table('search_fts'):
+            backend = SQLiteSearch()
+        else:
+            backend = MemorySearch()
+        _backends[key] = backend
+    return backend
+
+def load_transcript_text(video_id):
+    stored = VideoTranscript.query.filter_by(video_id=video_id).first()
+    if stored is not None:
+        return stored.text()
+    history = VideoHistory.query.filter(VideoHistory.video_id == video_id, VideoHistory.transcript.isnot(None)).first()
+    return history.transcript if history is not None else ''
+
+def index_videos(entries):
+    """Add or refresh search entries in the current transaction.
+
+    entries are (video_id, title, thumbnail, summary, transcript) tuples;
+    the caller commits them together with the rows they describe.
+    """
+    entries = list(entries)
+    existing = {
+        document.video_id: document
+        for document in SearchDocument.query.filter(SearchDocument.video_id.in_([entry[0] for entry in entries]))
+    }
+    indexed = []
+    for video_id, title, thumbnail, summary, transcript in entries:
+        document = existing.get(video_id)
+        if document is None:
+            document = existing[video_id] = SearchDocument(video_id=video_id)
+            db.session.add(document)
+        document.title = title
+        document.thumbnail = thumbnail
+        document.summary = summary
+        document.updated_at = datetime.utcnow()
+        indexed.append((document, transcript))
+    db.session.flush()
+
+    backend = get_backend()
+    for document, transcript in indexed:
+        backend.index(document, transcript)
+
+def index_video(video_id, title, thumbnail, summary, transcript):
+    index_videos([(video_id, title, thumbnail, summary, transcript)])
+
+def reindex():
+    """Rebuild search entries from the latest history row of every video."""
+    count = 0
+    video_ids = [row.video_id for row in db.session.query(VideoHistory.video_id).filter(VideoHistory.video_id.isnot(None)).distinct()]
+    for video_id in video_ids:
+        history = VideoHistory.query.filter_by(video_id=video_id).order_by(VideoHistory.created_at.desc()).first()
+        index_video(video_id, history.video_title, history.video_thumbnail, history.summary_text, history.transcript_text or '')
+        count += 1
+    db.session.commit()
+    return count
+
+SUFFIXES = ('ing', 'ed', 'es', 's', 'ly')
+
+def _stem(token):
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+def highlight(segment_text, stems):
+    """HTML-escape segment_text and wrap words matching the query in <mark>."""
+    parts = []
+    position = 0
+    for match in TOKEN_PATTERN.finditer(segment_text):
+        if _stem(match.group().lower()) in stems:
+            parts.append(str(escape(segment_text[position:match.start()])))
+            parts.append(f"<mark>{escape(match.group())}</mark>")
+            position = match.end()
+    parts.append(str(escape(segment_text[position:])))
+    return ''.join(parts)
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def transcript_matches(stored, stems, limit=MAX_MATCHES_PER_RESULT):
+    """Find the first transcript segments containing a query term, with timestamps."""
+    matches = []
+    packed = stored.packed()
+    for index in range(len(packed)):
+        segment_text = packed.text(index)
+        if any(_stem(token) in stems for token in tokenize(segment_text)):
+            start = packed.starts[index]
+            matches.append({
+                'start': round(start, 2),
+                'timestamp': format_timestamp(start),
+                'snippet': highlight(segment_text, stems)
+            })
+            if len(matches) >= limit:
+                break
+    return matches
+
+def search(query, page=1, per_page=10):
+    """Run a ranked full-text search over processed videos."""
+    page = max(1, page)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    backend = get_backend()
+    total, ranked = backend.search(query, per_page, (page - 1) * per_page)
+
+    documents = {document.id: document for document in SearchDocument.query.filter(SearchDocument.id.in_([doc_id for doc_id, _ in ranked]))}
+    transcripts = {
+        stored.video_id: stored
+        for stored in VideoTranscript.query.filter(VideoTranscript.video_id.in_([document.video_id for document in documents.values()]))
+    }
+    stems = {_stem(term) for term in tokenize(query)}
+
+    results = []
+    for doc_id, score in ranked:
+        document = documents.get(doc_id)
+        if document is None:
+            continue
+        stored = transcripts.get(document.video_id)
+        results.append({
+            'video_id': document.video_id,
+            'title': document.title,
+            'thumbnail': document.thumbnail,
+            'score': round(score, 4),
+            'summary': highlight(document.summary or '', stems),
+            'matches': transcript_matches(stored, stems) if stored is not None else []
+        })
+
+    return {
+        'query': query,
+        'backend': backend.name,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'results': results
+    }
@@ -8,12 +8,20 @@ document.addEventListener('DOMContentLoaded', function() {
     const transcriptDiv = document.getElementById('transcript');
     const summaryDiv = document.getElementById('summary');
     const downloadBtn = document.getElementById('downloadBtn');
+    const askForm = document.getElementById('askForm');
+    const askBtn = document.getElementById('askBtn');
+    const answerP = document.getElementById('answer');
+    const answerSources = document.getElementById('answerSources');
 
     // Video info elements
     const videoThumbnail = document.getElementById('videoThumbnail');
     const videoTitle = document.getElementById('videoTitle');
     const videoDuration = document.getElementById('videoDuration');
 
+    // Set once a transcript is stored so downloads can be fetched from the server
+    let currentVideoId = null;
+    let currentLanguages = '';
+
     function showLoading(show) {
         submitBtn.disabled = show;
         submitBtnText.style.display = show ? 'none' : 'inline';
@@ -45,7 +53,187 @@ document.addEventListener('DOMContentLoaded', function() {
         return parts.join(' ') || '0s';
     }
 
+    const STAGE_LABELS = {
+        queued: 'Queued...',
+        fetching: 'Fetching video info and transcript...',
+        summarizing: 'Summarizing...',
+        saving: 'Saving...'
+    };
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    async function waitForJob(statusUrl) {
+        while (true) {
+            await sleep(1000);
+            const response = await fetch(statusUrl);
+            const data = await response.json();
+
+            if (!response.ok || data.status === 'failed') {
+                throw new Error(data.error || 'An unexpected error occurred');
+            }
+            if (data.status === 'completed') {
+                return data;
+            }
+
+            submitSpinner.setAttribute('title', STAGE_LABELS[data.stage] || 'Processing...');
+        }
+    }
+
+    function showVideoInfo(videoInfo) {
+        videoThumbnail.src = videoInfo.thumbnail;
+        videoTitle.textContent = videoInfo.title;
+        videoDuration.textContent = `Duration: ${formatDuration(videoInfo.duration)}`;
+        results.classList.remove('d-none');
+    }
+
+    function showDegraded(degraded) {
+        // The summarizer was unavailable: the summary is missing, from an earlier version or from the backup summarizer
+        if (degraded.summary === 'stale') {
+            summaryDiv.textContent += '\n\n(Summary saved earlier; a fresh one could not be generated right now.)';
+        } else if (degraded.summary === 'fallback') {
+            summaryDiv.textContent += '\n\n(Quick summary from the backup summarizer; the next request tries the main one again.)';
+        } else {
+            summaryDiv.textContent = 'The summary could not be generated right now. Please try again in a minute.';
+        }
+    }
+
+    async function errorMessage(response) {
+        // Errors raised before a stream starts come back as JSON with an error message
+        try {
+            return (await response.json()).error || 'An unexpected error occurred';
+        } catch (error) {
+            return `The server responded with status ${response.status}`;
+        }
+    }
+
+    function parseEvent(message) {
+        let event = 'message';
+        const data = [];
+        for (const line of message.split('\n')) {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                data.push(line.slice(5).replace(/^ /, ''));
+            }
+        }
+        return {event, data: data.length ? JSON.parse(data.join('\n')) : null};
+    }
+
+    async function streamResults(formData) {
+        // Render video info, transcript and summary as the server sends them
+        const params = new URLSearchParams(formData);
+        const response = await fetch(`/process/stream?${params.toString()}`, {
+            headers: {'Accept': 'text/event-stream'}
+        });
+        if (!response.ok) {
+            throw new Error(await errorMessage(response));
+        }
+        summaryDiv.textContent = '';
+        transcriptDiv.textContent = '';
+
+        const handlers = {
+            video_info: data => showVideoInfo(data),
+            transcript: data => {
+                transcriptDiv.textContent = data.transcript;
+                currentVideoId = data.video_id || null;
+            },
+            summary: data => {
+                summaryDiv.textContent += data.delta;
+            },
+            degraded: data => showDegraded(data),
+            failed: data => {
+                throw new Error(data.error || 'An unexpected error occurred');
+            }
+        };
+
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        for (;;) {
+            const {value, done} = await reader.read();
+            if (done) {
+                throw new Error('Lost connection to the server');
+            }
+            buffer += value.replace(/\r\n/g, '\n');
+            let end;
+            while ((end = buffer.indexOf('\n\n')) !== -1) {
+                const {event, data} = parseEvent(buffer.slice(0, end));
+                buffer = buffer.slice(end + 2);
+                if (event === 'done') {
+                    reader.cancel();
+                    // The transcript is stored once the run is done, so downloads and questions can use it
+                    downloadBtn.disabled = false;
+                    askBtn.disabled = !currentVideoId;
+                    return;
+                }
+                if (handlers[event]) {
+                    handlers[event](data);
+                }
+            }
+        }
+    }
+
+    function showResults(data) {
+        // Update video information
+        showVideoInfo(data.video_info);
+
+        // Show results
+        transcriptDiv.textContent = data.transcript;
+        summaryDiv.textContent = data.summary || '';
+        if (data.degraded) {
+            showDegraded(data.degraded);
+        }
+        currentVideoId = data.video_id || null;
+        downloadBtn.disabled = false;
+        askBtn.disabled = !currentVideoId;
+    }
+
+    function formatSeconds(seconds) {
+        const minutes = Math.floor(seconds / 60);
+        return `${minutes}:${String(Math.floor(seconds % 60)).padStart(2, '0')}`;
+    }
+
+    askForm.addEventListener('submit', async function(e) {
+        // Answers come from the stored transcript's best matching passages
+        e.preventDefault();
+        hideError();
+        askBtn.disabled = true;
+        answerP.textContent = '';
+        answerSources.textContent = '';
+
+        try {
+            const params = new URLSearchParams({q: document.getElementById('question').value});
+            if (currentLanguages) {
+                params.set('languages', currentLanguages);
+            }
+            const response = await fetch(`/videos/${encodeURIComponent(currentVideoId)}/ask?${params.toString()}`);
+            const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || 'Failed to answer the question');
+            }
+
+            answerP.textContent = data.answer || 'No answer found in the transcript.';
+            for (const chunk of data.chunks) {
+                const item = document.createElement('li');
+                item.textContent = `${formatSeconds(chunk.start)}–${formatSeconds(chunk.end)}: ${chunk.text}`;
+                answerSources.appendChild(item);
+            }
+        } catch (error) {
+            showError(error.message);
+        } finally {
+            askBtn.disabled = false;
+        }
+    });
+
     downloadBtn.addEventListener('click', async function() {
+        // Stored transcripts stream straight from the server
+        if (currentVideoId) {
+            const lang = currentLanguages ? `?lang=${encodeURIComponent(currentLanguages)}` : '';
+            window.location.href = `/videos/${encodeURIComponent(currentVideoId)}/transcript.txt${lang}`;
+            return;
+        }
+
         try {
             const formData = new FormData();
             formData.append('transcript', transcriptDiv.textContent);
@@ -81,31 +269,38 @@ document.addEventListener('DOMContentLoaded', function() {
         hideError();
         results.classList.add('d-none');
         downloadBtn.disabled = true;
+        askBtn.disabled = true;
+        answerP.textContent = '';
+        answerSources.textContent = '';
+        currentVideoId = null;
         showLoading(true);
 
         try {
             const formData = new FormData(form);
+            currentLanguages = (formData.get('languages') || '').trim();
+
+            if (window.ReadableStream && window.TextDecoderStream) {
+                await streamResults(formData);
+                return;
+            }
+
             const response = await fetch('/process', {
                 method: 'POST',
                 body: formData
             });
 
-            const data = await response.json();
-
             if (!response.ok) {
-                throw new Error(data.error || 'An unexpected error occurred');
+                throw new Error(await errorMessage(response));
             }
 
-            // Update video information
-            videoThumbnail.src = data.video_info.thumbnail;
-            videoTitle.textContent = data.video_info.title;
-            videoDuration.textContent = `Duration: ${formatDuration(data.video_info.duration)}`;
+            let data = await response.json();
+
+            // Long-running videos are processed in the background; poll until done
+            if (data.status !== 'completed') {
+                data = await waitForJob(data.status_url);
+            }
 
-            // Show results
-            transcriptDiv.textContent = data.transcript;
-            summaryDiv.textContent = data.summary;
-            results.classList.remove('d-none');
-            downloadBtn.disabled = false;
+            showResults(data);
 
         } catch (error) {
             showError(error.message);
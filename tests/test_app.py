@@ -6,6 +6,7 @@ import json
 
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
 
 from app import app
 from models import VideoHistory
@@ -23,9 +24,9 @@ class TestApp(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'YouTube Video Transcriber', response.data)
     
-    @patch('app.get_video_transcript')
-    @patch('app.get_video_info')
-    @patch('app.generate_summary')
+    @patch('pipeline.get_video_segments')
+    @patch('pipeline.get_video_info')
+    @patch('pipeline.generate_summary')
     @patch('app.db.session.add')
     @patch('app.db.session.commit')
     def test_process_route_success(self, mock_commit, mock_add, mock_generate_summary, 
@@ -61,7 +62,7 @@ class TestApp(unittest.TestCase):
         mock_add.assert_called_once()
         mock_commit.assert_called_once()
     
-    @patch('app.get_video_transcript')
+    @patch('pipeline.get_video_segments')
     def test_process_route_invalid_url(self, mock_get_video_transcript):
         # Mock exception when getting transcript
         mock_get_video_transcript.side_effect = ValueError("Invalid YouTube URL")
@@ -76,9 +77,9 @@ class TestApp(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('error', data)
     
-    @patch('app.get_video_transcript')
-    @patch('app.get_video_info')
-    @patch('app.generate_summary')
+    @patch('pipeline.get_video_segments')
+    @patch('pipeline.get_video_info')
+    @patch('pipeline.generate_summary')
     def test_process_route_api_error(self, mock_generate_summary, 
                                     mock_get_video_info, mock_get_video_transcript):
         # Mock transcript success
@@ -0,0 +1,234 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import asyncio
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from asgi import application, wsgi_environ
+from app import app
+from pipeline import result_cache, inflight, stream_video_async, process_video_async
+from models import VideoHistory, VideoTranscript, VideoSummary
+from db import db
+
+SEGMENTS = [{'text': 'This is a test transcript.', 'start': 0.0, 'duration': 2.0}]
+
+VIDEO_INFO = {
+    'title': 'Test Video',
+    'duration': 'PT5M30S',
+    'thumbnail': 'https://example.com/thumbnail.jpg'
+}
+
+URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+def parse_events(body):
+    events = []
+    for message in body.decode('utf-8').strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in message.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+async def call(method, path, query=b'', body=b'', headers=(), disconnect_after=None):
+    """Send one request through the ASGI app and collect (status, headers, body)."""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        if disconnect_after is not None:
+            await asyncio.sleep(disconnect_after)
+            return {'type': 'http.disconnect'}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'headers': list(headers)}
+    await application(scope, receive, send)
+    start = sent[0]
+    return start['status'], dict(start['headers']), b''.join(message.get('body', b'') for message in sent[1:])
+
+def fake_summary(*deltas, delay=0.0):
+    async def stream(text, length='medium'):
+        for delta in deltas:
+            await asyncio.sleep(delay)
+            yield delta
+    return stream
+
+class TestAsyncPipeline(unittest.TestCase):
+
+    def setUp(self):
+        result_cache.clear()
+        with app.app_context():
+            VideoHistory.query.delete()
+            VideoTranscript.query.delete()
+            VideoSummary.query.delete()
+            db.session.commit()
+
+    @patch('pipeline.stream_summary_async', new=fake_summary("This is ", "a summary."))
+    @patch('pipeline.get_video_segments_async')
+    @patch('pipeline.get_video_info_async')
+    def test_stream_matches_sync_events_and_saves(self, mock_info, mock_segments):
+        mock_info.return_value = VIDEO_INFO
+        mock_segments.return_value = SEGMENTS
+
+        async def collect():
+            return [event async for event in stream_video_async(app, URL, 'dQw4w9WgXcQ', 'short')]
+
+        events = asyncio.run(collect())
+
+        self.assertEqual([name for name, _ in events], ['video_info', 'transcript', 'summary', 'summary', 'done'])
+        self.assertEqual(events[1][1]['transcript'], 'This is a test transcript.')
+        self.assertFalse(events[-1][1]['cached'])
+        with app.app_context():
+            history = VideoHistory.query.filter_by(video_id='dQw4w9WgXcQ').one()
+            self.assertEqual(history.summary_text, 'This is a summary.')
+            self.assertEqual(history.transcript_text, 'This is a test transcript.')
+
+    @patch('pipeline.stream_summary_async', new=fake_summary("shared ", "summary", delay=0.05))
+    @patch('pipeline.get_video_segments_async')
+    @patch('pipeline.get_video_info_async')
+    def test_concurrent_streams_share_one_run(self, mock_info, mock_segments):
+        mock_info.return_value = VIDEO_INFO
+        mock_segments.return_value = SEGMENTS
+
+        async def collect():
+            return [event async for event in stream_video_async(app, URL, 'dQw4w9WgXcQ', 'short')]
+
+        async def both():
+            return await asyncio.gather(collect(), collect())
+
+        # Either stream may become the leader
+        leader, follower = sorted(asyncio.run(both()), key=lambda events: events[-1][1].get('shared', False))
+
+        self.assertEqual(mock_info.call_count, 1)
+        self.assertFalse(leader[-1][1]['cached'])
+        self.assertEqual(follower[-1][1], {'cached': True, 'shared': True})
+        self.assertEqual(follower[-2], ('summary', {'delta': 'shared summary'}))
+        self.assertFalse(inflight.in_flight(('dQw4w9WgXcQ', 'short')))
+
+    @patch('pipeline.generate_summary_async')
+    @patch('pipeline.get_video_segments_async')
+    @patch('pipeline.get_video_info_async')
+    def test_process_video_async_then_cache(self, mock_info, mock_segments, mock_summary):
+        mock_info.return_value = VIDEO_INFO
+        mock_segments.return_value = SEGMENTS
+        mock_summary.return_value = 'A summary.'
+
+        history_id, result = asyncio.run(process_video_async(app, URL, 'dQw4w9WgXcQ', 'medium'))
+        self.assertIsNotNone(history_id)
+        self.assertEqual(result['summary'], 'A summary.')
+
+        cached_id, cached = asyncio.run(process_video_async(app, URL, 'dQw4w9WgXcQ', 'medium'))
+        self.assertIsNone(cached_id)
+        self.assertEqual(cached['summary'], 'A summary.')
+        self.assertEqual(mock_summary.call_count, 1)
+
+    @patch('pipeline.get_video_segments_async')
+    @patch('pipeline.get_video_info_async')
+    def test_fetch_failure_is_raised(self, mock_info, mock_segments):
+        mock_info.return_value = VIDEO_INFO
+        mock_segments.side_effect = Exception('Failed to get video transcript.')
+
+        with self.assertRaises(Exception):
+            asyncio.run(process_video_async(app, URL, 'dQw4w9WgXcQ', 'medium'))
+        self.assertFalse(inflight.in_flight(('dQw4w9WgXcQ', 'medium')))
+
+class TestASGIApp(unittest.TestCase):
+
+    def setUp(self):
+        result_cache.clear()
+
+    def test_stream_route_sends_events(self):
+        async def events(flask_app, youtube_url, video_id, summary_length, languages=None):
+            yield 'video_info', VIDEO_INFO
+            yield 'done', {'cached': False}
+
+        with patch('asgi.stream_video_async', new=events):
+            status, headers, body = asyncio.run(call('GET', '/process/stream', b'youtube_url=' + URL.encode()))
+
+        self.assertEqual(status, 200)
+        self.assertTrue(headers[b'content-type'].startswith(b'text/event-stream'))
+        self.assertEqual([name for name, _ in parse_events(body)], ['video_info', 'done'])
+
+    def test_stream_route_reports_failures(self):
+        async def events(flask_app, youtube_url, video_id, summary_length, languages=None):
+            raise Exception('Failed to get video information')
+            yield
+
+        with patch('asgi.stream_video_async', new=events):
+            _, _, body = asyncio.run(call('GET', '/process/stream', b'youtube_url=' + URL.encode()))
+
+        self.assertEqual(parse_events(body), [('failed', {'error': 'Failed to get video information'})])
+
+    def test_stream_route_validates_url(self):
+        status, _, body = asyncio.run(call('GET', '/process/stream', b'youtube_url=https://example.com/video'))
+        self.assertEqual(status, 400)
+        self.assertEqual(json.loads(body)['error'], 'Invalid YouTube URL format')
+
+    def test_disconnect_cancels_the_pipeline(self):
+        cancelled = []
+
+        async def events(flask_app, youtube_url, video_id, summary_length, languages=None):
+            yield 'video_info', VIDEO_INFO
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            yield 'done', {}
+
+        with patch('asgi.stream_video_async', new=events):
+            status, _, body = asyncio.run(call('GET', '/process/stream', b'youtube_url=' + URL.encode(),
+                                               disconnect_after=0.05))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(cancelled, [True])
+        self.assertEqual([name for name, _ in parse_events(body)], ['video_info'])
+
+    @patch('asgi.process_video_async')
+    def test_process_route_returns_completed_result(self, mock_process):
+        mock_process.return_value = (1, {'video_info': VIDEO_INFO, 'transcript': 'text', 'summary': 'A summary.'})
+
+        status, _, body = asyncio.run(call(
+            'POST', '/process', body=b'youtube_url=' + URL.encode() + b'&summary_length=short',
+            headers=[(b'content-type', b'application/x-www-form-urlencoded')]
+        ))
+
+        data = json.loads(body)
+        self.assertEqual(status, 200)
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['video_id'], 'dQw4w9WgXcQ')
+        self.assertFalse(data['cached'])
+        self.assertEqual(mock_process.call_args[0][1:], (URL, 'dQw4w9WgXcQ', 'short'))
+
+    def test_other_routes_are_served_by_flask(self):
+        status, headers, body = asyncio.run(call('GET', '/'))
+        self.assertEqual(status, 200)
+        self.assertIn(b'YouTube Video Transcriber', body)
+
+        status, _, body = asyncio.run(call('GET', '/history', b'cursor=bad'))
+        self.assertEqual(status, 400)
+
+    def test_wsgi_environ_maps_headers(self):
+        environ = wsgi_environ({
+            'method': 'POST', 'path': '/batch', 'query_string': b'a=1',
+            'headers': [(b'content-type', b'application/json'), (b'x-forwarded-for', b'10.0.0.1'),
+                        (b'transfer-encoding', b'chunked')]
+        }, b'{}')
+
+        self.assertEqual(environ['CONTENT_TYPE'], 'application/json')
+        self.assertEqual(environ['CONTENT_LENGTH'], '2')
+        self.assertEqual(environ['HTTP_X_FORWARDED_FOR'], '10.0.0.1')
+        self.assertNotIn('HTTP_TRANSFER_ENCODING', environ)
+        self.assertEqual(environ['wsgi.input'].read(), b'{}')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import time
+import threading
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from app import app
+from batch import run_batch, main, BATCH_MAX_CONCURRENCY
+import pipeline
+from pipeline import result_cache
+from models import VideoHistory, VideoTranscript, VideoSummary
+from db import db
+
+
+SEGMENTS = [{'text': 'This is a test transcript.', 'start': 0.0, 'duration': 2.0}]
+
+def fake_video_info(url):
+    return {'title': f'Video {url[-11:]}', 'duration': 'PT1M', 'thumbnail': 'https://example.com/thumbnail.jpg'}
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        app.config["TESTING"] = True
+        result_cache.clear()
+        with app.app_context():
+            VideoHistory.query.delete()
+            VideoTranscript.query.delete()
+            VideoSummary.query.delete()
+            db.session.commit()
+
+    @patch('batch.generate_summary', return_value="Batch summary.")
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', side_effect=fake_video_info)
+    def test_run_batch_dedupes_and_bulk_inserts(self, mock_get_video_info,
+                                                mock_get_video_segments, mock_generate_summary):
+        urls = [
+            'https://www.youtube.com/watch?v=aaaaaaaaaaa',
+            'https://youtu.be/aaaaaaaaaaa',
+            'https://www.youtube.com/watch?v=bbbbbbbbbbb',
+            'https://www.youtube.com/watch?v=ccccccccccc',
+            'https://www.example.com/not-youtube'
+        ]
+
+        with app.app_context():
+            with patch.object(db.session, 'commit', wraps=db.session.commit) as mock_commit:
+                statuses = list(run_batch(urls, 'short', concurrency=3, insert_size=10))
+
+            self.assertEqual(mock_commit.call_count, 1)
+            self.assertEqual(VideoHistory.query.count(), 3)
+
+        items = {status['index']: status['status'] for status in statuses if 'index' in status}
+        self.assertEqual(items, {0: 'completed', 1: 'duplicate', 2: 'completed', 3: 'completed', 4: 'invalid'})
+        self.assertEqual(statuses[-1]['summary']['completed'], 3)
+        self.assertEqual(mock_generate_summary.call_count, 3)
+
+    @patch('batch.generate_summary', return_value="Batch summary.")
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', side_effect=fake_video_info)
+    def test_run_batch_uses_cache_for_processed_videos(self, mock_get_video_info,
+                                                       mock_get_video_segments, mock_generate_summary):
+        urls = ['https://www.youtube.com/watch?v=aaaaaaaaaaa']
+        with app.app_context():
+            list(run_batch(urls, 'short'))
+            statuses = list(run_batch(urls, 'short'))
+
+        self.assertEqual(statuses[0]['status'], 'cached')
+        self.assertEqual(mock_generate_summary.call_count, 1)
+
+    @patch('batch.generate_summary', return_value="Batch summary.")
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', side_effect=fake_video_info)
+    def test_run_batch_summarizes_stored_transcripts_without_fetching(self, mock_get_video_info,
+                                                                      mock_get_video_segments, mock_generate_summary):
+        urls = ['https://www.youtube.com/watch?v=aaaaaaaaaaa']
+        with app.app_context():
+            list(run_batch(urls, 'short'))
+            statuses = list(run_batch(urls, 'long'))
+
+            self.assertEqual(statuses[0]['status'], 'completed')
+            self.assertEqual(VideoTranscript.query.count(), 1)
+            self.assertEqual(VideoSummary.query.count(), 2)
+
+        self.assertEqual(mock_get_video_segments.call_count, 1)
+        self.assertEqual(mock_get_video_info.call_count, 1)
+        self.assertEqual(mock_generate_summary.call_count, 2)
+
+    @patch('batch.generate_summary', side_effect=Exception("Failed to generate summary."))
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', side_effect=fake_video_info)
+    def test_batch_endpoint_streams_status_lines(self, mock_get_video_info,
+                                                 mock_get_video_segments, mock_generate_summary):
+        response = self.app.post('/batch', json={
+            'urls': ['https://youtu.be/aaaaaaaaaaa', 'https://youtu.be/bbbbbbbbbbb'],
+            'summary_length': 'short'
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+        self.assertEqual([line['status'] for line in lines[:-1]], ['failed', 'failed'])
+        self.assertEqual(lines[-1]['summary']['failed'], 2)
+
+    def test_batch_endpoint_requires_urls(self):
+        response = self.app.post('/batch', json={'urls': []})
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_endpoint_rejects_bad_concurrency(self):
+        for concurrency in (0, -1, 'many', BATCH_MAX_CONCURRENCY + 1, True):
+            response = self.app.post('/batch', json={'urls': ['https://youtu.be/aaaaaaaaaaa'], 'concurrency': concurrency})
+            self.assertEqual(response.status_code, 400, concurrency)
+
+    @patch('batch.generate_summary', return_value="Batch summary.")
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', side_effect=fake_video_info)
+    def test_stored_data_is_read_by_the_workers(self, mock_get_video_info,
+                                                mock_get_video_segments, mock_generate_summary):
+        urls = ['https://www.youtube.com/watch?v=aaaaaaaaaaa', 'https://www.youtube.com/watch?v=bbbbbbbbbbb']
+        threads = []
+
+        def lookup(video_id, languages=None):
+            threads.append(threading.current_thread().name)
+            return pipeline.stored_video_data(video_id, languages)
+
+        with app.app_context(), patch('batch.stored_video_data', side_effect=lookup):
+            statuses = list(run_batch(urls, 'short', concurrency=2))
+
+        self.assertEqual(statuses[-1]['summary']['completed'], 2)
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(name.startswith('batch') for name in threads))
+
+    @patch('batch.generate_summary', return_value="Batch summary.")
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', side_effect=fake_video_info)
+    def test_cli_prints_one_line_per_url(self, mock_get_video_info,
+                                         mock_get_video_segments, mock_generate_summary):
+        with patch('builtins.print') as mock_print:
+            main(['https://youtu.be/aaaaaaaaaaa', 'https://youtu.be/bbbbbbbbbbb', '--summary-length', 'long'])
+
+        lines = [json.loads(call.args[0]) for call in mock_print.call_args_list]
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[-1]['summary']['completed'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
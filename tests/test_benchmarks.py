@@ -0,0 +1,101 @@
+import unittest
+import sys
+import os
+import json
+import urllib.request
+from unittest.mock import patch
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from benchmarks.fakes import FakeUpstreams, Upstream
+from benchmarks.bench_load import percentile, bucket_quantile, parse_stage_buckets, stage_deltas, compare
+from benchmarks import bench_fetch
+
+class TestFakeUpstreams(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fakes = FakeUpstreams(
+            youtube=Upstream(latency_ms=0),
+            transcript=Upstream(latency_ms=0),
+            openai=Upstream(latency_ms=0, error_rate=1.0, error_status=500),
+            segments=5
+        ).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fakes.stop()
+
+    def test_videos_endpoint_returns_requested_ids(self):
+        with urllib.request.urlopen(f"{self.fakes.url}/youtube/v3/videos?id=aaa,bbb&part=snippet") as response:
+            items = json.loads(response.read())['items']
+        self.assertEqual([item['id'] for item in items], ['aaa', 'bbb'])
+        self.assertIn('contentDetails', items[0])
+
+    def test_transcript_api_parses_fake_watch_page(self):
+        from youtube_transcript_api import _transcripts
+        from utils.youtube import get_video_segments, transcript_lists
+        original = _transcripts.WATCH_URL
+        _transcripts.WATCH_URL = self.fakes.environment()['BENCH_WATCH_URL']
+        transcript_lists.clear()
+        try:
+            segments = get_video_segments('https://youtu.be/abcdefghijk')
+        finally:
+            _transcripts.WATCH_URL = original
+            transcript_lists.clear()
+        self.assertEqual(len(segments), 5)
+        self.assertEqual(segments[1]['start'], 2.0)
+
+    def test_injected_errors_use_configured_status(self):
+        request = urllib.request.Request(f"{self.fakes.url}/v1/chat/completions", data=b'{}', method='POST')
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request)
+        self.assertEqual(error.exception.code, 500)
+        self.assertGreaterEqual(self.fakes.counts['errors'], 1)
+
+class TestLoadReport(unittest.TestCase):
+
+    def test_percentile_interpolates(self):
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 50), 3)
+        self.assertAlmostEqual(percentile([0, 10], 95), 9.5)
+        self.assertIsNone(percentile([], 50))
+
+    def test_stage_quantiles_from_metrics_scrapes(self):
+        before = parse_stage_buckets('ytt_stage_duration_seconds_bucket{stage="summary",le="1"} 2\n'
+                                     'ytt_stage_duration_seconds_bucket{stage="summary",le="2"} 2\n'
+                                     'ytt_stage_duration_seconds_bucket{stage="summary",le="+Inf"} 2\n')
+        after = parse_stage_buckets('ytt_stage_duration_seconds_bucket{stage="summary",le="1"} 2\n'
+                                    'ytt_stage_duration_seconds_bucket{stage="summary",le="2"} 12\n'
+                                    'ytt_stage_duration_seconds_bucket{stage="summary",le="+Inf"} 12\n')
+
+        stages = stage_deltas(before, after)
+        self.assertEqual(stages['summary']['count'], 10)
+        self.assertAlmostEqual(stages['summary']['p50'], 1500.0)
+        self.assertEqual(bucket_quantile([(1.0, 0), (float('inf'), 4)], 99), 1.0)
+
+    def test_compare_flags_slower_levels(self):
+        baseline = {'levels': [{'concurrency': 4, 'throughput_rps': 10.0,
+                                'latency_ms': {'p50': 100.0, 'p95': 200.0, 'p99': 300.0}}]}
+        result = {'levels': [{'concurrency': 4, 'throughput_rps': 7.0,
+                              'latency_ms': {'p50': 105.0, 'p95': 260.0, 'p99': 310.0}}]}
+
+        regressions = compare(result, baseline, 0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('p95', regressions[0])
+        self.assertIn('throughput', regressions[1])
+
+class TestFetchBenchmark(unittest.TestCase):
+
+    def test_runs_against_the_current_pipeline(self):
+        with patch('builtins.print') as mock_print:
+            bench_fetch.main(['--info-ms', '0', '--transcript-ms', '0', '--runs', '1'])
+
+        lines = [call.args[0] for call in mock_print.call_args_list]
+        self.assertTrue(lines[-1].startswith('speedup'))
+
+if __name__ == '__main__':
+    unittest.main()
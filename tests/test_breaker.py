@@ -0,0 +1,219 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import json
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from youtube_transcript_api import TranscriptsDisabled, RequestBlocked
+from app import app
+from pipeline import process_video, result_cache, result_key, history_degraded
+from models import VideoHistory, VideoTranscript, VideoSummary
+from utils import summarizer
+from utils.breaker import CircuitBreaker, CircuitOpen, breakers, transcript_failure
+from utils.ratelimit import RateLimiter, RateLimitExceeded, limiters
+from db import db
+
+SEGMENTS = [{'text': 'This is a test transcript.', 'start': 0.0, 'duration': 2.0}]
+
+VIDEO_INFO = {
+    'title': 'Test Video',
+    'duration': 'PT5M30S',
+    'thumbnail': 'https://example.com/thumbnail.jpg'
+}
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class ClientError(Exception):
+    status_code = 400
+
+
+def fail(breaker, error=None):
+    with breaker.guard():
+        raise error or ConnectionError('connection refused')
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('test', failure_threshold=3, reset_seconds=30, half_open_probes=1,
+                                      clock=self.clock)
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                fail(self.breaker)
+        self.assertEqual(self.breaker.state, 'open')
+
+        call = MagicMock()
+        with self.assertRaises(CircuitOpen) as raised:
+            self.breaker.call(call)
+        self.assertFalse(call.called)
+        self.assertEqual(raised.exception.retry_after, 30)
+        self.assertEqual(self.breaker.stats()['rejected'], 1)
+
+    def test_success_resets_the_failure_count(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                fail(self.breaker)
+        self.breaker.call(lambda: None)
+        with self.assertRaises(ConnectionError):
+            fail(self.breaker)
+
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_half_open_probe_closes_the_circuit(self):
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                fail(self.breaker)
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, 'half_open')
+
+        probe = self.breaker.guard()
+        probe.__enter__()
+        # Only one probe at a time; everyone else still fails fast
+        with self.assertRaises(CircuitOpen):
+            self.breaker.call(lambda: None)
+        probe.__exit__(None, None, None)
+
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertEqual(self.breaker.call(lambda: 'ok'), 'ok')
+
+    def test_failed_probe_reopens_the_circuit(self):
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                fail(self.breaker)
+        self.clock.now += 30
+        with self.assertRaises(ConnectionError):
+            fail(self.breaker)
+
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertEqual(self.breaker.stats()['retry_after'], 30)
+
+    def test_answers_and_own_rate_limits_do_not_count(self):
+        for error in (ClientError('bad request'), RateLimitExceeded('openai', 5)) * 3:
+            with self.assertRaises(type(error)):
+                fail(self.breaker, error)
+
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertEqual(self.breaker.stats()['failures'], 0)
+
+    def test_per_video_transcript_errors_do_not_count(self):
+        self.assertFalse(transcript_failure(TranscriptsDisabled('dQw4w9WgXcQ')))
+        self.assertTrue(transcript_failure(RequestBlocked('dQw4w9WgXcQ')))
+        self.assertTrue(transcript_failure(ConnectionError('connection reset')))
+
+    def test_threshold_zero_never_opens(self):
+        breaker = CircuitBreaker('test', failure_threshold=0)
+        for _ in range(10):
+            with self.assertRaises(ConnectionError):
+                fail(breaker)
+        self.assertEqual(breaker.state, 'closed')
+
+
+class TestSummarizerBreaker(unittest.TestCase):
+
+    @patch('utils.summarizer.SUMMARY_FALLBACK_BACKEND', '')
+    @patch('utils.summarizer.SUMMARY_BACKEND', 'openai')
+    def test_open_circuit_skips_openai(self):
+        client = MagicMock()
+        client.chat.completions.create.side_effect = ConnectionError('connection refused')
+        breaker = CircuitBreaker('openai', failure_threshold=2, reset_seconds=60)
+        with patch.object(summarizer, 'openai', client), patch.dict(breakers, openai=breaker), \
+                patch.dict(limiters, openai=RateLimiter(0, name='openai')):
+            for _ in range(2):
+                with self.assertRaises(Exception):
+                    summarizer.generate_summary('A short transcript.', 'short')
+            with self.assertRaises(CircuitOpen):
+                summarizer.generate_summary('A short transcript.', 'short')
+            # With a local fallback the summary is still produced, without calling OpenAI
+            with patch('utils.summarizer.SUMMARY_FALLBACK_BACKEND', 'extractive'):
+                self.assertTrue(summarizer.generate_summary('A short transcript.', 'short'))
+
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+
+
+class TestDegradedResults(unittest.TestCase):
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        result_cache.clear()
+        with app.app_context():
+            VideoHistory.query.delete()
+            VideoSummary.query.delete()
+            VideoTranscript.query.delete()
+            db.session.commit()
+
+    @patch('pipeline.generate_summary', side_effect=CircuitOpen('openai', 12.0))
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', return_value=VIDEO_INFO)
+    def test_transcript_and_metadata_without_summary(self, mock_info, mock_segments, mock_summary):
+        with app.app_context():
+            history, result = process_video('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short')
+
+            self.assertEqual(result['video_info'], VIDEO_INFO)
+            self.assertEqual(result['transcript'], SEGMENTS[0]['text'])
+            self.assertIsNone(result['summary'])
+            self.assertEqual(result['degraded'], {'summary': 'unavailable', 'dependency': 'openai', 'retry_after': 12.0})
+            self.assertEqual(history_degraded(history), {'summary': 'unavailable'})
+            # The transcript is kept for the next run, but nothing is cached
+            self.assertEqual(VideoTranscript.query.count(), 1)
+            self.assertIsNone(result_cache.get(result_key('dQw4w9WgXcQ', 'short')))
+
+    @patch('pipeline.generate_summary', side_effect=CircuitOpen('openai', 12.0))
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', return_value=VIDEO_INFO)
+    def test_summary_from_an_earlier_prompt_version(self, mock_info, mock_segments, mock_summary):
+        with app.app_context():
+            db.session.add(VideoSummary(video_id='dQw4w9WgXcQ', summary_length='short', model='gpt-4o',
+                                        prompt_version='0', summary='An older summary.'))
+            db.session.commit()
+            history, result = process_video('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short')
+
+            self.assertEqual(result['summary'], 'An older summary.')
+            self.assertEqual(result['degraded']['summary'], 'stale')
+            self.assertEqual(history.summary_text, 'An older summary.')
+            self.assertEqual(history_degraded(history), {'summary': 'stale'})
+
+    @patch('utils.summarizer.SUMMARY_FALLBACK_BACKEND', '')
+    @patch('utils.summarizer.SUMMARY_BACKEND', 'openai')
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', return_value=VIDEO_INFO)
+    def test_stream_reports_degraded_mode(self, mock_info, mock_segments):
+        breaker = CircuitBreaker('openai', failure_threshold=1, reset_seconds=60)
+        breaker.record_failure()
+        with patch.dict(breakers, openai=breaker):
+            response = self.client.get('/process/stream?youtube_url=https://youtu.be/dQw4w9WgXcQ&summary_length=short')
+            body = response.data.decode()
+
+        events = [message.split('\n')[0][len('event: '):] for message in body.strip().split('\n\n')]
+        self.assertEqual(events, ['video_info', 'transcript', 'degraded', 'done'])
+
+    @patch('pipeline.get_video_info', side_effect=CircuitOpen('youtube_data', 20.0))
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    def test_youtube_outage_fails_fast(self, mock_segments, mock_info):
+        with app.app_context(), self.assertRaises(CircuitOpen):
+            process_video('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short')
+
+    def test_stats_endpoint(self):
+        data = json.loads(self.client.get('/breakers/stats').data)
+        self.assertEqual(set(data), {'youtube_data', 'transcripts', 'openai'})
+        self.assertIn(data['openai']['state'], ('closed', 'open', 'half_open'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from utils.cache import ResultCache
+from app import app, job_queue
+from pipeline import result_cache
+from models import VideoHistory, VideoTranscript, VideoSummary
+from db import db
+
+
+SEGMENTS = [{'text': 'This is a test transcript.', 'start': 0.0, 'duration': 2.0}]
+
+class TestResultCache(unittest.TestCase):
+
+    def test_memory_hit_and_miss_counters(self):
+        cache = ResultCache(max_entries=2, ttl_seconds=60)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+
+        stats = cache.stats()
+        self.assertEqual(stats['memory_hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_lru_eviction(self):
+        cache = ResultCache(max_entries=2, ttl_seconds=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    @patch('utils.cache.time.monotonic')
+    def test_ttl_expiry(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        cache = ResultCache(max_entries=2, ttl_seconds=10)
+        cache.set('a', 1)
+
+        mock_monotonic.return_value = 111.0
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_backing_lookup_promotes_to_memory(self):
+        calls = []
+
+        def lookup(key):
+            calls.append(key)
+            return 'from-db' if key == 'a' else None
+
+        cache = ResultCache(max_entries=2, ttl_seconds=60, backing_lookup=lookup)
+        self.assertEqual(cache.get('a'), 'from-db')
+        self.assertEqual(cache.get('a'), 'from-db')
+        self.assertIsNone(cache.get('b'))
+
+        self.assertEqual(calls, ['a', 'b'])
+        stats = cache.stats()
+        self.assertEqual(stats['backing_hits'], 1)
+        self.assertEqual(stats['memory_hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_byte_bound_evicts_least_recently_used(self):
+        cache = ResultCache(max_entries=10, ttl_seconds=60, max_bytes=10)
+        cache.set('a', b'aaaa')
+        cache.set('b', b'bbbb')
+        cache.get('a')
+        cache.set('c', b'cccc')
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), b'aaaa')
+        stats = cache.stats()
+        self.assertEqual(stats['bytes'], 8)
+        self.assertEqual(stats['evictions'], 1)
+
+        # Values larger than the whole budget are not cached at all
+        cache.set('d', b'd' * 11)
+        self.assertIsNone(cache.get('d'))
+        cache.invalidate('a')
+        self.assertEqual(cache.stats()['bytes'], 4)
+
+class TestProcessCache(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        app.config["TESTING"] = True
+        result_cache.clear()
+        with app.app_context():
+            VideoHistory.query.delete()
+            VideoTranscript.query.delete()
+            VideoSummary.query.delete()
+            db.session.commit()
+
+    @patch('pipeline.generate_summary')
+    @patch('pipeline.get_video_segments')
+    @patch('pipeline.get_video_info')
+    def test_repeat_request_skips_upstream_calls(self, mock_get_video_info,
+                                                mock_get_video_segments, mock_generate_summary):
+        mock_get_video_info.return_value = {
+            'title': 'Test Video',
+            'duration': 'PT5M30S',
+            'thumbnail': 'https://example.com/thumbnail.jpg'
+        }
+        mock_get_video_segments.return_value = SEGMENTS
+        mock_generate_summary.return_value = "This is a test summary."
+
+        form = {'youtube_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'summary_length': 'short'}
+        first = self.app.post('/process', data=form)
+        self.assertEqual(first.status_code, 202)
+        job_queue.wait(json.loads(first.data)['job_id'], timeout=5)
+
+        # Same video through a different URL form hits the cache
+        second = self.app.post('/process', data={'youtube_url': 'https://youtu.be/dQw4w9WgXcQ', 'summary_length': 'short'})
+        data = json.loads(second.data)
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(data['cached'])
+        self.assertEqual(data['summary'], "This is a test summary.")
+
+        self.assertEqual(mock_get_video_info.call_count, 1)
+        self.assertEqual(mock_get_video_segments.call_count, 1)
+        self.assertEqual(mock_generate_summary.call_count, 1)
+
+    @patch('pipeline.generate_summary')
+    @patch('pipeline.get_video_segments')
+    @patch('pipeline.get_video_info')
+    def test_database_tier_serves_after_memory_cleared(self, mock_get_video_info,
+                                                      mock_get_video_segments, mock_generate_summary):
+        with app.app_context():
+            db.session.add(VideoHistory(
+                video_url='https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+                video_id='dQw4w9WgXcQ',
+                video_title='Stored Video',
+                video_duration='PT1M',
+                video_thumbnail='https://example.com/thumbnail.jpg',
+                transcript='Stored transcript.',
+                summary='Stored summary.',
+                summary_length='medium'
+            ))
+            db.session.commit()
+
+        response = self.app.post('/process', data={'youtube_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'})
+        data = json.loads(response.data)
+
+        self.assertTrue(data['cached'])
+        self.assertEqual(data['video_info']['title'], 'Stored Video')
+        mock_get_video_info.assert_not_called()
+        mock_get_video_segments.assert_not_called()
+        mock_generate_summary.assert_not_called()
+
+        stats = json.loads(self.app.get('/cache/stats').data)
+        self.assertEqual(stats['backing_hits'], 1)
+
+    def test_invalid_url_returns_bad_request(self):
+        response = self.app.post('/process', data={'youtube_url': 'https://www.example.com/video'})
+        self.assertEqual(response.status_code, 400)
+
+    @patch('pipeline.generate_summary')
+    @patch('pipeline.get_video_segments')
+    @patch('pipeline.get_video_info')
+    def test_language_preferences_are_cached_separately(self, mock_get_video_info,
+                                                        mock_get_video_segments, mock_generate_summary):
+        mock_get_video_info.return_value = {
+            'title': 'Test Video',
+            'duration': 'PT5M30S',
+            'thumbnail': 'https://example.com/thumbnail.jpg'
+        }
+        mock_get_video_segments.return_value = SEGMENTS
+        mock_generate_summary.return_value = "This is a test summary."
+
+        url = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+        for languages in ('de, en', ''):
+            response = self.app.post('/process', data={'youtube_url': url, 'languages': languages})
+            self.assertEqual(response.status_code, 202)
+            job_queue.wait(json.loads(response.data)['job_id'], timeout=5)
+
+        self.assertEqual([call.args[1] for call in mock_get_video_segments.call_args_list], ['de,en', None])
+        cached = self.app.post('/process', data={'youtube_url': url, 'languages': 'de,en'})
+        self.assertTrue(json.loads(cached.data)['cached'])
+
+    def test_invalid_languages_return_bad_request(self):
+        response = self.app.post('/process', data={
+            'youtube_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'languages': 'en;drop'
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Invalid language code', json.loads(response.data)['error'])
+
+if __name__ == '__main__':
+    unittest.main()
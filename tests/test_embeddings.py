@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from utils import embeddings
+from utils.embeddings import (
+    HashingEmbedder, chunk_segments, pack_vectors, unpack_vectors, pack_bounds, unpack_bounds, top_k
+)
+
+def segment(text, start=0.0):
+    return {'text': text, 'start': start, 'duration': 1.0}
+
+class TestChunking(unittest.TestCase):
+
+    def test_chunks_break_on_segment_boundaries(self):
+        segments = [segment('word ' * 40, float(index)) for index in range(10)]
+        bounds = chunk_segments(segments, max_tokens=100)
+
+        self.assertEqual(bounds[0], 0)
+        self.assertEqual(bounds[-1], 10)
+        self.assertGreater(len(bounds), 3)
+        self.assertEqual(bounds, sorted(set(bounds)))
+
+    def test_oversized_segment_is_its_own_chunk(self):
+        segments = [segment('short'), segment('word ' * 500), segment('short')]
+        self.assertEqual(chunk_segments(segments, max_tokens=50), [0, 1, 2, 3])
+
+    def test_empty_transcript_has_no_chunks(self):
+        self.assertEqual(chunk_segments([]), [])
+
+class TestHashingEmbedder(unittest.TestCase):
+
+    def test_vectors_are_deterministic_and_unit_length(self):
+        first, second = HashingEmbedder(256).embed(['Caching makes repeat requests fast.'] * 2)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 256)
+        self.assertAlmostEqual(sum(value * value for value in first), 1.0, places=5)
+
+    def test_related_text_scores_higher(self):
+        embedder = HashingEmbedder()
+        query, related, unrelated = embedder.embed([
+            'how does the cache expire entries',
+            'entries in the cache expire after an hour',
+            'the speaker thanks the sponsors of the show'
+        ])
+        dot = lambda a, b: sum(x * y for x, y in zip(a, b))
+
+        self.assertGreater(dot(query, related), dot(query, unrelated))
+
+class TestPackingAndSearch(unittest.TestCase):
+
+    def test_vectors_round_trip_as_float32(self):
+        vectors = [[0.5, -0.25, 0.125], [1.0, 0.0, -1.0]]
+        data = pack_vectors(vectors)
+
+        self.assertEqual(len(data), 4 * 6)
+        self.assertEqual([list(map(float, row)) for row in unpack_vectors(data, 3)], vectors)
+
+    def test_bounds_round_trip(self):
+        self.assertEqual(unpack_bounds(pack_bounds([0, 3, 70000])), [0, 3, 70000])
+        # Four bytes per boundary, little-endian, whatever the platform's C long is
+        self.assertEqual(pack_bounds([1, 70000]), b'\x01\x00\x00\x00\x70\x11\x01\x00')
+
+    def test_top_k_orders_by_similarity(self):
+        matrix = unpack_vectors(pack_vectors([[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]]), 2)
+        hits = top_k(matrix, [0.0, 1.0], 2)
+
+        self.assertEqual([index for index, _ in hits], [1, 2])
+        self.assertAlmostEqual(hits[1][1], 0.8, places=5)
+
+    def test_top_k_without_numpy(self):
+        with patch.object(embeddings, 'np', None):
+            matrix = unpack_vectors(pack_vectors([[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]]), 2)
+            hits = top_k(matrix, [0.0, 1.0], 5)
+
+        self.assertEqual([index for index, _ in hits], [1, 2, 0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import extractive
+from utils.extractive import extractive_summary, split_sentences
+from utils.tokens import count_tokens
+
+SENTENCES = [
+    "Python caching speeds up repeated function calls.",
+    "The lru_cache decorator caches function results in memory.",
+    "My cat likes to sleep on the keyboard.",
+    "Caching function results avoids repeated expensive calls.",
+    "Memory use grows with the number of cached results.",
+    "Python caching with lru_cache is thread safe.",
+    "Anyway, let us get lunch."
+]
+
+class ExtractiveTests:
+    """Run against both the NumPy and pure-Python rankers."""
+
+    def test_picks_central_sentences_in_original_order(self):
+        summary = extractive_summary(' '.join(SENTENCES), max_tokens=30)
+        picked = [sentence for sentence in SENTENCES if sentence in summary]
+        self.assertTrue(picked)
+        self.assertEqual(summary, ' '.join(picked))
+        self.assertNotIn("cat", summary)
+        self.assertNotIn("lunch", summary)
+
+    def test_respects_token_budget(self):
+        text = ' '.join(SENTENCES * 20)
+        for budget in (20, 60, 120):
+            self.assertLessEqual(count_tokens(extractive_summary(text, budget)), budget)
+
+    def test_skips_duplicate_sentences(self):
+        summary = extractive_summary(' '.join(SENTENCES * 3), max_tokens=200)
+        self.assertEqual(summary.count(SENTENCES[1]), 1)
+
+    def test_accepts_segment_lists_without_punctuation(self):
+        segments = ['so today we talk about caching'] * 10 + ['and then we talk about cooking'] * 2
+        summary = extractive_summary(segments, max_tokens=50)
+        self.assertTrue(summary)
+        self.assertLessEqual(count_tokens(summary), 50)
+
+    def test_empty(self):
+        self.assertEqual(extractive_summary('', 100), '')
+
+
+@unittest.skipIf(extractive.np is None, "numpy is not installed")
+class TestNumpyRanker(ExtractiveTests, unittest.TestCase):
+    pass
+
+
+class TestPythonRanker(ExtractiveTests, unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('utils.extractive.np', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestSplitSentences(unittest.TestCase):
+
+    def test_windows_long_unpunctuated_text(self):
+        sentences = split_sentences(' '.join(['word'] * 100))
+        self.assertEqual([len(sentence.split()) for sentence in sentences], [30, 30, 30, 10])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from sqlalchemy import event
+from app import app
+from history import recent_history
+from models import VideoHistory
+from db import db
+
+BASE_TIME = datetime(2024, 1, 1, 12, 0, 0)
+
+class TestHistoryApi(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        app.config["TESTING"] = True
+        with app.app_context():
+            VideoHistory.query.delete()
+            # Rows 4 and 5 share a timestamp to exercise the id tie-breaker
+            minutes = [0, 1, 2, 3, 3, 5, 6]
+            for index in range(7):
+                db.session.add(VideoHistory(
+                    id=index + 1,
+                    video_url=f'https://youtu.be/video{index:06d}',
+                    video_id=f'video{index:06d}',
+                    video_title=f'Video {index}',
+                    transcript='x' * 1000,
+                    summary=f'Summary {index}',
+                    summary_length='short',
+                    created_at=BASE_TIME + timedelta(minutes=minutes[index])
+                ))
+            db.session.commit()
+
+    def test_pages_newest_first_without_gaps(self):
+        ids = []
+        cursor = None
+        pages = 0
+        while True:
+            url = '/history?limit=3' + (f'&cursor={cursor}' if cursor else '')
+            data = self.app.get(url).get_json()
+            ids.extend(item['id'] for item in data['items'])
+            pages += 1
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(ids, [7, 6, 5, 4, 3, 2, 1])
+
+    def test_items_exclude_large_columns(self):
+        item = self.app.get('/history?limit=1').get_json()['items'][0]
+        self.assertNotIn('summary', item)
+        self.assertNotIn('transcript', item)
+        self.assertEqual(item['title'], 'Video 6')
+
+    def test_filter_by_video_id(self):
+        data = self.app.get('/history?video_id=video000002').get_json()
+        self.assertEqual([item['id'] for item in data['items']], [3])
+        self.assertIsNone(data['next_cursor'])
+
+    def test_invalid_cursor(self):
+        response = self.app.get('/history?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail_includes_summary(self):
+        data = self.app.get('/history/2').get_json()
+        self.assertEqual(data['summary'], 'Summary 1')
+        self.assertEqual(self.app.get('/history/999').status_code, 404)
+
+    def test_recent_history_does_not_select_text_columns(self):
+        statements = []
+        with app.app_context():
+            listener = lambda conn, cursor, statement, *args: statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                rows = recent_history(5)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(len(statements), 1)
+        self.assertNotRegex(statements[0], r'video_history\.(transcript|summary) ')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import asyncio
+import httpx
+import requests
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from utils import http_client
+from utils.http_client import get_json, get_json_async, backoff_delay, latency_stats
+
+def fake_response(status_code, json_data=None, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = json_data
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(f"HTTP {status_code}")
+    return response
+
+class TestHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        latency_stats.clear()
+
+    def test_session_is_pooled(self):
+        adapter = http_client.session.get_adapter('https://www.googleapis.com')
+        self.assertEqual(adapter._pool_maxsize, http_client.HTTP_POOL_SIZE)
+
+    @patch('utils.http_client.time.sleep')
+    @patch('utils.http_client.session')
+    def test_retries_transient_errors(self, mock_session, mock_sleep):
+        mock_session.get.side_effect = [
+            fake_response(503),
+            fake_response(429, headers={'Retry-After': '2'}),
+            fake_response(200, {'items': []})
+        ]
+
+        self.assertEqual(get_json('https://example.com/api', endpoint='test'), {'items': []})
+        self.assertEqual(mock_session.get.call_count, 3)
+        self.assertEqual(mock_sleep.call_args_list[-1].args[0], 2.0)
+
+        _, kwargs = mock_session.get.call_args
+        self.assertEqual(kwargs['timeout'], (http_client.HTTP_CONNECT_TIMEOUT, http_client.HTTP_READ_TIMEOUT))
+
+        stats = latency_stats.snapshot()['test']
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['retries'], 2)
+        self.assertEqual(stats['errors'], 2)
+
+    @patch('utils.http_client.time.sleep')
+    @patch('utils.http_client.session')
+    def test_client_errors_are_not_retried(self, mock_session, mock_sleep):
+        mock_session.get.return_value = fake_response(404)
+
+        with self.assertRaises(requests.HTTPError):
+            get_json('https://example.com/api')
+        self.assertEqual(mock_session.get.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    @patch('utils.http_client.time.sleep')
+    @patch('utils.http_client.session')
+    def test_gives_up_after_max_retries(self, mock_session, mock_sleep):
+        mock_session.get.side_effect = requests.ConnectionError("connection reset")
+
+        with self.assertRaises(requests.ConnectionError):
+            get_json('https://example.com/api')
+        self.assertEqual(mock_session.get.call_count, http_client.HTTP_MAX_RETRIES + 1)
+
+    def test_backoff_is_jittered_and_capped(self):
+        for attempt in range(10):
+            delay = backoff_delay(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, http_client.HTTP_BACKOFF_MAX)
+
+        response = fake_response(429, headers={'Retry-After': '3600'})
+        self.assertEqual(backoff_delay(0, response), http_client.HTTP_BACKOFF_MAX)
+
+class TestAsyncHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        latency_stats.clear()
+
+    def run_with_transport(self, handler, url='https://example.com/api'):
+        async def call():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                with patch('utils.http_client.get_async_client', return_value=client):
+                    return await get_json_async(url, endpoint='test.api')
+            finally:
+                await client.aclose()
+        return asyncio.run(call())
+
+    @patch('utils.http_client.backoff_delay', return_value=0)
+    def test_retries_transient_errors(self, mock_backoff):
+        responses = [httpx.Response(503), httpx.Response(200, json={'ok': True})]
+        self.assertEqual(self.run_with_transport(lambda request: responses.pop(0)), {'ok': True})
+        self.assertEqual(latency_stats.snapshot()['test.api']['retries'], 1)
+
+    def test_client_errors_are_not_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(404)
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            self.run_with_transport(handler)
+        self.assertEqual(len(calls), 1)
+
+    def test_one_client_per_event_loop(self):
+        async def client_pair():
+            first, second = http_client.get_async_client(), http_client.get_async_client()
+            await http_client.close_async_client()
+            return first, second
+
+        first, second = asyncio.run(client_pair())
+        self.assertIs(first, second)
+        self.assertIsNot(asyncio.run(client_pair())[0], first)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import threading
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from app import app
+from ingest import run_ingest, classify
+from pipeline import result_cache
+import ingest
+from models import VideoHistory, VideoTranscript, VideoSummary, IngestRun, IngestItem
+from db import db
+
+PLAYLIST_URL = 'https://www.youtube.com/playlist?list=PLtest'
+
+PAGES = {
+    None: (['aaaaaaaaaaa', 'bbbbbbbbbbb'], 'page2'),
+    'page2': (['ccccccccccc', 'aaaaaaaaaaa', 'ddddddddddd'], None)
+}
+
+def fake_video_info(url):
+    return {'title': f'Video {url[-11:]}', 'duration': 'PT1M', 'thumbnail': 'https://example.com/thumbnail.jpg'}
+
+def fake_segments(url, languages=None):
+    return [{'text': f'Transcript of {url[-11:]}.', 'start': 0.0, 'duration': 2.0}]
+
+
+class FakePlaylist:
+    """Stands in for the Data API: two playlist pages, and an ETag per video ('ddddddddddd' is private)."""
+
+    def __init__(self):
+        self.etags = {'aaaaaaaaaaa': 'e1', 'bbbbbbbbbbb': 'e1', 'ccccccccccc': 'e1'}
+        self.pages = []
+        self.fail_on = ()
+
+    def list_page(self, playlist_id, page_token=None):
+        self.pages.append(page_token)
+        if page_token == self.fail_on:
+            raise ConnectionError('connection reset')
+        return PAGES[page_token]
+
+    def get_etags(self, video_ids):
+        return {video_id: self.etags[video_id] for video_id in video_ids if video_id in self.etags}
+
+
+class TestIngest(unittest.TestCase):
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        result_cache.clear()
+        with app.app_context():
+            for model in (IngestItem, IngestRun, VideoHistory, VideoTranscript, VideoSummary):
+                model.query.delete()
+            db.session.commit()
+
+        self.playlist = FakePlaylist()
+        patches = [
+            patch('ingest.list_playlist_page', side_effect=self.playlist.list_page),
+            patch('ingest.get_videos_etags', side_effect=self.playlist.get_etags),
+            patch('pipeline.get_video_info', side_effect=fake_video_info),
+            patch('pipeline.get_video_segments', side_effect=fake_segments)
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        summary = patch('batch.generate_summary', return_value='Ingested summary.')
+        self.summarize = summary.start()
+        self.addCleanup(summary.stop)
+
+    def ingest(self, **options):
+        with app.app_context():
+            return list(run_ingest(PLAYLIST_URL, 'short', **options))
+
+    def processed(self, statuses):
+        return sorted(status['video_id'] for status in statuses if status.get('status') == 'completed')
+
+    def test_first_run_processes_every_available_video(self):
+        statuses = self.ingest()
+
+        self.assertEqual(self.processed(statuses), ['aaaaaaaaaaa', 'bbbbbbbbbbb', 'ccccccccccc'])
+        summary = statuses[-1]['summary']
+        self.assertEqual(summary['status'], 'completed')
+        self.assertEqual(summary['videos'], 4)
+        self.assertEqual(summary['changes'], {'new': 3, 'unavailable': 1})
+        with app.app_context():
+            self.assertEqual(VideoHistory.query.count(), 3)
+
+    def test_second_run_only_processes_changed_videos(self):
+        self.ingest()
+        self.summarize.reset_mock()
+        self.assertEqual(self.processed(self.ingest()), [])
+        self.assertFalse(self.summarize.called)
+
+        self.playlist.etags['bbbbbbbbbbb'] = 'e2'
+        statuses = self.ingest()
+
+        self.assertEqual(self.processed(statuses), ['bbbbbbbbbbb'])
+        self.assertEqual(statuses[-1]['summary']['changes'], {'unchanged': 2, 'changed': 1, 'unavailable': 1})
+        # Only the metadata changed, so the stored summary is kept
+        self.assertFalse(self.summarize.called)
+
+    def test_changed_captions_are_summarized_again(self):
+        self.ingest()
+        self.playlist.etags['bbbbbbbbbbb'] = 'e2'
+        with patch('pipeline.get_video_segments', return_value=[{'text': 'New captions.', 'start': 0.0, 'duration': 1.0}]):
+            self.ingest()
+
+        self.assertEqual(self.summarize.call_count, 4)
+        with app.app_context():
+            self.assertEqual(VideoTranscript.query.filter_by(video_id='bbbbbbbbbbb').one().text(), 'New captions.')
+
+    def test_stored_videos_are_not_processed_again(self):
+        with app.app_context():
+            db.session.add(VideoSummary(video_id='aaaaaaaaaaa', summary_length='short', model='gpt-4o',
+                                        prompt_version='1', summary='Processed earlier.'))
+            db.session.commit()
+
+        statuses = self.ingest()
+
+        self.assertEqual(self.processed(statuses), ['bbbbbbbbbbb', 'ccccccccccc'])
+        self.assertEqual(statuses[-1]['summary']['changes']['unchanged'], 1)
+
+    def test_stored_data_is_read_by_the_workers(self):
+        self.ingest()
+        self.playlist.etags['bbbbbbbbbbb'] = 'e2'
+        self.playlist.etags['ccccccccccc'] = 'e2'
+        threads = []
+        lookup = ingest._previous_result
+
+        def previous_result(video_id, summary_length, languages=None):
+            threads.append(threading.current_thread().name)
+            return lookup(video_id, summary_length, languages)
+
+        with patch('ingest._previous_result', side_effect=previous_result):
+            statuses = self.ingest(concurrency=2)
+
+        self.assertEqual(self.processed(statuses), ['bbbbbbbbbbb', 'ccccccccccc'])
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(name.startswith('ingest') for name in threads))
+
+    def test_listing_resumes_from_the_last_page(self):
+        self.playlist.fail_on = 'page2'
+        with self.assertRaises(ConnectionError):
+            self.ingest()
+
+        self.playlist.fail_on = ()
+        statuses = self.ingest()
+
+        self.assertTrue(statuses[0]['resumed'])
+        self.assertEqual(self.playlist.pages, [None, 'page2', 'page2'])
+        self.assertEqual(self.processed(statuses), ['aaaaaaaaaaa', 'bbbbbbbbbbb', 'ccccccccccc'])
+
+    def test_processing_resumes_after_an_interruption(self):
+        with app.app_context():
+            run = run_ingest(PLAYLIST_URL, 'short', concurrency=1)
+            for status in run:
+                if status.get('status') == 'completed':
+                    break
+            run.close()
+            self.assertEqual(IngestItem.query.filter_by(status='done').count(), 1)
+
+        # Work that was not committed before the interruption is done again; committed work is not
+        self.summarize.reset_mock()
+        statuses = self.ingest()
+
+        self.assertTrue(statuses[0]['resumed'])
+        self.assertEqual(len(self.processed(statuses)), 2)
+        self.assertEqual(self.summarize.call_count, 2)
+
+    def test_restart_starts_a_new_run(self):
+        self.playlist.fail_on = 'page2'
+        with self.assertRaises(ConnectionError):
+            self.ingest()
+        self.playlist.fail_on = ()
+
+        statuses = self.ingest(restart=True)
+
+        self.assertFalse(statuses[0]['resumed'])
+        with app.app_context():
+            self.assertEqual(IngestRun.query.count(), 2)
+
+    @patch('ingest.get_uploads_playlist', return_value='UUchannel')
+    def test_channel_lists_its_uploads(self, mock_uploads):
+        with app.app_context():
+            list(run_ingest('https://www.youtube.com/@somechannel', 'short'))
+            self.assertEqual(IngestRun.query.one().playlist_id, 'UUchannel')
+
+        mock_uploads.assert_called_once_with('handle', '@somechannel')
+
+    def test_classify(self):
+        self.assertEqual(classify(None, 'e1', True), ('unavailable', 'skipped'))
+        self.assertEqual(classify('e1', None, False), ('new', 'pending'))
+        self.assertEqual(classify('e2', 'e1', True), ('changed', 'pending'))
+        self.assertEqual(classify('e1', 'e1', True), ('unchanged', 'skipped'))
+        # Videos processed before ingestion existed have no ETag yet; this one becomes it
+        self.assertEqual(classify('e1', None, True), ('unchanged', 'skipped'))
+
+    def test_ingest_endpoint(self):
+        response = self.client.post('/ingest', json={'url': PLAYLIST_URL, 'summary_length': 'short'})
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(lines[-1]['summary']['items'], {'done': 3, 'skipped': 1})
+
+        status = self.client.get(f"/ingest/{lines[0]['run_id']}").get_json()
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(self.client.get('/ingest/999999').status_code, 404)
+
+    def test_ingest_endpoint_rejects_video_urls(self):
+        response = self.client.post('/ingest', json={'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post('/ingest', json={}).status_code, 400)
+
+    def test_ingest_endpoint_rejects_bad_concurrency(self):
+        for concurrency in (0, 'many', True):
+            response = self.client.post('/ingest', json={'url': PLAYLIST_URL, 'concurrency': concurrency})
+            self.assertEqual(response.status_code, 400, concurrency)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import threading
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from app import app, job_queue
+from jobs import JobQueue, QueueFullError
+from pipeline import result_cache
+from models import VideoHistory, ProcessingJob
+from db import db
+
+SEGMENTS = [{'text': 'This is a test transcript.', 'start': 0.0, 'duration': 2.0}]
+
+VIDEO_INFO = {
+    'title': 'Test Video',
+    'duration': 'PT5M30S',
+    'thumbnail': 'https://example.com/thumbnail.jpg'
+}
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        app.config["TESTING"] = True
+        result_cache.clear()
+        with app.app_context():
+            ProcessingJob.query.delete()
+            VideoHistory.query.delete()
+            db.session.commit()
+
+    @patch('pipeline.generate_summary')
+    @patch('pipeline.get_video_segments')
+    @patch('pipeline.get_video_info')
+    def test_process_enqueues_and_job_completes(self, mock_get_video_info,
+                                                mock_get_video_segments, mock_generate_summary):
+        mock_get_video_info.return_value = VIDEO_INFO
+        mock_get_video_segments.return_value = SEGMENTS
+        mock_generate_summary.return_value = "This is a test summary."
+
+        response = self.app.post('/process', data={'youtube_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'})
+        self.assertEqual(response.status_code, 202)
+        data = json.loads(response.data)
+        self.assertIn('job_id', data)
+
+        job_queue.wait(data['job_id'], timeout=5)
+
+        status = json.loads(self.app.get(data['status_url']).data)
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['progress'], 100)
+        self.assertEqual(status['summary'], "This is a test summary.")
+        self.assertEqual(status['video_info']['title'], 'Test Video')
+        self.assertEqual(status['preprocessing']['segments_in'], len(SEGMENTS))
+        self.assertIn('tokens_saved', status['preprocessing'])
+
+    @patch('pipeline.generate_summary')
+    @patch('pipeline.get_video_segments')
+    @patch('pipeline.get_video_info')
+    def test_failed_job_reports_error(self, mock_get_video_info,
+                                      mock_get_video_segments, mock_generate_summary):
+        mock_get_video_info.return_value = VIDEO_INFO
+        mock_get_video_segments.return_value = SEGMENTS
+        mock_generate_summary.side_effect = Exception("OpenAI API Error")
+
+        response = self.app.post('/process', data={'youtube_url': 'https://youtu.be/dQw4w9WgXcQ'})
+        job_id = json.loads(response.data)['job_id']
+        job_queue.wait(job_id, timeout=5)
+
+        status = json.loads(self.app.get(f'/jobs/{job_id}').data)
+        self.assertEqual(status['status'], 'failed')
+        self.assertEqual(status['stage'], 'summarizing')
+        self.assertIn('OpenAI API Error', status['error'])
+
+    def test_unknown_job_returns_not_found(self):
+        response = self.app.get('/jobs/does-not-exist')
+        self.assertEqual(response.status_code, 404)
+
+    def test_queue_rejects_when_full(self):
+        release = threading.Event()
+        queue = JobQueue(app, lambda job_id: release.wait(5), max_workers=1, max_pending=1)
+        try:
+            with app.app_context():
+                queue.submit('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short')
+                with self.assertRaises(QueueFullError):
+                    queue.submit('https://youtu.be/abcdefghijk', 'abcdefghijk', 'short')
+        finally:
+            release.set()
+            queue.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from app import app
+import asyncio
+from locks import try_acquire, release, processing_lock, processing_lock_async, LockTimeout
+from pipeline import process_video, save_result, result_cache
+from models import ProcessingLock, VideoHistory
+from db import db
+
+SEGMENTS = [{'text': 'This is a test transcript.', 'start': 0.0, 'duration': 2.0}]
+
+VIDEO_INFO = {
+    'title': 'Test Video',
+    'duration': 'PT5M30S',
+    'thumbnail': 'https://example.com/thumbnail.jpg'
+}
+
+class TestProcessingLock(unittest.TestCase):
+
+    def setUp(self):
+        result_cache.clear()
+        with app.app_context():
+            ProcessingLock.query.delete()
+            VideoHistory.query.delete()
+            db.session.commit()
+
+    def test_lock_is_exclusive_until_released(self):
+        with app.app_context():
+            self.assertTrue(try_acquire('process:a:short', 'owner-1'))
+            self.assertFalse(try_acquire('process:a:short', 'owner-2'))
+            release('process:a:short', 'owner-1')
+            self.assertTrue(try_acquire('process:a:short', 'owner-2'))
+
+    def test_expired_lock_is_taken_over(self):
+        with app.app_context():
+            db.session.add(ProcessingLock(name='process:a:short', owner='dead', expires_at=datetime.utcnow() - timedelta(seconds=1)))
+            db.session.commit()
+            self.assertTrue(try_acquire('process:a:short', 'owner-1'))
+            self.assertEqual(ProcessingLock.query.one().owner, 'owner-1')
+
+    def test_wait_times_out(self):
+        with app.app_context():
+            try_acquire('process:a:short', 'other-process')
+            with self.assertRaises(LockTimeout):
+                with processing_lock('process:a:short', timeout=0.05, poll=0.01):
+                    pass
+
+    def test_released_after_failure(self):
+        with app.app_context():
+            with self.assertRaises(ValueError):
+                with processing_lock('process:a:short'):
+                    raise ValueError('boom')
+            self.assertEqual(ProcessingLock.query.count(), 0)
+
+    def test_held_lock_is_renewed_past_its_ttl(self):
+        with app.app_context():
+            with processing_lock('process:a:short', ttl=0.3):
+                time.sleep(0.6)
+                self.assertFalse(try_acquire('process:a:short', 'owner-2'))
+            self.assertEqual(ProcessingLock.query.count(), 0)
+
+    def test_async_lock_is_renewed_past_its_ttl(self):
+        async def hold():
+            async with processing_lock_async(app, 'process:a:short', ttl=0.3):
+                await asyncio.sleep(0.6)
+                with app.app_context():
+                    return try_acquire('process:a:short', 'owner-2')
+
+        self.assertFalse(asyncio.run(hold()))
+
+
+class TestCoalescedProcessing(unittest.TestCase):
+
+    def setUp(self):
+        result_cache.clear()
+        with app.app_context():
+            ProcessingLock.query.delete()
+            VideoHistory.query.delete()
+            db.session.commit()
+
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', return_value=VIDEO_INFO)
+    def test_concurrent_requests_summarize_once(self, mock_get_video_info, mock_get_video_segments):
+        calls = []
+
+        def slow_summary(texts, length):
+            calls.append(length)
+            time.sleep(0.3)
+            return 'Shared summary.'
+
+        history_ids = []
+
+        def request():
+            with app.app_context():
+                history, result = process_video('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short')
+                history_ids.append(history.id)
+
+        with patch('pipeline.generate_summary', side_effect=slow_summary):
+            threads = [threading.Thread(target=request) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+                time.sleep(0.02)
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(calls, ['short'])
+        self.assertEqual(len(set(history_ids)), 1)
+        self.assertEqual(len(history_ids), 4)
+        with app.app_context():
+            self.assertEqual(VideoHistory.query.count(), 1)
+            self.assertEqual(ProcessingLock.query.count(), 0)
+
+    @patch('pipeline.generate_summary')
+    @patch('pipeline.get_video_segments')
+    @patch('pipeline.get_video_info')
+    def test_reuses_result_finished_by_another_process(self, mock_get_video_info,
+                                                       mock_get_video_segments, mock_generate_summary):
+        @contextmanager
+        def lock_held_elsewhere(name):
+            # Stand-in for waiting on another worker that saves the result meanwhile
+            save_result('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short', VIDEO_INFO, SEGMENTS, 'From another worker.')
+            yield True
+
+        with app.app_context(), patch('pipeline.processing_lock', lock_held_elsewhere):
+            history, result = process_video('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short')
+
+        self.assertEqual(result['summary'], 'From another worker.')
+        mock_get_video_info.assert_not_called()
+        mock_generate_summary.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from utils.metrics import Registry
+from utils.tracing import trace, span, propagate, stage_seconds, add_listener, remove_listener
+
+class TestRegistry(unittest.TestCase):
+
+    def test_renders_counters_with_labels(self):
+        registry = Registry()
+        counter = registry.counter('jobs_total', 'Jobs run.', ['status'])
+        counter.inc(status='done')
+        counter.inc(2, status='failed "x"')
+
+        text = registry.render()
+        self.assertIn('# TYPE jobs_total counter', text)
+        self.assertIn('jobs_total{status="done"} 1', text)
+        self.assertIn('jobs_total{status="failed \\"x\\""} 2', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        histogram = registry.histogram('latency_seconds', 'Latency.', buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+
+        text = registry.render()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_count 3', text)
+        self.assertIn('latency_seconds_sum 5.55', text)
+
+    def test_collectors_are_read_at_render_time(self):
+        registry = Registry()
+        state = {'size': 1}
+        registry.collector(lambda: [('cache_entries', 'gauge', 'Entries.', [({}, state['size'])])])
+        state['size'] = 7
+        self.assertIn('cache_entries 7', registry.render())
+
+class TestTracing(unittest.TestCase):
+
+    def test_spans_are_recorded_in_trace_and_histogram(self):
+        before = sum(1 for _ in stage_seconds.samples())
+        with trace('test') as request_trace:
+            with span('unit_test_stage'):
+                pass
+            with self.assertRaises(ValueError):
+                with span('unit_test_failure'):
+                    raise ValueError('boom')
+
+        self.assertEqual([stage for stage, _, _ in request_trace.spans], ['unit_test_stage', 'unit_test_failure'])
+        self.assertEqual([error for _, _, error in request_trace.spans], [False, True])
+        self.assertGreater(sum(1 for _ in stage_seconds.samples()), before)
+
+    def test_propagates_trace_to_worker_threads(self):
+        def work():
+            with span('unit_test_worker'):
+                return 1
+
+        with ThreadPoolExecutor(max_workers=2) as executor, trace('test') as request_trace:
+            futures = [executor.submit(propagate(work)) for _ in range(2)]
+            [future.result() for future in futures]
+
+        self.assertEqual([stage for stage, _, _ in request_trace.spans], ['unit_test_worker'] * 2)
+
+    def test_slow_requests_are_logged_with_breakdown(self):
+        with patch('utils.tracing.SLOW_REQUEST_SECONDS', 0.01), self.assertLogs('utils.tracing', 'WARNING') as logs:
+            with trace('process', video_id='abc'):
+                with span('summary'):
+                    time.sleep(0.02)
+
+        self.assertIn('Slow process', logs.output[0])
+        self.assertIn('video_id=abc', logs.output[0])
+        self.assertIn('summary=0.0', logs.output[0])
+
+    def test_listeners_receive_finished_traces(self):
+        finished = []
+        add_listener(finished.append)
+        try:
+            with trace('test'):
+                with span('unit_test_listener'):
+                    pass
+        finally:
+            remove_listener(finished.append)
+
+        self.assertEqual(len(finished), 1)
+        self.assertEqual(finished[0].spans[0][0], 'unit_test_listener')
+        self.assertIsNotNone(finished[0].duration)
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    @patch('pipeline.stream_summary', return_value=iter(['A summary.']))
+    @patch('pipeline.get_video_segments', return_value=[{'text': 'Hello there.', 'start': 0.0, 'duration': 1.0}])
+    @patch('pipeline.get_video_info', return_value={'title': 'T', 'duration': 'PT1M', 'thumbnail': 'x'})
+    def test_exposes_stage_and_request_metrics(self, mock_get_video_info, mock_get_video_segments, mock_stream_summary):
+        from app import app
+        from pipeline import result_cache
+        result_cache.clear()
+        client = app.test_client()
+        client.get('/process/stream?youtube_url=https://youtu.be/M7lc1UVf-VE&summary_length=short').get_data()
+
+        response = client.get('/metrics')
+        text = response.get_data(as_text=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        for stage in ('metadata_fetch', 'transcript_fetch', 'summary', 'db_commit'):
+            self.assertIn(f'ytt_stage_duration_seconds_count{{stage="{stage}"}}', text)
+        self.assertIn('ytt_http_requests_total{endpoint="/process/stream",method="GET",status="200"}', text)
+        self.assertIn('ytt_cache_hit_ratio', text)
+        self.assertIn('ytt_job_queue_pending 0', text)
+
+    def test_job_queue_gauge_reads_the_serving_app(self):
+        from app import create_app
+        other = create_app()
+        with patch.object(other.extensions['job_queue'], 'pending', return_value=3):
+            text = other.test_client().get('/metrics').get_data(as_text=True)
+        self.assertIn('ytt_job_queue_pending 3', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import sys
+import os
+import threading
+import contextvars
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from utils.microbatch import MicroBatcher
+from utils.ratelimit import priority, priority_rank, PRIORITIES
+
+level = contextvars.ContextVar('level', default=None)
+
+class TestMicroBatcher(unittest.TestCase):
+
+    def test_duplicate_keys_share_one_lookup(self):
+        calls = []
+
+        def fetch_many(keys):
+            calls.append(keys)
+            return {key: key.upper() for key in keys}
+
+        batcher = MicroBatcher(fetch_many, window=0.05)
+        futures = [batcher.submit(key) for key in ['a', 'b', 'a']]
+
+        self.assertEqual([future.result(timeout=2) for future in futures], ['A', 'B', 'A'])
+        self.assertEqual(calls, [['a', 'b']])
+
+    def test_max_batch_limits_keys_per_call(self):
+        calls = []
+        lock = threading.Lock()
+
+        def fetch_many(keys):
+            with lock:
+                calls.append(len(keys))
+            return {key: key for key in keys}
+
+        batcher = MicroBatcher(fetch_many, max_batch=3, window=0.05)
+        futures = [batcher.submit(i) for i in range(7)]
+
+        self.assertEqual([future.result(timeout=2) for future in futures], list(range(7)))
+        self.assertTrue(all(size <= 3 for size in calls))
+        self.assertEqual(sum(calls), 7)
+
+    def test_errors_propagate_to_every_caller(self):
+        def fetch_many(keys):
+            raise RuntimeError("quota exceeded")
+
+        batcher = MicroBatcher(fetch_many, window=0.01)
+        futures = [batcher.submit(key) for key in ['a', 'b']]
+
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=2)
+
+    def test_batch_runs_in_a_callers_context(self):
+        seen = []
+
+        def fetch_many(keys):
+            seen.append(level.get())
+            return {key: key for key in keys}
+
+        batcher = MicroBatcher(fetch_many, window=0.05)
+        token = level.set('caller')
+        try:
+            self.assertEqual(batcher.get('a', timeout=2), 'a')
+        finally:
+            level.reset(token)
+
+        self.assertEqual(seen, ['caller'])
+
+    def test_batch_takes_the_most_urgent_priority(self):
+        seen = []
+
+        def fetch_many(keys):
+            seen.append((sorted(keys), priority_rank()))
+            return {key: key for key in keys}
+
+        def lookup(batcher, key, level):
+            with priority(level):
+                batcher.get(key, timeout=2)
+
+        for levels, expected in ((['background', 'background'], 'background'),
+                                 (['background', 'interactive'], 'interactive')):
+            batcher = MicroBatcher(fetch_many, window=0.1, context_order=priority_rank)
+            threads = [threading.Thread(target=lookup, args=(batcher, key, level))
+                       for key, level in zip('ab', levels)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(seen.pop(), (['a', 'b'], PRIORITIES[expected]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+from app import create_app
+from migrations import upgrade_schema
+from history import history_page
+from models import VideoHistory, VideoTranscript, VideoSummary
+from db import db
+
+# video_history as the first release created it
+ORIGINAL_SCHEMA = """
+CREATE TABLE video_history (
+    id INTEGER NOT NULL PRIMARY KEY,
+    video_url VARCHAR(255) NOT NULL,
+    video_title VARCHAR(255),
+    video_duration VARCHAR(50),
+    video_thumbnail VARCHAR(255),
+    transcript TEXT,
+    summary TEXT,
+    summary_length VARCHAR(20),
+    created_at DATETIME
+)
+"""
+
+# video_transcript as language preferences added it, keyed by a plain unique constraint
+LANGUAGES_SCHEMA = """
+CREATE TABLE video_transcript (
+    id INTEGER NOT NULL PRIMARY KEY,
+    video_id VARCHAR(20) NOT NULL,
+    languages VARCHAR(80),
+    segment_count INTEGER NOT NULL,
+    codec VARCHAR(10) NOT NULL,
+    data BLOB NOT NULL,
+    created_at DATETIME,
+    updated_at DATETIME,
+    CONSTRAINT uq_video_transcript_video_id_languages UNIQUE (video_id, languages)
+)
+"""
+
+# video_summary as it was first added, keyed by a plain unique constraint
+SUMMARY_SCHEMA = """
+CREATE TABLE video_summary (
+    id INTEGER NOT NULL PRIMARY KEY,
+    video_id VARCHAR(20) NOT NULL,
+    summary_length VARCHAR(20) NOT NULL,
+    languages VARCHAR(80),
+    model VARCHAR(50) NOT NULL,
+    prompt_version VARCHAR(20) NOT NULL,
+    summary TEXT NOT NULL,
+    created_at DATETIME,
+    CONSTRAINT uq_video_summary_key UNIQUE (video_id, summary_length, languages, model, prompt_version)
+)
+"""
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        path = os.path.join(tempfile.mkdtemp(), 'upgrade.db')
+        connection = sqlite3.connect(path)
+        connection.execute(ORIGINAL_SCHEMA)
+        connection.execute(
+            "INSERT INTO video_history (video_url, video_title, transcript, summary, summary_length, created_at) "
+            "VALUES ('https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'Old Video', 'Old transcript.', 'Old summary.', "
+            "'short', '2024-01-01 00:00:00')"
+        )
+        connection.commit()
+        connection.close()
+        with patch.dict(os.environ, DATABASE_URL=f"sqlite:///{path}"):
+            self.app = create_app()
+
+    def test_adds_missing_columns_and_backfills_video_ids(self):
+        with self.app.app_context():
+            applied, unresolved = upgrade_schema()
+
+            columns = {column['name'] for column in inspect(db.engine).get_columns('video_history')}
+            self.assertTrue({'video_id', 'languages', 'summary_id'} <= columns)
+            indexes = {index['name'] for index in inspect(db.engine).get_indexes('video_history')}
+            self.assertIn('ix_video_history_video_id_length_created_at', indexes)
+            self.assertIn('backfilled video_id on 1 history rows', applied)
+            self.assertEqual(unresolved, [])
+
+            # Older rows are served by the history and cache queries
+            history = VideoHistory.query.filter_by(video_id='dQw4w9WgXcQ', summary_length='short').one()
+            self.assertEqual(history.summary_text, 'Old summary.')
+            self.assertEqual(history_page(limit=10)['items'][0]['video_id'], 'dQw4w9WgXcQ')
+
+    def test_malformed_legacy_urls_are_skipped(self):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                for url in ('https://www.youtube.com/watch', 'https://www.youtube.com/embed'):
+                    connection.execute(text(
+                        "INSERT INTO video_history (video_url, video_title, transcript, summary, summary_length, "
+                        "created_at) VALUES (:url, 'Broken', 'Transcript.', 'Summary.', 'short', '2024-01-01 00:00:00')"
+                    ), {'url': url})
+
+            applied, unresolved = upgrade_schema()
+
+            self.assertIn('backfilled video_id on 1 history rows', applied)
+            self.assertEqual(unresolved, [])
+            self.assertEqual(VideoHistory.query.filter(VideoHistory.video_id.is_(None)).count(), 2)
+
+    def test_upgrade_is_idempotent(self):
+        with self.app.app_context():
+            upgrade_schema()
+            self.assertEqual(upgrade_schema(), ([], []))
+
+    def test_init_db_upgrades_existing_tables(self):
+        result = self.app.test_cli_runner().invoke(args=['init-db'])
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('added column video_history.video_id', result.output)
+
+    def test_check_reports_differences_without_applying_them(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['init-db', '--check'])
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('column video_history.video_id is missing', result.output)
+        self.assertIn('table video_summary is missing', result.output)
+        with self.app.app_context():
+            self.assertNotIn('video_id', {column['name'] for column in inspect(db.engine).get_columns('video_history')})
+
+        runner.invoke(args=['init-db'])
+        result = runner.invoke(args=['init-db', '--check'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('Database schema matches the models', result.output)
+
+    def test_init_db_fails_on_differences_it_cannot_apply(self):
+        with self.app.app_context(), db.engine.begin() as connection:
+            # A NOT NULL column without a default cannot be added to existing rows
+            connection.exec_driver_sql("CREATE TABLE video_summary (id INTEGER NOT NULL PRIMARY KEY)")
+
+        result = self.app.test_cli_runner().invoke(args=['init-db'])
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('added column video_history.video_id', result.output)
+        self.assertIn('column video_summary.video_id is missing and cannot be added', result.output)
+        self.assertNotIn('matches the models', result.output)
+
+    def test_default_language_keys_are_deduplicated_and_enforced(self):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql(LANGUAGES_SCHEMA)
+                # NULL languages slipped past the old constraint
+                for codec in ('zlib', 'zstd'):
+                    connection.exec_driver_sql(
+                        "INSERT INTO video_transcript (video_id, languages, segment_count, codec, data) "
+                        f"VALUES ('dQw4w9WgXcQ', NULL, 0, '{codec}', x'')"
+                    )
+
+            applied, unresolved = upgrade_schema()
+
+            self.assertIn('removed 1 duplicate video_transcript rows for the default languages', applied)
+            self.assertEqual(unresolved, [])
+            self.assertEqual([row.codec for row in VideoTranscript.query], ['zstd'])
+
+            db.session.add(VideoTranscript(video_id='dQw4w9WgXcQ', languages=None, segment_count=0, codec='zlib',
+                                           data=b''))
+            with self.assertRaises(IntegrityError):
+                db.session.commit()
+            db.session.rollback()
+
+    def test_duplicate_summaries_are_merged_into_the_newest(self):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql(SUMMARY_SCHEMA)
+                connection.exec_driver_sql("ALTER TABLE video_history ADD COLUMN summary_id INTEGER")
+                for summary_id in (1, 2):
+                    connection.exec_driver_sql(
+                        "INSERT INTO video_summary (id, video_id, summary_length, languages, model, prompt_version, "
+                        f"summary) VALUES ({summary_id}, 'dQw4w9WgXcQ', 'short', NULL, 'gpt-4o', '1', 'Summary {summary_id}.')"
+                    )
+                connection.exec_driver_sql("UPDATE video_history SET summary_id = 1")
+
+            applied, unresolved = upgrade_schema()
+
+            self.assertIn('removed 1 duplicate video_summary rows for the default languages', applied)
+            self.assertEqual(unresolved, [])
+            self.assertEqual(VideoHistory.query.one().summary_id, 2)
+
+            db.session.add(VideoSummary(video_id='dQw4w9WgXcQ', summary_length='short', model='gpt-4o',
+                                        prompt_version='1', summary='Another summary.'))
+            with self.assertRaises(IntegrityError):
+                db.session.commit()
+            db.session.rollback()
+
+if __name__ == '__main__':
+    unittest.main()
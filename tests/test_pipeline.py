@@ -0,0 +1,167 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+import sys
+import os
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from app import app
+from pipeline import fetch_video_data, save_result, result_cache, result_key, lock_name, process_video
+from models import VideoHistory, VideoTranscript, VideoSummary
+from utils import summarizer
+from utils.breaker import CircuitBreaker, breakers
+from utils.ratelimit import RateLimiter, limiters
+from db import db
+
+SEGMENTS = [{'text': 'This is a test transcript.', 'start': 0.0, 'duration': 2.0}]
+
+VIDEO_INFO = {
+    'title': 'Test Video',
+    'duration': 'PT5M30S',
+    'thumbnail': 'https://example.com/thumbnail.jpg'
+}
+
+def slow(value, seconds):
+    def call(url, languages=None):
+        time.sleep(seconds)
+        if isinstance(value, Exception):
+            raise value
+        return value
+    return call
+
+class TestFetchVideoData(unittest.TestCase):
+
+    def test_fetches_run_concurrently(self):
+        with patch('pipeline.get_video_info', slow(VIDEO_INFO, 0.2)), \
+                patch('pipeline.get_video_segments', slow(SEGMENTS, 0.2)):
+            start = time.perf_counter()
+            video_info, segments = fetch_video_data('https://youtu.be/dQw4w9WgXcQ')
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(video_info, VIDEO_INFO)
+        self.assertEqual(segments, SEGMENTS)
+        self.assertLess(elapsed, 0.35)
+
+    def test_failure_surfaces_without_waiting_for_other_call(self):
+        with patch('pipeline.get_video_info', slow(Exception("Failed to get video information"), 0)), \
+                patch('pipeline.get_video_segments', slow(SEGMENTS, 1.0)):
+            start = time.perf_counter()
+            with self.assertRaises(Exception) as context:
+                fetch_video_data('https://youtu.be/dQw4w9WgXcQ')
+            elapsed = time.perf_counter() - start
+
+        self.assertIn("video information", str(context.exception))
+        self.assertLess(elapsed, 0.5)
+
+class TestSaveResult(unittest.TestCase):
+
+    def setUp(self):
+        result_cache.clear()
+        with app.app_context():
+            VideoHistory.query.delete()
+            VideoTranscript.query.delete()
+            VideoSummary.query.delete()
+            db.session.commit()
+
+    def test_transcript_stored_once_per_video(self):
+        with app.app_context():
+            for summary_length in ('short', 'long'):
+                save_result('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', summary_length,
+                            VIDEO_INFO, SEGMENTS, f'{summary_length} summary')
+
+            self.assertEqual(VideoTranscript.query.count(), 1)
+            stored = VideoTranscript.query.one()
+            self.assertEqual(stored.segments(), SEGMENTS)
+
+            history = VideoHistory.query.filter_by(summary_length='long').one()
+            self.assertIsNone(history.transcript)
+            self.assertEqual(history.transcript_text, SEGMENTS[0]['text'])
+
+    def test_transcripts_stored_per_language_preference(self):
+        german = [{'text': 'Hallo Welt.', 'start': 0.0, 'duration': 2.0}]
+        with app.app_context():
+            save_result('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short', VIDEO_INFO, SEGMENTS, 'summary')
+            save_result('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short', VIDEO_INFO, german, 'Zusammenfassung',
+                        languages='de')
+            self.assertEqual(VideoTranscript.query.count(), 2)
+
+            result_cache.clear()
+            self.assertEqual(result_cache.get(result_key('dQw4w9WgXcQ', 'short'))['transcript'], SEGMENTS[0]['text'])
+            self.assertEqual(result_cache.get(result_key('dQw4w9WgXcQ', 'short', 'de'))['transcript'], 'Hallo Welt.')
+            self.assertIsNone(result_cache.get(result_key('dQw4w9WgXcQ', 'short', 'fr')))
+            self.assertNotEqual(lock_name('dQw4w9WgXcQ', 'short'), lock_name('dQw4w9WgXcQ', 'short', 'de'))
+
+    @patch('pipeline.generate_summary', side_effect=lambda texts, length: f'{length} summary')
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', return_value=VIDEO_INFO)
+    def test_new_length_reuses_stored_transcript(self, mock_info, mock_segments, mock_summary):
+        with app.app_context():
+            process_video('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short')
+            history, result = process_video('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'long')
+
+            self.assertEqual(result['summary'], 'long summary')
+            self.assertEqual(result['video_info'], VIDEO_INFO)
+            self.assertEqual(result['transcript'], SEGMENTS[0]['text'])
+            self.assertIsNone(history.summary)
+            self.assertEqual(history.summary_text, 'long summary')
+            self.assertEqual(VideoTranscript.query.count(), 1)
+            self.assertEqual(sorted(row.summary_length for row in VideoSummary.query), ['long', 'short'])
+
+        self.assertEqual(mock_info.call_count, 1)
+        self.assertEqual(mock_segments.call_count, 1)
+
+    @patch('pipeline.generate_summary', return_value='A summary.')
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', return_value=VIDEO_INFO)
+    def test_summaries_are_keyed_by_prompt_version(self, mock_info, mock_segments, mock_summary):
+        with app.app_context():
+            process_video('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short')
+            result_cache.clear()
+            self.assertEqual(result_cache.get(result_key('dQw4w9WgXcQ', 'short'))['summary'], 'A summary.')
+
+            result_cache.clear()
+            with patch('pipeline.SUMMARY_PROMPT_VERSION', '2'):
+                self.assertIsNone(result_cache.get(result_key('dQw4w9WgXcQ', 'short')))
+                process_video('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short')
+
+            self.assertEqual(sorted(row.prompt_version for row in VideoSummary.query), ['1', '2'])
+        self.assertEqual(mock_summary.call_count, 2)
+        self.assertEqual(mock_segments.call_count, 1)
+
+    @patch('utils.summarizer.SUMMARY_FALLBACK_BACKEND', 'extractive')
+    @patch('utils.summarizer.SUMMARY_BACKEND', 'openai')
+    @patch('pipeline.get_video_segments', return_value=SEGMENTS)
+    @patch('pipeline.get_video_info', return_value=VIDEO_INFO)
+    def test_fallback_summary_is_replaced_once_openai_recovers(self, mock_info, mock_segments):
+        client = MagicMock()
+        client.chat.completions.create.side_effect = [
+            ConnectionError('connection refused'),
+            SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='OpenAI summary.'))])
+        ]
+        with app.app_context(), patch.object(summarizer, 'openai', client), \
+                patch.dict(breakers, openai=CircuitBreaker('openai', failure_threshold=0)), \
+                patch.dict(limiters, openai=RateLimiter(0, name='openai')):
+            history, result = process_video('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short')
+
+            self.assertEqual(result['summary'], SEGMENTS[0]['text'])
+            self.assertEqual(result['degraded'], {'summary': 'fallback', 'model': 'extractive'})
+            self.assertEqual((history.stored_summary.model, history.stored_summary.fallback), ('extractive', True))
+            self.assertIsNone(result_cache.get(result_key('dQw4w9WgXcQ', 'short')))
+
+            history, result = process_video('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'short')
+
+            self.assertEqual(result['summary'], 'OpenAI summary.')
+            self.assertNotIn('degraded', result)
+            self.assertEqual(history.stored_summary.model, 'gpt-4o')
+            self.assertEqual(result_cache.get(result_key('dQw4w9WgXcQ', 'short'))['summary'], 'OpenAI summary.')
+
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
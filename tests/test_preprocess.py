@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.preprocess import clean_text, dedupe_captions, fit_token_budget, prepare_transcript
+from utils.tokens import count_tokens
+
+def segments(*texts):
+    return [{'text': text, 'start': float(index), 'duration': 1.0} for index, text in enumerate(texts)]
+
+class TestCleanText(unittest.TestCase):
+
+    def test_strips_annotations(self):
+        self.assertEqual(clean_text('[Music] welcome back [Applause]'), 'welcome back')
+        self.assertEqual(clean_text('♪ la la la ♪ (laughs) okay'), 'la la la okay')
+
+    def test_strips_fillers(self):
+        self.assertEqual(clean_text('so um, the uh cache is, hmm. warm'), 'so the cache is, warm')
+        self.assertEqual(clean_text('umbrella uhaul'), 'umbrella uhaul')
+
+    def test_fillers_optional(self):
+        self.assertEqual(clean_text('um okay', strip_fillers=False), 'um okay')
+
+class TestDedupeCaptions(unittest.TestCase):
+
+    def test_removes_rolling_overlap(self):
+        texts = ['today we are going', 'we are going to talk about', 'to talk about caching']
+        self.assertEqual(dedupe_captions(texts), ['today we are going', 'to talk about', 'caching'])
+
+    def test_drops_repeated_captions_and_empties(self):
+        self.assertEqual(dedupe_captions(['hello there', 'Hello there', '', 'bye']), ['hello there', 'bye'])
+
+    def test_single_word_overlap_is_kept(self):
+        self.assertEqual(dedupe_captions(['I said no', 'no way']), ['I said no', 'no way'])
+
+class TestTokenBudget(unittest.TestCase):
+
+    def test_under_budget_is_unchanged(self):
+        self.assertEqual(fit_token_budget(['a', 'b'], [1, 1], 10), (['a', 'b'], 2))
+
+    def test_trims_evenly_across_the_video(self):
+        texts = [f'segment {index}' for index in range(100)]
+        kept, used = fit_token_budget(texts, [10] * 100, 250)
+        self.assertLessEqual(used, 250)
+        self.assertEqual(len(kept), 25)
+        self.assertIn('segment 99', kept)
+        self.assertLess(texts.index(kept[0]), 5)
+
+class TestPrepareTranscript(unittest.TestCase):
+
+    def test_reports_tokens_saved(self):
+        raw = segments('[Music]', 'um so today we are', 'today we are talking about caching', '[Applause]')
+        texts, report = prepare_transcript(raw, budget=0)
+
+        self.assertEqual(texts, ['so today we are', 'talking about caching'])
+        tokens_in = sum(count_tokens(segment['text']) for segment in raw)
+        self.assertEqual(report['tokens_in'], tokens_in)
+        self.assertEqual(report['tokens_out'], sum(count_tokens(text) for text in texts))
+        self.assertEqual(report['tokens_saved'], tokens_in - report['tokens_out'])
+        self.assertEqual((report['segments_in'], report['segments_out']), (4, 2))
+
+    def test_applies_budget(self):
+        raw = segments(*[f'sentence number {index} about caching' for index in range(200)])
+        texts, report = prepare_transcript(raw, budget=100)
+        self.assertLessEqual(report['tokens_out'], 100)
+        self.assertGreater(report['tokens_saved'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
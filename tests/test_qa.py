@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import tempfile
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from app import app, create_app
+from pipeline import store_transcripts
+from models import VideoTranscript, VideoEmbedding
+from qa import answer_question, indexes, TranscriptNotStored, load_index
+from utils.embeddings import pack_bounds
+from db import db
+
+SEGMENTS = [
+    {'text': 'Welcome to this talk about web performance.', 'start': 0.0, 'duration': 4.0},
+    {'text': 'First we look at how browsers render pages.', 'start': 4.0, 'duration': 4.0},
+    {'text': 'A result cache keeps responses in memory.', 'start': 65.0, 'duration': 5.0},
+    {'text': 'Cache entries expire after one hour by default.', 'start': 70.0, 'duration': 5.0},
+    {'text': 'Finally, thanks to our sponsors for the show.', 'start': 130.0, 'duration': 3.0}
+]
+
+class TestQuestionAnswering(unittest.TestCase):
+
+    def setUp(self):
+        indexes.clear()
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            VideoTranscript.query.delete()
+            VideoEmbedding.query.delete()
+            store_transcripts({'dQw4w9WgXcQ': SEGMENTS})
+            db.session.commit()
+
+    @patch('utils.embeddings.EMBEDDING_CHUNK_TOKENS', 12)
+    @patch('utils.summarizer.SUMMARY_BACKEND', 'extractive')
+    def test_best_chunks_answer_the_question(self):
+        with app.app_context():
+            result = answer_question('dQw4w9WgXcQ', 'When do cache entries expire?', k=2)
+
+        self.assertEqual(result['model'], 'hashing-1024')
+        self.assertEqual(len(result['chunks']), 2)
+        self.assertIn('expire after one hour', result['chunks'][0]['text'])
+        self.assertGreaterEqual(result['chunks'][0]['start'], 65.0)
+        # The extractive backend answers with the best passage
+        self.assertIn('expire after one hour', result['answer'])
+
+    @patch('utils.summarizer.SUMMARY_BACKEND', 'extractive')
+    def test_embeddings_are_stored_once(self):
+        with app.app_context():
+            answer_question('dQw4w9WgXcQ', 'What is cached?')
+            indexes.clear()
+            with patch('qa._embed_transcript') as embed:
+                answer_question('dQw4w9WgXcQ', 'How do browsers render?')
+
+            self.assertFalse(embed.called)
+            self.assertEqual(VideoEmbedding.query.count(), 1)
+
+    def test_only_the_chosen_chunks_are_sent_to_the_model(self):
+        with patch('utils.embeddings.EMBEDDING_CHUNK_TOKENS', 12), \
+                patch('qa.generate_answer', return_value='After an hour [1:10].') as generate:
+            response = self.client.get('/videos/dQw4w9WgXcQ/ask?q=When+do+cache+entries+expire&k=1')
+
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['answer'], 'After an hour [1:10].')
+        excerpts = generate.call_args[0][1]
+        self.assertEqual(len(excerpts), 1)
+        self.assertTrue(excerpts[0].startswith('[1:'))
+        self.assertNotIn('sponsors', excerpts[0])
+
+    def test_unknown_video_is_not_found(self):
+        response = self.client.get('/videos/xxxxxxxxxxx/ask?q=anything')
+        self.assertEqual(response.status_code, 404)
+
+        with app.app_context(), self.assertRaises(TranscriptNotStored):
+            answer_question('xxxxxxxxxxx', 'anything')
+
+    def test_question_is_required(self):
+        self.assertEqual(self.client.get('/videos/dQw4w9WgXcQ/ask').status_code, 400)
+        self.assertEqual(self.client.get('/videos/dQw4w9WgXcQ/ask?q=' + 'a' * 501).status_code, 400)
+
+class TestConcurrentEmbedding(unittest.TestCase):
+
+    def setUp(self):
+        indexes.clear()
+        path = os.path.join(tempfile.mkdtemp(), 'qa.db')
+        with patch.dict(os.environ, DATABASE_URL=f"sqlite:///{path}"):
+            self.app = create_app()
+        with self.app.app_context():
+            db.create_all()
+            store_transcripts({'dQw4w9WgXcQ': SEGMENTS})
+            db.session.commit()
+
+    def test_second_writer_reads_the_first_writers_row(self):
+        def pack_after_another_worker(bounds):
+            # Another worker stores the same embedding between our lookup and our commit
+            with db.engine.begin() as connection:
+                connection.execute(VideoEmbedding.__table__.insert().values(
+                    video_id='dQw4w9WgXcQ', languages=None, model='hashing-1024', dimensions=0, chunk_count=0,
+                    bounds=pack_bounds([0]), vectors=b''
+                ))
+            return pack_bounds(bounds)
+
+        with self.app.app_context():
+            with patch('qa.pack_bounds', side_effect=pack_after_another_worker):
+                load_index('dQw4w9WgXcQ')
+
+            self.assertEqual(VideoEmbedding.query.count(), 1)
+            self.assertEqual(VideoEmbedding.query.one().chunk_count, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import subprocess
+import threading
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from utils.ratelimit import (
+    RateLimiter, RateLimitExceeded, Budget, FileStore, priority, wait_for_capacity, limiters
+)
+from utils import summarizer
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_burst_then_wait(self):
+        clock = FakeClock()
+        with patch('utils.ratelimit.time', clock):
+            limiter = RateLimiter(rate=60, per=60.0, burst=2)
+            self.assertEqual(limiter.acquire(), 0.0)
+            self.assertEqual(limiter.acquire(), 0.0)
+            waited = limiter.acquire()
+
+        self.assertAlmostEqual(waited, 1.0)
+
+    def test_zero_rate_is_unlimited(self):
+        limiter = RateLimiter(rate=0)
+        for _ in range(1000):
+            self.assertEqual(limiter.acquire(), 0.0)
+
+    def test_token_budget_is_separate_from_requests(self):
+        clock = FakeClock()
+        with patch('utils.ratelimit.time', clock):
+            limiter = RateLimiter(rate=60, burst=10, budgets={'tokens': Budget(600, capacity=100)})
+            self.assertEqual(limiter.acquire(tokens=100), 0.0)
+            # One request left of ten, but the token bucket is empty: 50 tokens refill in 5s
+            waited = limiter.acquire(tokens=50)
+
+        self.assertAlmostEqual(waited, 5.0)
+
+    def test_oversized_cost_runs_into_debt(self):
+        clock = FakeClock()
+        with patch('utils.ratelimit.time', clock):
+            limiter = RateLimiter(rate=0, budgets={'tokens': Budget(60, capacity=10)})
+            self.assertEqual(limiter.acquire(tokens=30), 0.0)
+            # The 20 token debt and 10 more for the next call take 30s to refill
+            waited = limiter.acquire(tokens=10)
+
+        self.assertAlmostEqual(waited, 30.0)
+
+    def test_long_wait_is_rejected(self):
+        clock = FakeClock()
+        with patch('utils.ratelimit.time', clock):
+            limiter = RateLimiter(rate=60, burst=1, name='openai', max_wait=5)
+            limiter.acquire(10)
+            with self.assertRaises(RateLimitExceeded) as raised:
+                limiter.acquire(10)
+            with self.assertRaises(RateLimitExceeded):
+                limiter.acquire(timeout=0)
+
+        self.assertEqual(raised.exception.provider, 'openai')
+        self.assertAlmostEqual(raised.exception.retry_after, 10.0)
+        self.assertEqual(limiter.stats()['rejected'], 2)
+
+    def test_background_calls_wait_past_max_wait(self):
+        clock = FakeClock()
+        with patch('utils.ratelimit.time', clock):
+            limiter = RateLimiter(rate=60, burst=1, name='openai', max_wait=5)
+            limiter.acquire(10)
+            with priority('background'):
+                self.assertAlmostEqual(limiter.acquire(10), 10.0)
+            with wait_for_capacity():
+                self.assertAlmostEqual(limiter.acquire(10), 10.0)
+                # An explicit deadline still applies
+                with self.assertRaises(RateLimitExceeded):
+                    limiter.acquire(10, timeout=1)
+
+    def test_interactive_calls_go_before_queued_background_calls(self):
+        limiter = RateLimiter(rate=20, per=1.0, burst=1)
+        limiter.acquire()
+        order = []
+
+        def call(level):
+            with priority(level):
+                limiter.acquire()
+            order.append(level)
+
+        threads = [threading.Thread(target=call, args=('background',)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.01)
+        threads.append(threading.Thread(target=call, args=('interactive',)))
+        threads[-1].start()
+        for thread in threads:
+            thread.join()
+
+        # Only the background call already at the head of the queue may go first
+        self.assertLessEqual(order.index('interactive'), 1)
+
+    def test_acquire_async_waits_without_blocking(self):
+        limiter = RateLimiter(rate=20, per=1.0, burst=1)
+
+        async def both():
+            return await asyncio.gather(limiter.acquire_async(), limiter.acquire_async())
+
+        waits = sorted(asyncio.run(both()))
+        self.assertEqual(waits[0], 0.0)
+        self.assertGreater(waits[1], 0.03)
+
+    def test_file_store_is_shared_between_processes(self):
+        # Two limiters with their own stores on one file behave like two workers
+        path = os.path.join(tempfile.mkdtemp(), 'ratelimit.json')
+        first = RateLimiter(rate=60, burst=2, name='openai', store=FileStore(path))
+        second = RateLimiter(rate=60, burst=2, name='openai', store=FileStore(path))
+
+        self.assertEqual(first.acquire(), 0.0)
+        self.assertEqual(second.acquire(), 0.0)
+        with self.assertRaises(RateLimitExceeded):
+            first.acquire(timeout=0)
+        self.assertLess(second.stats()['budgets']['requests']['remaining'], 1)
+
+    def test_stats_report_remaining_budget(self):
+        clock = FakeClock()
+        with patch('utils.ratelimit.time', clock):
+            limiter = RateLimiter(rate=60, burst=10, budgets={'tokens': Budget(1000), 'off': Budget(0)})
+            limiter.acquire(3, tokens=250)
+            stats = limiter.stats()
+
+        self.assertEqual(stats['acquired'], 1)
+        self.assertEqual(stats['queued'], 0)
+        self.assertEqual(stats['budgets']['requests'], {'rate': 60, 'per': 60.0, 'capacity': 10, 'remaining': 7})
+        self.assertEqual(stats['budgets']['tokens']['remaining'], 750)
+        self.assertNotIn('off', stats['budgets'])
+
+class TestProviderLimits(unittest.TestCase):
+
+    def test_summarizer_takes_prompt_and_completion_tokens(self):
+        limiter = RateLimiter(rate=0, name='openai', budgets={'tokens': Budget(100000)})
+        client = MagicMock()
+        client.chat.completions.create.return_value.choices[0].message.content = 'A summary.'
+        with patch.dict(limiters, openai=limiter), patch.object(summarizer, 'openai', client):
+            self.assertEqual(summarizer._complete('Summarize.', 'Some transcript text.', 250), 'A summary.')
+
+        used = 100000 - limiter.stats()['budgets']['tokens']['remaining']
+        self.assertGreater(used, 250)
+        self.assertLess(used, 270)
+
+    def test_exhausted_budget_is_reported_instead_of_generic_failure(self):
+        limiter = RateLimiter(rate=1, burst=1, name='openai', max_wait=0)
+        limiter.acquire()
+        with patch.dict(limiters, openai=limiter), patch.object(summarizer, 'SUMMARY_BACKEND', 'openai'), \
+             patch.object(summarizer, 'SUMMARY_FALLBACK_BACKEND', ''):
+            with self.assertRaises(RateLimitExceeded):
+                summarizer.generate_summary('Some transcript text.', 'short')
+
+    def test_budgets_are_shared_between_processes_by_default(self):
+        env = {key: value for key, value in os.environ.items() if key != 'RATE_LIMIT_STATE_FILE'}
+        output = subprocess.run(
+            [sys.executable, '-c', "from utils.ratelimit import store; print(type(store).__name__)"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env,
+            capture_output=True, text=True, check=True
+        ).stdout
+
+        self.assertEqual(output.strip(), 'FileStore')
+
+    def test_token_bucket_holds_a_full_single_pass_summary(self):
+        capacity = limiters['openai'].budgets['tokens'].capacity
+        self.assertGreater(capacity, summarizer.SUMMARY_SINGLE_PASS_TOKENS + summarizer.SUMMARY_LENGTH_TOKENS['long'])
+
+    def test_stats_endpoint(self):
+        from app import app
+        response = app.test_client().get('/ratelimit/stats')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(set(data), {'youtube', 'openai'})
+        self.assertIn('quota', data['youtube']['budgets'])
+        self.assertIn('tokens', data['openai']['budgets'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from app import app
+from pipeline import save_result, result_cache
+from models import VideoHistory, VideoTranscript, SearchDocument
+from db import db
+import search
+
+def segments(*texts):
+    return [{'text': text, 'start': index * 5.0, 'duration': 5.0} for index, text in enumerate(texts)]
+
+def video_info(title):
+    return {'title': title, 'duration': 'PT5M', 'thumbnail': 'https://example.com/thumb.jpg'}
+
+class SearchTestBase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        app.config["TESTING"] = True
+        result_cache.clear()
+        search._backends.clear()
+        with app.app_context():
+            db.session.execute(db.text("DELETE FROM search_fts"))
+            SearchDocument.query.delete()
+            VideoHistory.query.delete()
+            VideoTranscript.query.delete()
+            db.session.commit()
+            save_result('https://youtu.be/aaaaaaaaaaa', 'aaaaaaaaaaa', 'short', video_info('Caching in Python'),
+                        segments('Welcome to the talk.', 'Today we cover caching strategies.', 'Thanks for watching.'),
+                        'An overview of caching.')
+            save_result('https://youtu.be/bbbbbbbbbbb', 'bbbbbbbbbbb', 'short', video_info('Cooking pasta'),
+                        segments('Boil the water.', 'Add <salt> & pasta.'),
+                        'How to cook pasta, with a note on caching leftovers.')
+
+    def tearDown(self):
+        search._backends.clear()
+
+
+class TestSearchEndpoint(SearchTestBase):
+
+    def test_uses_fts5_on_sqlite(self):
+        response = self.app.get('/search?q=caching')
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['backend'], 'sqlite-fts5')
+
+    def test_ranks_title_matches_first(self):
+        data = self.app.get('/search?q=caching').get_json()
+        self.assertEqual(data['total'], 2)
+        self.assertEqual([result['video_id'] for result in data['results']], ['aaaaaaaaaaa', 'bbbbbbbbbbb'])
+
+    def test_returns_timestamped_highlighted_matches(self):
+        data = self.app.get('/search?q=caching').get_json()
+        matches = data['results'][0]['matches']
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0]['start'], 5.0)
+        self.assertEqual(matches[0]['timestamp'], '0:05')
+        self.assertEqual(matches[0]['snippet'], 'Today we cover <mark>caching</mark> strategies.')
+
+    def test_snippets_are_escaped(self):
+        data = self.app.get('/search?q=salt').get_json()
+        self.assertEqual(data['results'][0]['matches'][0]['snippet'], 'Add &lt;<mark>salt</mark>&gt; &amp; pasta.')
+
+    def test_paginates(self):
+        data = self.app.get('/search?q=caching&page=2&per_page=1').get_json()
+        self.assertEqual(data['total'], 2)
+        self.assertEqual([result['video_id'] for result in data['results']], ['bbbbbbbbbbb'])
+
+    def test_query_syntax_is_not_interpreted(self):
+        response = self.app.get('/search?q=caching" OR NEAR(')
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_query(self):
+        response = self.app.get('/search')
+        self.assertEqual(response.status_code, 400)
+
+    def test_reprocessing_replaces_entry(self):
+        with app.app_context():
+            save_result('https://youtu.be/bbbbbbbbbbb', 'bbbbbbbbbbb', 'long', video_info('Cooking rice'),
+                        segments('Rinse the rice.'), 'How to cook rice.')
+        self.assertEqual(self.app.get('/search?q=pasta').get_json()['total'], 0)
+        self.assertEqual(self.app.get('/search?q=rice').get_json()['total'], 1)
+
+
+class TestMemoryBackend(SearchTestBase):
+
+    def test_fallback_index_loads_from_database(self):
+        with app.app_context():
+            search._backends[str(db.engine.url)] = search.MemorySearch()
+            data = search.search('caching')
+        self.assertEqual(data['backend'], 'memory')
+        self.assertEqual([result['video_id'] for result in data['results']], ['aaaaaaaaaaa', 'bbbbbbbbbbb'])
+        self.assertEqual(data['results'][0]['matches'][0]['start'], 5.0)
+
+    def test_failed_load_is_retried(self):
+        backend = search.MemorySearch()
+        with app.app_context():
+            search._backends[str(db.engine.url)] = backend
+            with patch('search.load_transcript_text', side_effect=RuntimeError('database went away')):
+                with self.assertRaises(RuntimeError):
+                    search.search('caching')
+            self.assertFalse(backend._loaded)
+            self.assertEqual(search.search('caching')['total'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.segments import pack_segments, unpack_segments, PackedTranscript
+
+SEGMENTS = [
+    {'text': 'Hello and welcome', 'start': 0.0, 'duration': 2.5},
+    {'text': 'to the channel — ünïcödé', 'start': 2.5, 'duration': 3.0},
+    {'text': '', 'start': 5.5, 'duration': 0.5},
+    {'text': 'today we talk about caching', 'start': 6.0, 'duration': 4.25}
+]
+
+class TestSegments(unittest.TestCase):
+
+    def test_round_trip_for_each_codec(self):
+        for codec in ('none', 'zlib'):
+            with self.subTest(codec=codec):
+                self.assertEqual(unpack_segments(pack_segments(SEGMENTS, codec)), SEGMENTS)
+
+    def test_empty_transcript(self):
+        packed = PackedTranscript(pack_segments([], 'zlib'))
+        self.assertEqual(len(packed), 0)
+        self.assertEqual(packed.full_text(), '')
+
+    def test_full_text_matches_plain_join(self):
+        packed = PackedTranscript(pack_segments(SEGMENTS, 'zlib'))
+        self.assertEqual(packed.full_text(), ' '.join(segment['text'] for segment in SEGMENTS))
+
+    def test_time_slicing(self):
+        packed = PackedTranscript(pack_segments(SEGMENTS, 'zlib'))
+
+        self.assertEqual(packed.index_at(3.0), 1)
+        self.assertEqual(packed.index_at(100), 3)
+        self.assertEqual([segment['text'] for segment in packed.between(2.0, 6.0)], ['to the channel — ünïcödé', ''])
+
+    def test_compressed_is_smaller_than_plain_text(self):
+        segments = [
+            {'text': f'this is auto caption line {i % 50} about the topic', 'start': i * 2.0, 'duration': 2.0}
+            for i in range(2000)
+        ]
+        plain = ' '.join(segment['text'] for segment in segments).encode('utf-8')
+
+        self.assertLess(len(pack_segments(segments, 'zlib')), len(plain) / 4)
+
+    def test_rejects_foreign_data(self):
+        with self.assertRaises(ValueError):
+            PackedTranscript(b'not a transcript at all')
+
+if __name__ == '__main__':
+    unittest.main()
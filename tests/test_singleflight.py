@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.singleflight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+
+    def run_concurrently(self, flight, fn, callers=5):
+        results = []
+        started = threading.Event()
+
+        def call():
+            try:
+                results.append(flight.do('key', fn))
+            except Exception as e:
+                results.append(e)
+
+        def slow():
+            started.set()
+            time.sleep(0.2)
+            return fn()
+
+        leader = threading.Thread(target=lambda: results.append(flight.do('key', slow)))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=call) for _ in range(callers - 1)]
+        for thread in followers:
+            thread.start()
+        for thread in [leader] + followers:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        results = self.run_concurrently(flight, lambda: calls.append(1) or 'value')
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True, True])
+        self.assertTrue(all(value == 'value' for value, _ in results))
+        self.assertEqual(flight.stats, {'leaders': 1, 'followers': 4})
+        self.assertFalse(flight.in_flight('key'))
+
+    def test_exception_is_shared_with_waiters(self):
+        flight = SingleFlight()
+
+        calls = []
+
+        def fail():
+            calls.append(1)
+            time.sleep(0.2)
+            raise ValueError('upstream failed')
+
+        def call():
+            try:
+                flight.do('key', fail)
+            except ValueError as e:
+                return e
+        errors = []
+        threads = [threading.Thread(target=lambda: errors.append(call())) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([str(error) for error in errors], ['upstream failed'] * 3)
+        self.assertFalse(flight.in_flight('key'))
+
+    def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight()
+        calls = []
+        flight.do('key', lambda: calls.append(1))
+        flight.do('key', lambda: calls.append(1))
+        self.assertEqual(len(calls), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import subprocess
+import tempfile
+
+# Add parent directory to path to import modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from sqlalchemy import inspect
+from app import create_app, is_memory_database
+from utils import summarizer, youtube
+from db import db
+
+class TestStartup(unittest.TestCase):
+
+    def test_import_skips_provider_clients(self):
+        output = subprocess.run(
+            [sys.executable, '-c',
+             "import sys, app, utils.summarizer as s; "
+             "print('openai' in sys.modules, 'youtube_transcript_api' in sys.modules, s.openai is None)"],
+            cwd=ROOT, env=dict(os.environ, DATABASE_URL='sqlite://'), capture_output=True, text=True, check=True
+        ).stdout
+
+        self.assertEqual(output.split(), ['False', 'False', 'True'])
+
+    def test_schema_is_created_by_init_db(self):
+        path = os.path.join(tempfile.mkdtemp(), 'startup.db')
+        with patch.dict(os.environ, DATABASE_URL=f"sqlite:///{path}"):
+            app = create_app()
+
+        with app.app_context():
+            self.assertEqual(inspect(db.engine).get_table_names(), [])
+
+        result = app.test_cli_runner().invoke(args=['init-db'])
+        self.assertEqual(result.exit_code, 0)
+        with app.app_context():
+            self.assertIn('video_history', inspect(db.engine).get_table_names())
+
+    def test_memory_database_detection(self):
+        self.assertTrue(is_memory_database('sqlite://'))
+        self.assertTrue(is_memory_database('sqlite:///:memory:'))
+        self.assertFalse(is_memory_database('sqlite:///app.db'))
+        self.assertFalse(is_memory_database('postgresql://localhost/app'))
+        self.assertFalse(is_memory_database(None))
+
+    def test_clients_are_built_once_on_first_use(self):
+        with patch.object(summarizer, 'openai', None):
+            client = summarizer.openai_client()
+            self.assertIs(summarizer.openai_client(), client)
+            self.assertEqual(type(client).__name__, 'OpenAI')
+
+        with patch.object(youtube, 'YouTubeTranscriptApi', None):
+            api = youtube.transcript_api()
+            self.assertEqual(type(api).__name__, 'YouTubeTranscriptApi')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from app import app
+from pipeline import result_cache
+from models import VideoHistory
+from db import db
+
+SEGMENTS = [{'text': 'This is a test transcript.', 'start': 0.0, 'duration': 2.0}]
+
+VIDEO_INFO = {
+    'title': 'Test Video',
+    'duration': 'PT5M30S',
+    'thumbnail': 'https://example.com/thumbnail.jpg'
+}
+
+def parse_events(body):
+    events = []
+    for message in body.decode('utf-8').strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in message.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+class TestProcessStream(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        app.config["TESTING"] = True
+        result_cache.clear()
+        with app.app_context():
+            VideoHistory.query.delete()
+            db.session.commit()
+
+    @patch('pipeline.stream_summary')
+    @patch('pipeline.get_video_segments')
+    @patch('pipeline.get_video_info')
+    def test_stream_sends_info_transcript_then_summary(self, mock_get_video_info,
+                                                     mock_get_video_segments, mock_stream_summary):
+        mock_get_video_info.return_value = VIDEO_INFO
+        mock_get_video_segments.return_value = SEGMENTS
+        mock_stream_summary.return_value = iter(["This is ", "a test ", "summary."])
+
+        response = self.app.get('/process/stream', query_string={
+            'youtube_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+            'summary_length': 'short'
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/event-stream'))
+
+        events = parse_events(response.data)
+        names = [name for name, _ in events]
+        self.assertEqual(names, ['video_info', 'transcript', 'summary', 'summary', 'summary', 'done'])
+        self.assertEqual(events[0][1]['title'], 'Test Video')
+        self.assertEqual(''.join(data['delta'] for name, data in events if name == 'summary'), "This is a test summary.")
+
+        with app.app_context():
+            history = VideoHistory.query.filter_by(video_id='dQw4w9WgXcQ').one()
+            self.assertEqual(history.summary_text, "This is a test summary.")
+
+    @patch('pipeline.stream_summary')
+    @patch('pipeline.get_video_segments')
+    @patch('pipeline.get_video_info')
+    def test_cached_result_streams_without_upstream_calls(self, mock_get_video_info,
+                                                         mock_get_video_segments, mock_stream_summary):
+        result_cache.set(('dQw4w9WgXcQ', 'medium'), {
+            'video_info': VIDEO_INFO,
+            'transcript': "Cached transcript.",
+            'summary': "Cached summary."
+        })
+
+        response = self.app.get('/process/stream', query_string={'youtube_url': 'https://youtu.be/dQw4w9WgXcQ'})
+        events = parse_events(response.data)
+
+        self.assertEqual(events[-1], ('done', {'cached': True}))
+        mock_get_video_info.assert_not_called()
+        mock_get_video_segments.assert_not_called()
+        mock_stream_summary.assert_not_called()
+
+    @patch('pipeline.get_video_segments')
+    @patch('pipeline.get_video_info')
+    def test_upstream_failure_sends_failed_event(self, mock_get_video_info, mock_get_video_segments):
+        mock_get_video_info.return_value = VIDEO_INFO
+        mock_get_video_segments.side_effect = Exception("Failed to get video transcript.")
+
+        response = self.app.get('/process/stream', query_string={'youtube_url': 'https://youtu.be/dQw4w9WgXcQ'})
+        events = parse_events(response.data)
+
+        self.assertEqual(events[-1][0], 'failed')
+        self.assertIn('transcript', events[-1][1]['error'])
+
+    def test_invalid_url_returns_bad_request(self):
+        response = self.app.get('/process/stream', query_string={'youtube_url': 'https://www.example.com'})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
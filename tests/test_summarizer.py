@@ -2,11 +2,84 @@ import unittest
 from unittest.mock import patch, MagicMock
 import sys
 import os
+import threading
+import time
+import asyncio
+from types import SimpleNamespace
 
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
 
-from utils.summarizer import generate_summary
+from utils.summarizer import generate_summary, chunk_transcript, stream_summary, generate_summary_async, stream_summary_async
+from utils.tokens import count_tokens
+from utils.ratelimit import RateLimiter, limiters
+from utils.breaker import CircuitBreaker, breakers
+
+# The fakes answer instantly, so the client-side OpenAI limits (covered in
+# test_ratelimit) would only slow these tests down. The failure tests must
+# not leave the OpenAI circuit open for other modules (see test_breaker).
+unlimited_openai = patch.dict(limiters, openai=RateLimiter(0, name='openai'))
+unbroken_openai = patch.dict(breakers, openai=CircuitBreaker('openai', failure_threshold=0))
+
+def setUpModule():
+    unlimited_openai.start()
+    unbroken_openai.start()
+
+def tearDownModule():
+    unbroken_openai.stop()
+    unlimited_openai.stop()
+
+class FakeOpenAI:
+    """Local stand-in for the OpenAI client that records calls and concurrency."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, max_tokens, stream=False, **kwargs):
+        if stream:
+            self.calls.append({'messages': messages, 'max_tokens': max_tokens, 'stream': True})
+            return iter([
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+                for word in ["streamed ", "summary", None]
+            ])
+
+        with self._lock:
+            self.calls.append({'messages': messages, 'max_tokens': max_tokens})
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.latency)
+        with self._lock:
+            self.active -= 1
+
+        user_text = messages[-1]['content']
+        content = f"summary of {len(user_text)} chars"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    """Async variant of FakeOpenAI; concurrency is tracked across awaiting coroutines."""
+
+    async def create(self, model, messages, max_tokens, stream=False, **kwargs):
+        if stream:
+            self.calls.append({'messages': messages, 'max_tokens': max_tokens, 'stream': True})
+
+            async def chunks():
+                for word in ["streamed ", "summary", None]:
+                    yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+            return chunks()
+
+        self.calls.append({'messages': messages, 'max_tokens': max_tokens})
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.latency)
+        self.active -= 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+            content=f"summary of {len(messages[-1]['content'])} chars"))])
 
 class TestSummarizer(unittest.TestCase):
     
@@ -120,5 +193,174 @@ class TestSummarizer(unittest.TestCase):
         with self.assertRaises(ValueError):
             generate_summary("")
 
+class TestChunkedSummarizer(unittest.TestCase):
+
+    def test_chunk_transcript_respects_segment_boundaries(self):
+        segments = [f"segment number {i} says something" for i in range(100)]
+        chunks = chunk_transcript(segments, max_tokens=50)
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk), 50)
+        self.assertEqual(' '.join(chunks), ' '.join(segments))
+
+    def test_chunk_transcript_splits_unpunctuated_text(self):
+        text = ' '.join(['word'] * 5000)
+        chunks = chunk_transcript(text, max_tokens=200)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(sum(len(chunk.split()) for chunk in chunks), 5000)
+
+    def test_short_transcript_uses_single_request(self):
+        fake = FakeOpenAI()
+        with patch('utils.summarizer.openai', fake):
+            result = generate_summary("A short transcript.", length='short')
+
+        self.assertEqual(len(fake.calls), 1)
+        self.assertEqual(fake.calls[0]['max_tokens'], 250)
+        self.assertTrue(result.startswith("summary of"))
+
+    @patch('utils.summarizer.SUMMARY_MAX_WORKERS', 3)
+    @patch('utils.summarizer.SUMMARY_CHUNK_TOKENS', 100)
+    @patch('utils.summarizer.SUMMARY_SINGLE_PASS_TOKENS', 200)
+    def test_long_transcript_map_reduce(self):
+        fake = FakeOpenAI(latency=0.05)
+        segments = [f"This is caption segment {i} of a long video." for i in range(120)]
+
+        with patch('utils.summarizer.openai', fake):
+            result = generate_summary(segments, length='long')
+
+        map_calls = fake.calls[:-1]
+        reduce_call = fake.calls[-1]
+        self.assertGreater(len(map_calls), 3)
+        self.assertLessEqual(fake.max_active, 3)
+        self.assertGreater(fake.max_active, 1)
+        self.assertEqual(reduce_call['max_tokens'], 1000)
+        self.assertIn("long summary", reduce_call['messages'][0]['content'])
+        self.assertTrue(result.startswith("summary of"))
+
+    def test_stream_summary_yields_deltas(self):
+        fake = FakeOpenAI()
+        with patch('utils.summarizer.openai', fake):
+            deltas = list(stream_summary("A short transcript.", length='medium'))
+
+        self.assertEqual(deltas, ["streamed ", "summary"])
+        self.assertTrue(fake.calls[0]['stream'])
+        self.assertEqual(fake.calls[0]['max_tokens'], 500)
+
+class TestAsyncSummarizer(unittest.TestCase):
+
+    @patch('utils.summarizer.SUMMARY_MAX_WORKERS', 3)
+    @patch('utils.summarizer.SUMMARY_CHUNK_TOKENS', 100)
+    @patch('utils.summarizer.SUMMARY_SINGLE_PASS_TOKENS', 200)
+    def test_long_transcript_map_reduce_is_bounded(self):
+        fake = FakeAsyncOpenAI(latency=0.02)
+        segments = [f"This is caption segment {i} of a long video." for i in range(120)]
+
+        with patch('utils.summarizer.async_openai', fake):
+            result = asyncio.run(generate_summary_async(segments, length='long'))
+
+        self.assertGreater(len(fake.calls), 4)
+        self.assertEqual(fake.max_active, 3)
+        self.assertIn("long summary", fake.calls[-1]['messages'][0]['content'])
+        self.assertTrue(result.startswith("summary of"))
+
+    def test_stream_summary_async_yields_deltas(self):
+        fake = FakeAsyncOpenAI()
+
+        async def collect():
+            return [delta async for delta in stream_summary_async("A short transcript.", length='medium')]
+
+        with patch('utils.summarizer.async_openai', fake):
+            deltas = asyncio.run(collect())
+
+        self.assertEqual(deltas, ["streamed ", "summary"])
+        self.assertEqual(fake.calls[0]['max_tokens'], 500)
+
+    def test_async_falls_back_to_extractive(self):
+        fake = FakeAsyncOpenAI()
+
+        async def fail(**kwargs):
+            raise TimeoutError("Request timed out.")
+        fake.chat.completions.create = fail
+
+        with patch('utils.summarizer.async_openai', fake), \
+                patch('utils.summarizer.SUMMARY_FALLBACK_BACKEND', 'extractive'):
+            summary = asyncio.run(generate_summary_async("Caching makes repeat requests fast. Thanks.", length='short'))
+
+        self.assertIn("Caching", summary)
+
+class FailingOpenAI(FakeOpenAI):
+
+    def create(self, model, messages, max_tokens, stream=False, **kwargs):
+        self.calls.append({'messages': messages, 'max_tokens': max_tokens, 'kwargs': kwargs})
+        raise TimeoutError("Request timed out.")
+
+TRANSCRIPT = (
+    "Caching stores results so repeat requests are fast. "
+    "A cache miss falls through to the database. "
+    "The weather was nice that day. "
+    "Cache invalidation decides when stored results are stale. "
+    "Thanks for watching."
+)
+
+class TestSummaryRouting(unittest.TestCase):
+
+    def test_extractive_backend_needs_no_network(self):
+        fake = FakeOpenAI()
+        with patch('utils.summarizer.openai', fake), patch('utils.summarizer.SUMMARY_BACKEND', 'extractive'):
+            summary = generate_summary(TRANSCRIPT, length='short')
+
+        self.assertEqual(fake.calls, [])
+        self.assertIn("Caching stores results", summary)
+
+    def test_falls_back_when_primary_fails(self):
+        fake = FailingOpenAI()
+        with patch('utils.summarizer.openai', fake), \
+                patch('utils.summarizer.SUMMARY_FALLBACK_BACKEND', 'extractive'):
+            summary = generate_summary(TRANSCRIPT, length='short')
+
+        self.assertEqual(len(fake.calls), 1)
+        self.assertIn("Cache invalidation", summary)
+        self.assertEqual((summary.model, summary.fallback), ('extractive', True))
+
+    def test_raises_without_fallback(self):
+        with patch('utils.summarizer.openai', FailingOpenAI()):
+            with self.assertRaises(Exception):
+                generate_summary(TRANSCRIPT)
+
+    def test_auto_routes_large_transcripts_locally(self):
+        fake = FakeOpenAI()
+        with patch('utils.summarizer.openai', fake), \
+                patch('utils.summarizer.SUMMARY_BACKEND', 'auto'), \
+                patch('utils.summarizer.SUMMARY_LOCAL_ABOVE_TOKENS', 20):
+            local = generate_summary(TRANSCRIPT, length='short')
+            remote = generate_summary("Tiny transcript.", length='short')
+
+        self.assertEqual(len(fake.calls), 1)
+        # Routed, not fallen back: both count as the configured summarizer's
+        self.assertEqual((local.model, local.fallback), ('extractive', False))
+        self.assertEqual((remote.model, remote.fallback), ('gpt-4o', False))
+        self.assertEqual(fake.calls[0]['messages'][-1]['content'], "Tiny transcript.")
+
+    def test_auto_passes_latency_budget_as_timeout(self):
+        fake = FailingOpenAI()
+        with patch('utils.summarizer.openai', fake), \
+                patch('utils.summarizer.SUMMARY_BACKEND', 'auto'), \
+                patch('utils.summarizer.SUMMARY_LATENCY_BUDGET_SECONDS', 5):
+            summary = generate_summary(TRANSCRIPT, length='short')
+
+        self.assertLessEqual(fake.calls[0]['kwargs']['timeout'], 5)
+        self.assertTrue(summary)
+
+    def test_stream_falls_back_before_first_delta(self):
+        with patch('utils.summarizer.openai', FailingOpenAI()), \
+                patch('utils.summarizer.SUMMARY_FALLBACK_BACKEND', 'extractive'):
+            deltas = list(stream_summary(TRANSCRIPT, length='short'))
+
+        self.assertEqual(len(deltas), 1)
+        self.assertIn("Caching", deltas[0])
+        self.assertTrue(deltas[0].fallback)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
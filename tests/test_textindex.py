@@ -0,0 +1,50 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.textindex import InvertedIndex, tokenize
+
+class TestTokenize(unittest.TestCase):
+
+    def test_lowercases_and_drops_stopwords(self):
+        self.assertEqual(tokenize('The Cache is Warm'), ['cache', 'warm'])
+
+    def test_empty(self):
+        self.assertEqual(tokenize(None), [])
+
+class TestInvertedIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = InvertedIndex({'title': 3.0, 'body': 1.0})
+        self.index.add(1, {'title': 'Redis caching', 'body': 'notes about memory'})
+        self.index.add(2, {'title': 'Cooking', 'body': 'caching leftovers in memory'})
+        self.index.add(3, {'title': 'Gardening', 'body': 'tomatoes'})
+
+    def test_field_weights_affect_rank(self):
+        total, ranked = self.index.search('caching')
+        self.assertEqual(total, 2)
+        self.assertEqual([doc_id for doc_id, _ in ranked], [1, 2])
+
+    def test_requires_every_term(self):
+        total, ranked = self.index.search('caching leftovers')
+        self.assertEqual([doc_id for doc_id, _ in ranked], [2])
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search('python'), (0, []))
+
+    def test_reindex_replaces_terms(self):
+        self.index.add(1, {'title': 'Python', 'body': ''})
+        self.assertEqual(self.index.search('redis'), (0, []))
+        self.assertEqual(self.index.search('python')[1][0][0], 1)
+
+    def test_remove_and_paging(self):
+        self.index.remove(1)
+        self.assertEqual(len(self.index), 2)
+        total, ranked = self.index.search('memory', limit=1, offset=0)
+        self.assertEqual((total, [doc_id for doc_id, _ in ranked]), (1, [2]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import sys
+import os
+import gzip
+import json
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
+
+from app import app
+from pipeline import store_transcripts
+from models import VideoTranscript
+from db import db
+from utils.segments import PackedTranscript, pack_segments
+from utils.transcript_export import export_chunks
+
+SEGMENTS = [
+    {'text': 'Hello and welcome.', 'start': 0.0, 'duration': 2.5},
+    {'text': 'Today: caching.', 'start': 2.5, 'duration': 3661.25}
+]
+
+def render(export_format, segments=SEGMENTS):
+    return b''.join(export_chunks(PackedTranscript(pack_segments(segments)), export_format, 'abc')).decode('utf-8')
+
+class TestExportFormats(unittest.TestCase):
+
+    def test_txt_matches_joined_transcript(self):
+        self.assertEqual(render('txt'), 'Hello and welcome. Today: caching.')
+
+    def test_srt(self):
+        self.assertEqual(render('srt'), (
+            "1\n00:00:00,000 --> 00:00:02,500\nHello and welcome.\n\n"
+            "2\n00:00:02,500 --> 01:01:03,750\nToday: caching.\n\n"
+        ))
+
+    def test_vtt(self):
+        self.assertTrue(render('vtt').startswith("WEBVTT\n\n00:00:00.000 --> 00:00:02.500\nHello and welcome.\n\n"))
+
+    def test_json(self):
+        data = json.loads(render('json'))
+        self.assertEqual(data['video_id'], 'abc')
+        self.assertEqual(data['segments'], SEGMENTS)
+
+    def test_large_transcripts_are_chunked(self):
+        segments = [{'text': 'word ' * 50, 'start': float(index), 'duration': 1.0} for index in range(2000)]
+        chunks = list(export_chunks(PackedTranscript(pack_segments(segments)), 'txt'))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) < 2 * 64 * 1024 for chunk in chunks))
+
+class TestExportEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        app.config["TESTING"] = True
+        with app.app_context():
+            VideoTranscript.query.delete()
+            store_transcripts({'dQw4w9WgXcQ': SEGMENTS})
+            db.session.commit()
+
+    def test_streams_attachment(self):
+        response = self.app.get('/videos/dQw4w9WgXcQ/transcript.srt')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'application/x-subrip')
+        self.assertIn('filename="dQw4w9WgXcQ.srt"', response.headers['Content-Disposition'])
+        self.assertTrue(response.get_data(as_text=True).startswith('1\n00:00:00,000'))
+
+    def test_conditional_requests(self):
+        response = self.app.get('/videos/dQw4w9WgXcQ/transcript.txt')
+        etag = response.headers['ETag']
+
+        repeat = self.app.get('/videos/dQw4w9WgXcQ/transcript.txt', headers={'If-None-Match': etag})
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat.data, b'')
+
+        repeat = self.app.get('/videos/dQw4w9WgXcQ/transcript.txt',
+                              headers={'If-Modified-Since': response.headers['Last-Modified']})
+        self.assertEqual(repeat.status_code, 304)
+
+        other_format = self.app.get('/videos/dQw4w9WgXcQ/transcript.json', headers={'If-None-Match': etag})
+        self.assertEqual(other_format.status_code, 200)
+
+    def test_gzip(self):
+        response = self.app.get('/videos/dQw4w9WgXcQ/transcript.txt', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response.data).decode('utf-8'), 'Hello and welcome. Today: caching.')
+        plain = self.app.get('/videos/dQw4w9WgXcQ/transcript.txt')
+        self.assertNotEqual(response.headers['ETag'], plain.headers['ETag'])
+
+    def test_language_preference(self):
+        with app.app_context():
+            store_transcripts({'dQw4w9WgXcQ': [{'text': 'Hallo.', 'start': 0.0, 'duration': 1.0}]}, 'de')
+            db.session.commit()
+
+        german = self.app.get('/videos/dQw4w9WgXcQ/transcript.txt?lang=de')
+        self.assertEqual(german.get_data(as_text=True), 'Hallo.')
+        default = self.app.get('/videos/dQw4w9WgXcQ/transcript.txt')
+        self.assertEqual(default.get_data(as_text=True), 'Hello and welcome. Today: caching.')
+        self.assertNotEqual(german.headers['ETag'], default.headers['ETag'])
+        self.assertEqual(self.app.get('/videos/dQw4w9WgXcQ/transcript.txt?lang=fr').status_code, 404)
+
+    def test_unknown_video_or_format(self):
+        self.assertEqual(self.app.get('/videos/missing0000/transcript.txt').status_code, 404)
+        self.assertEqual(self.app.get('/videos/dQw4w9WgXcQ/transcript.pdf').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,11 +2,70 @@ import unittest
 from unittest.mock import patch, MagicMock
 import sys
 import os
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("RATE_LIMIT_STATE_FILE", "")  # per-process rate limit budgets
 
-from utils.youtube import extract_video_id, get_video_transcript, get_video_info
+from utils.youtube import (
+    extract_video_id, get_video_transcript, get_video_info, get_videos_info, get_transcript_track,
+    parse_languages, language_key, select_track, transcript_lists, transcript_segments,
+    parse_youtube_url, get_uploads_playlist, list_playlist_page, get_videos_etags
+)
+
+class StubVideosHandler(BaseHTTPRequestHandler):
+    """Serves the YouTube Data API videos endpoint for any 11-character ID except 'missing'."""
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        ids = parse_qs(parsed.query)['id'][0].split(',')
+        self.server.requests.append(ids)
+        items = [{
+            'id': video_id,
+            'snippet': {'title': f'Video {video_id}', 'thumbnails': {'high': {'url': f'https://example.com/{video_id}.jpg'}}},
+            'contentDetails': {'duration': 'PT1M'}
+        } for video_id in ids if not video_id.startswith('missing')]
+
+        body = json.dumps({'items': items}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeFetched:
+    def __init__(self, text):
+        self.text = text
+
+    def to_raw_data(self):
+        return [{'text': self.text, 'start': 0.0, 'duration': 1.5}]
+
+class FakeTrack:
+    """Stands in for youtube_transcript_api's Transcript."""
+
+    def __init__(self, code, generated=False, translations=(), fetches=None):
+        self.language_code = code
+        self.language = code.upper()
+        self.is_generated = generated
+        self.translation_languages = [MagicMock(language_code=target, language=target.upper()) for target in translations]
+        self.is_translatable = bool(translations)
+        self.fetches = fetches if fetches is not None else []
+
+    def translate(self, code):
+        translated = FakeTrack(code, generated=True, fetches=self.fetches)
+        translated.source = self
+        return translated
+
+    def fetch(self):
+        self.fetches.append(self.language_code)
+        return FakeFetched(f'{self.language_code} text')
 
 class TestYouTubeUtils(unittest.TestCase):
     
@@ -27,25 +86,103 @@ class TestYouTubeUtils(unittest.TestCase):
         with self.assertRaises(ValueError):
             extract_video_id(url)
     
+    def test_parse_youtube_url_playlists_and_channels(self):
+        self.assertEqual(parse_youtube_url("https://www.youtube.com/playlist?list=PLabc"), ('playlist', 'PLabc'))
+        self.assertEqual(parse_youtube_url("https://www.youtube.com/channel/UCabc/videos"), ('channel', 'UCabc'))
+        self.assertEqual(parse_youtube_url("https://www.youtube.com/@someone"), ('handle', '@someone'))
+        self.assertEqual(parse_youtube_url("https://www.youtube.com/user/someone"), ('user', 'someone'))
+        self.assertEqual(parse_youtube_url("https://www.youtube.com/shorts/dQw4w9WgXcQ"), ('video', 'dQw4w9WgXcQ'))
+        # A watch URL inside a playlist is still a video
+        self.assertEqual(parse_youtube_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLabc"),
+                         ('video', 'dQw4w9WgXcQ'))
+        with self.assertRaises(ValueError):
+            extract_video_id("https://www.youtube.com/playlist?list=PLabc")
+
+    @patch('utils.youtube.get_json')
+    def test_playlist_listing(self, mock_get_json):
+        mock_get_json.side_effect = [
+            {'items': [{'contentDetails': {'relatedPlaylists': {'uploads': 'UUabc'}}}]},
+            {'items': [{'contentDetails': {'videoId': 'dQw4w9WgXcQ'}}], 'nextPageToken': 'next'},
+            {'items': [{'id': 'dQw4w9WgXcQ', 'etag': 'etag-1'}]}
+        ]
+
+        self.assertEqual(get_uploads_playlist('handle', '@someone'), 'UUabc')
+        self.assertEqual(list_playlist_page('UUabc', 'token'), (['dQw4w9WgXcQ'], 'next'))
+        self.assertEqual(get_videos_etags(['dQw4w9WgXcQ', 'missing0001']), {'dQw4w9WgXcQ': 'etag-1'})
+
+        channels, items, _ = mock_get_json.call_args_list
+        self.assertEqual(channels.kwargs['params']['forHandle'], '@someone')
+        self.assertEqual(items.kwargs['params']['pageToken'], 'token')
+        self.assertEqual(items.kwargs['params']['playlistId'], 'UUabc')
+
+    def setUp(self):
+        transcript_lists.clear()
+        transcript_segments.clear()
+
     @patch('utils.youtube.YouTubeTranscriptApi')
     def test_get_video_transcript_success(self, mock_transcript_api):
         # Mock successful transcript retrieval
-        mock_transcript_api.get_transcript.return_value = [
+        track = MagicMock(language_code='en', is_generated=False)
+        track.fetch.return_value.to_raw_data.return_value = [
             {'text': 'Hello', 'start': 0.0, 'duration': 1.0},
             {'text': 'world', 'start': 1.0, 'duration': 1.0}
         ]
-        
-        result = get_video_transcript("dQw4w9WgXcQ")
+        mock_transcript_api.return_value.list.return_value = [track]
+
+        result = get_video_transcript("https://youtu.be/dQw4w9WgXcQ")
         self.assertEqual(result, "Hello world")
-        mock_transcript_api.get_transcript.assert_called_once_with("dQw4w9WgXcQ")
-    
+        mock_transcript_api.return_value.list.assert_called_once_with("dQw4w9WgXcQ")
+
     @patch('utils.youtube.YouTubeTranscriptApi')
     def test_get_video_transcript_no_transcript(self, mock_transcript_api):
         # Mock transcript not available
-        mock_transcript_api.get_transcript.side_effect = Exception("Transcript not available")
-        
+        mock_transcript_api.return_value.list.side_effect = Exception("Transcript not available")
+
         with self.assertRaises(Exception):
-            get_video_transcript("dQw4w9WgXcQ")
+            get_video_transcript("https://youtu.be/dQw4w9WgXcQ")
+
+    def test_parse_languages(self):
+        self.assertEqual(parse_languages('de, en,de'), ('de', 'en'))
+        self.assertEqual(parse_languages(['pt-BR']), ('pt-BR',))
+        self.assertEqual(parse_languages(''), ('en',))
+        self.assertIsNone(language_key(' en '))
+        self.assertEqual(language_key('de,en'), 'de,en')
+        with self.assertRaises(ValueError):
+            parse_languages('en;drop table')
+        with self.assertRaises(ValueError):
+            parse_languages('a1,b2,c3,d4,e5,f6')
+
+    def test_select_track_prefers_manual_then_generated_then_translation(self):
+        tracks = [FakeTrack('de', generated=True), FakeTrack('fr', translations=('en', 'es')), FakeTrack('de')]
+
+        _, track = select_track(tracks, ('de',))
+        self.assertEqual(track['id'], 'de')
+        _, track = select_track([tracks[0], tracks[1]], ('de',))
+        self.assertEqual(track['id'], 'de.auto')
+        _, track = select_track(tracks, ('it', 'es'))
+        self.assertEqual((track['id'], track['kind']), ('fr>es', 'translated'))
+        # Nothing matches and nothing translates to it: the video's own track
+        _, track = select_track([FakeTrack('ja', generated=True)], ('en',))
+        self.assertEqual(track['id'], 'ja.auto')
+
+    @patch('utils.youtube.YouTubeTranscriptApi')
+    def test_switching_languages_reuses_cached_tracks(self, mock_transcript_api):
+        fetches = []
+        mock_transcript_api.return_value.list.return_value = [
+            FakeTrack('de', fetches=fetches), FakeTrack('en', generated=True, translations=('fr',), fetches=fetches)
+        ]
+        url = "https://youtu.be/dQw4w9WgXcQ"
+
+        track, segments = get_transcript_track(url, 'de')
+        self.assertEqual((track['id'], segments[0]['text']), ('de', 'de text'))
+        self.assertEqual(get_transcript_track(url, 'fr')[0]['id'], 'en.auto>fr')
+        self.assertEqual(get_transcript_track(url, 'de')[1], segments)
+        self.assertEqual(get_transcript_track(url, 'fr,de')[0]['id'], 'de')
+
+        # One track list request and one caption fetch per distinct track
+        mock_transcript_api.return_value.list.assert_called_once_with("dQw4w9WgXcQ")
+        self.assertEqual(fetches, ['de', 'fr'])
+        self.assertGreater(transcript_segments.stats()['bytes'], 0)
     
     @patch('utils.youtube.os.environ.get')
     @patch('utils.youtube.googleapiclient.discovery.build')
@@ -84,6 +221,27 @@ class TestYouTubeUtils(unittest.TestCase):
         self.assertEqual(result["thumbnail"], "https://example.com/thumbnail.jpg")
         self.assertEqual(result["duration"], "5:30")
     
+    @patch('utils.youtube.get_json')
+    def test_get_video_info_uses_pooled_client(self, mock_get_json):
+        mock_get_json.return_value = {
+            "items": [{
+                "id": "dQw4w9WgXcQ",
+                "snippet": {
+                    "title": "Test Video",
+                    "thumbnails": {"high": {"url": "https://example.com/thumbnail.jpg"}}
+                },
+                "contentDetails": {"duration": "PT5M30S"}
+            }]
+        }
+
+        result = get_video_info("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+
+        self.assertEqual(result["title"], "Test Video")
+        self.assertEqual(result["duration"], "PT5M30S")
+        args, kwargs = mock_get_json.call_args
+        self.assertTrue(args[0].endswith("/videos"))
+        self.assertEqual(kwargs["params"]["id"], "dQw4w9WgXcQ")
+
     @patch('utils.youtube.os.environ.get')
     def test_get_video_info_missing_api_key(self, mock_env_get):
         # Mock missing API key
@@ -92,5 +250,56 @@ class TestYouTubeUtils(unittest.TestCase):
         with self.assertRaises(Exception):
             get_video_info("dQw4w9WgXcQ")
 
+class TestBatchedVideoInfo(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubVideosHandler)
+        cls.server.requests = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests.clear()
+        patcher = patch('utils.youtube.YOUTUBE_API_BASE_URL', self.base_url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_videos_info_splits_into_requests_of_50(self):
+        video_ids = [f'vid{i:08d}' for i in range(120)] + ['missing0000']
+        videos = get_videos_info(video_ids)
+
+        self.assertEqual(len(videos), 120)
+        self.assertEqual(videos['vid00000007']['title'], 'Video vid00000007')
+        self.assertEqual([len(ids) for ids in self.server.requests], [50, 50, 21])
+
+    def test_concurrent_lookups_are_coalesced(self):
+        results = {}
+
+        def lookup(index):
+            results[index] = get_video_info(f'https://youtu.be/vid{index:08d}')
+
+        with patch('utils.youtube.video_info_batcher.window', 0.1):
+            threads = [threading.Thread(target=lookup, args=(i,)) for i in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(len(results), 20)
+        self.assertEqual(results[3]['title'], 'Video vid00000003')
+        self.assertLess(len(self.server.requests), 5)
+        self.assertEqual(sum(len(ids) for ids in self.server.requests), 20)
+
+    def test_unknown_video_raises(self):
+        with self.assertRaises(Exception):
+            get_video_info('https://youtu.be/missing0001')
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
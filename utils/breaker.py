@@ -0,0 +1,186 @@
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker settings, shared by every upstream dependency. After
+# BREAKER_FAILURE_THRESHOLD consecutive failures a breaker opens and calls
+# fail at once for BREAKER_RESET_SECONDS; then up to BREAKER_HALF_OPEN_PROBES
+# calls are let through, and the first to succeed closes it again. A
+# threshold of 0 disables the breakers.
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", 30))
+BREAKER_HALF_OPEN_PROBES = int(os.environ.get("BREAKER_HALF_OPEN_PROBES", 1))
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, dependency, retry_after):
+        self.dependency = dependency
+        self.retry_after = retry_after
+        super().__init__(f"Upstream service {dependency} is temporarily unavailable, please try again in {max(1, round(retry_after))} seconds")
+
+
+def upstream_failure(error):
+    """Whether an error means the dependency itself is failing.
+
+    Client errors (4xx other than 408 and 429) are answers about one
+    request and count as a success. Running out of our own rate limit
+    budget means the call never reached the dependency: None, no verdict.
+    """
+    from utils.ratelimit import RateLimitExceeded
+    if isinstance(error, (RateLimitExceeded, CircuitOpen)):
+        return None
+    response = getattr(error, 'response', None)
+    status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    if isinstance(status, int) and 400 <= status < 500 and status not in (408, 429):
+        return False
+    return True
+
+def transcript_failure(error):
+    """upstream_failure for youtube-transcript-api, whose errors about one video do not count.
+
+    Disabled captions, unavailable videos and missing languages are answers;
+    blocked requests and failed page loads mean the scraper is not working.
+    """
+    from youtube_transcript_api import CouldNotRetrieveTranscript, RequestBlocked, YouTubeRequestFailed
+    if isinstance(error, (RequestBlocked, YouTubeRequestFailed)):
+        return True
+    if isinstance(error, CouldNotRetrieveTranscript):
+        return False
+    return upstream_failure(error)
+
+
+class CircuitBreaker:
+    """Closed, open and half-open states for one dependency, per process."""
+
+    def __init__(self, name, failure_threshold=None, reset_seconds=None, half_open_probes=None,
+                 is_failure=upstream_failure, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = BREAKER_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold
+        self.reset_seconds = BREAKER_RESET_SECONDS if reset_seconds is None else reset_seconds
+        self.half_open_probes = BREAKER_HALF_OPEN_PROBES if half_open_probes is None else half_open_probes
+        self.is_failure = is_failure
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._stats = {'calls': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def _retry_after(self):
+        return max(0.0, self._opened_at + self.reset_seconds - self._clock())
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == 'open' and self._retry_after() == 0:
+                return 'half_open'
+            return self._state
+
+    def before_call(self):
+        """Admit a call, or raise CircuitOpen. Returns True when the call is a half-open probe."""
+        with self._lock:
+            self._stats['calls'] += 1
+            if not self.failure_threshold or self._state == 'closed':
+                return False
+            if self._state == 'open':
+                retry_after = self._retry_after()
+                if retry_after > 0:
+                    self._stats['rejected'] += 1
+                    raise CircuitOpen(self.name, retry_after)
+                self._state = 'half_open'
+                self._probes = 0
+            if self._probes >= self.half_open_probes:
+                self._stats['rejected'] += 1
+                raise CircuitOpen(self.name, self.reset_seconds)
+            self._probes += 1
+            return True
+
+    def record_success(self, probe=False):
+        with self._lock:
+            if probe:
+                self._probes -= 1
+            self._failures = 0
+            if self._state != 'closed':
+                logger.info(f"Circuit for {self.name} closed")
+            self._state = 'closed'
+
+    def record_failure(self, probe=False):
+        with self._lock:
+            if probe:
+                self._probes -= 1
+            self._failures += 1
+            self._stats['failures'] += 1
+            if self._state == 'half_open' or (self.failure_threshold and self._failures >= self.failure_threshold):
+                if self._state != 'open':
+                    self._stats['opened'] += 1
+                    logger.error(f"Circuit for {self.name} opened after {self._failures} failures")
+                self._state = 'open'
+                self._opened_at = self._clock()
+
+    def release(self, probe=False):
+        """Give back a probe slot for a call that ended without a verdict (cancelled or closed)."""
+        if probe:
+            with self._lock:
+                self._probes -= 1
+
+    @contextmanager
+    def guard(self):
+        """Run the body as one call to the dependency, failing fast while the breaker is open.
+
+        Works around sync and async bodies alike. Errors are judged by
+        is_failure; a generator closed early or a cancelled task counts as
+        neither success nor failure.
+        """
+        probe = self.before_call()
+        try:
+            yield
+        except Exception as e:
+            verdict = self.is_failure(e)
+            if verdict is None:
+                self.release(probe)
+            elif verdict:
+                self.record_failure(probe)
+            else:
+                self.record_success(probe)
+            raise
+        except BaseException:
+            self.release(probe)
+            raise
+        self.record_success(probe)
+
+    def call(self, fn, *args, **kwargs):
+        with self.guard():
+            return fn(*args, **kwargs)
+
+    def reset(self):
+        with self._lock:
+            self._state = 'closed'
+            self._failures = 0
+            self._probes = 0
+
+    def stats(self):
+        state = self.state
+        with self._lock:
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'retry_after': round(self._retry_after(), 1) if state == 'open' else 0.0,
+                **self._stats
+            }
+
+
+breakers = {
+    # YouTube Data API videos.list, for titles, durations and thumbnails
+    'youtube_data': CircuitBreaker('youtube_data'),
+    # The watch-page scraper behind youtube-transcript-api
+    'transcripts': CircuitBreaker('transcripts', is_failure=transcript_failure),
+    # Chat completions and embeddings
+    'openai': CircuitBreaker('openai')
+}
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL and an optional backing lookup.
+
+    Lookups check the in-process LRU first and fall back to ``backing_lookup``
+    (for example a database query) on a miss. Values found in the backing
+    store are promoted into the LRU so the next lookup stays in memory.
+
+    With ``max_bytes`` set, entries are also evicted until the sizes reported
+    by ``sizeof`` (``len`` by default) add up to at most that many bytes.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=3600, backing_lookup=None, max_bytes=0, sizeof=len):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backing_lookup = backing_lookup
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'backing_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self._stats['expirations'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['memory_hits'] += 1
+            return value
+
+    def get(self, key):
+        """Return the cached value for key, or None if neither tier has it."""
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+
+        if self.backing_lookup is not None:
+            try:
+                value = self.backing_lookup(key)
+            except Exception as e:
+                logger.error(f"Error reading backing cache: {str(e)}")
+                value = None
+
+            if value is not None:
+                with self._lock:
+                    self._stats['backing_hits'] += 1
+                self.set(key, value)
+                return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entries."""
+        if self.max_entries <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        size = self.sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats['evictions'] += 1
+
+    def invalidate(self, key):
+        """Drop key from the in-process tier."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def clear(self):
+        """Drop all in-process entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self):
+        """Return hit/miss counters and sizing information."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            if self.max_bytes:
+                stats['bytes'] = self._bytes
+                stats['max_bytes'] = self.max_bytes
+
+        lookups = stats['memory_hits'] + stats['backing_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['memory_hits'] + stats['backing_hits']) / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['ttl_seconds'] = self.ttl_seconds
+        return stats
@@ -0,0 +1,150 @@
+import os
+import sys
+import math
+import struct
+import zlib
+import heapq
+import logging
+from array import array
+from collections import Counter
+from utils.textindex import tokenize
+from utils.tokens import count_tokens
+from utils.ratelimit import limiters
+from utils.breaker import breakers
+
+logger = logging.getLogger(__name__)
+
+# NumPy is optional; without it vectors are lists of floats and the top-k
+# search is a pure Python scan, which is fine for one video's chunks.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Transcripts are cut into chunks of up to EMBEDDING_CHUNK_TOKENS tokens on
+# segment boundaries. EMBEDDING_BACKEND is 'hashing' (local, deterministic,
+# no network) or 'openai' (OPENAI_EMBEDDING_MODEL through the OpenAI API).
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "hashing")
+EMBEDDING_CHUNK_TOKENS = int(os.environ.get("EMBEDDING_CHUNK_TOKENS", 200))
+HASHING_DIMENSIONS = int(os.environ.get("HASHING_DIMENSIONS", 1024))
+OPENAI_EMBEDDING_MODEL = os.environ.get("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+OPENAI_EMBEDDING_BATCH = 256
+
+def chunk_segments(segments, max_tokens=None):
+    """Group consecutive transcript segments into chunks of at most max_tokens tokens.
+
+    Returns the segment index each chunk starts at, plus the segment count
+    as the last entry, so chunk i covers segments[bounds[i]:bounds[i + 1]].
+    A single segment longer than max_tokens is a chunk of its own.
+    """
+    max_tokens = max_tokens or EMBEDDING_CHUNK_TOKENS
+    bounds = [0] if segments else []
+    used = 0
+    for index, segment in enumerate(segments):
+        cost = count_tokens(segment['text'])
+        if used and used + cost > max_tokens:
+            bounds.append(index)
+            used = 0
+        used += cost
+    if segments:
+        bounds.append(len(segments))
+    return bounds
+
+
+class HashingEmbedder:
+    """Signed feature hashing of word unigrams and bigrams into a fixed number of dimensions.
+
+    CRC32 keeps the vectors identical across processes and runs, so stored
+    embeddings stay comparable with new queries without any model files.
+    """
+
+    def __init__(self, dimensions=None):
+        self.dimensions = dimensions or HASHING_DIMENSIONS
+        self.name = f"hashing-{self.dimensions}"
+
+    def _features(self, text):
+        tokens = tokenize(text)
+        return Counter(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+
+    def _embed(self, text):
+        vector = [0.0] * self.dimensions
+        for feature, count in self._features(text).items():
+            digest = zlib.crc32(feature.encode('utf-8'))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % self.dimensions] += sign * (1 + math.log(count))
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed(self, texts):
+        return [self._embed(text) for text in texts]
+
+
+class OpenAIEmbedder:
+    """Embeddings from the OpenAI API, rate limited like completions."""
+
+    def __init__(self, model=None):
+        self.model = model or OPENAI_EMBEDDING_MODEL
+        self.name = f"openai:{self.model}"
+
+    def embed(self, texts):
+        from utils.summarizer import openai_client
+        vectors = []
+        for start in range(0, len(texts), OPENAI_EMBEDDING_BATCH):
+            batch = texts[start:start + OPENAI_EMBEDDING_BATCH]
+            with breakers['openai'].guard():
+                limiters['openai'].acquire(tokens=sum(count_tokens(text) for text in batch))
+                response = openai_client().embeddings.create(model=self.model, input=batch)
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+        return vectors
+
+def get_embedder():
+    """The configured embedding backend."""
+    if EMBEDDING_BACKEND == 'openai':
+        return OpenAIEmbedder()
+    return HashingEmbedder()
+
+def pack_vectors(vectors):
+    """Pack equal-length vectors as consecutive little-endian float32 values."""
+    if np is not None:
+        return np.asarray(vectors, dtype='<f4').tobytes()
+    values = array('f', (value for vector in vectors for value in vector))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+def unpack_vectors(data, dimensions):
+    """Inverse of pack_vectors: a (count x dimensions) float32 matrix, or lists without NumPy."""
+    if np is not None:
+        return np.frombuffer(data, dtype='<f4').reshape(-1, dimensions)
+    values = array('f')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return [values[start:start + dimensions].tolist() for start in range(0, len(values), dimensions)]
+
+def pack_bounds(bounds):
+    """Pack chunk boundaries (segment indexes) as little-endian uint32 values."""
+    return struct.pack(f'<{len(bounds)}I', *bounds)
+
+def unpack_bounds(data):
+    return list(struct.unpack(f'<{len(data) // 4}I', data))
+
+def top_k(matrix, query, k):
+    """Indexes and cosine scores of the k rows most similar to query, best first.
+
+    Rows and query are unit length, so the dot product is the cosine
+    similarity. With NumPy this is one matrix-vector product and a partial
+    sort; a video has at most a few thousand chunks, so an exact scan beats
+    an approximate index here.
+    """
+    if np is not None:
+        if not len(matrix):
+            return []
+        scores = matrix @ np.asarray(query, dtype=np.float32)
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(index), float(scores[index])) for index in best]
+
+    scores = ((index, sum(a * b for a, b in zip(row, query))) for index, row in enumerate(matrix))
+    return heapq.nlargest(k, scores, key=lambda item: item[1])
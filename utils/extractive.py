@@ -0,0 +1,135 @@
+import math
+import re
+import logging
+from collections import Counter
+from utils.textindex import tokenize
+from utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# NumPy is optional; without it sentences are ranked by similarity to the
+# TF-IDF centroid in pure Python instead of by TextRank.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+# Caption text often has no punctuation; overlong sentences are cut into
+# windows of WINDOW_WORDS words so they can be ranked individually.
+WINDOW_WORDS = 30
+MAX_FEATURES = 2000
+MAX_TEXTRANK_SENTENCES = 2000
+DAMPING = 0.85
+REDUNDANCY_THRESHOLD = 0.8
+
+def split_sentences(text):
+    """Split a transcript (string or list of segment texts) into rankable sentences."""
+    if not isinstance(text, str):
+        text = ' '.join(piece.strip() for piece in text)
+
+    sentences = []
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        words = sentence.split()
+        if len(words) > 2 * WINDOW_WORDS:
+            sentences.extend(' '.join(words[i:i + WINDOW_WORDS]) for i in range(0, len(words), WINDOW_WORDS))
+        elif words:
+            sentences.append(' '.join(words))
+    return sentences
+
+def _tfidf_matrix(token_lists):
+    """Row-normalized sublinear TF-IDF matrix (sentences x terms) as float32."""
+    document_frequency = Counter(term for tokens in token_lists for term in set(tokens))
+    vocabulary = {term: column for column, (term, _) in enumerate(document_frequency.most_common(MAX_FEATURES))}
+
+    rows, columns = [], []
+    for row, tokens in enumerate(token_lists):
+        for token in tokens:
+            column = vocabulary.get(token)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+
+    counts = np.zeros((len(token_lists), len(vocabulary)), dtype=np.float32)
+    np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), 1)
+
+    frequencies = np.array([document_frequency[term] for term in vocabulary], dtype=np.float32)
+    idf = np.log((1 + len(token_lists)) / (1 + frequencies)) + 1
+    matrix = np.log1p(counts) * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+def _textrank(matrix, iterations=50, tolerance=1e-6):
+    """PageRank over the sentence cosine-similarity graph."""
+    count = matrix.shape[0]
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, row_sums, out=np.full_like(similarity, 1.0 / count), where=row_sums > 0)
+
+    scores = np.full(count, 1.0 / count, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - DAMPING) / count + DAMPING * (transition.T @ scores)
+        converged = np.abs(updated - scores).sum() < tolerance
+        scores = updated
+        if converged:
+            break
+    return scores
+
+def _rank_numpy(token_lists):
+    matrix = _tfidf_matrix(token_lists)
+    if len(token_lists) <= MAX_TEXTRANK_SENTENCES:
+        scores = _textrank(matrix)
+    else:
+        # The similarity graph grows quadratically; very long transcripts use the centroid
+        centroid = matrix.mean(axis=0)
+        scores = matrix @ (centroid / (np.linalg.norm(centroid) or 1))
+    return scores.tolist(), lambda a, b: float(matrix[a] @ matrix[b])
+
+def _rank_python(token_lists):
+    document_frequency = Counter(term for tokens in token_lists for term in set(tokens))
+    count = len(token_lists)
+    vectors = []
+    for tokens in token_lists:
+        vector = {term: (1 + math.log(frequency)) * (math.log((1 + count) / (1 + document_frequency[term])) + 1)
+                  for term, frequency in Counter(tokens).items()}
+        norm = math.sqrt(sum(value * value for value in vector.values())) or 1
+        vectors.append({term: value / norm for term, value in vector.items()})
+
+    centroid = Counter()
+    for vector in vectors:
+        centroid.update(vector)
+
+    def dot(a, b):
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(value * b.get(term, 0.0) for term, value in a.items())
+
+    return [dot(vector, centroid) for vector in vectors], lambda a, b: dot(vectors[a], vectors[b])
+
+def extractive_summary(text, max_tokens):
+    """Pick the most central transcript sentences, up to about max_tokens, in original order."""
+    sentences = split_sentences(text)
+    if not sentences:
+        return ''
+
+    token_lists = [tokenize(sentence) for sentence in sentences]
+    scores, similarity = (_rank_numpy if np is not None else _rank_python)(token_lists)
+    order = sorted(range(len(sentences)), key=lambda index: (-scores[index], index))
+
+    chosen, used = [], 0
+    for index in order:
+        if used >= max_tokens:
+            break
+        cost = count_tokens(sentences[index])
+        if chosen and used + cost > max_tokens:
+            continue
+        # Skip near-duplicates of sentences already chosen
+        if any(similarity(index, other) > REDUNDANCY_THRESHOLD for other in chosen):
+            continue
+        chosen.append(index)
+        used += cost
+
+    return ' '.join(sentences[index] for index in sorted(chosen))
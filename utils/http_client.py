@@ -0,0 +1,174 @@
+import os
+import random
+import threading
+import time
+import asyncio
+import logging
+import weakref
+from collections import defaultdict, deque
+from email.utils import parsedate_to_datetime
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Connection pool and retry settings for outbound API calls
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 20))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3.05))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 10))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_BASE = float(os.environ.get("HTTP_BACKOFF_BASE", 0.5))
+HTTP_BACKOFF_MAX = float(os.environ.get("HTTP_BACKOFF_MAX", 30))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def _build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+# Shared keep-alive session so repeated calls reuse TCP/TLS connections
+session = _build_session()
+
+# httpx clients are bound to the event loop they first ran on, so the async
+# code path keeps one client per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_client():
+    """Pooled httpx.AsyncClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_keepalive_connections=HTTP_POOL_SIZE)
+        )
+    return client
+
+async def close_async_client():
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+class LatencyStats:
+    """Per-endpoint request counters and a window of recent latencies."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._counters = defaultdict(lambda: {'requests': 0, 'errors': 0, 'retries': 0})
+
+    def record(self, endpoint, seconds, error=False):
+        with self._lock:
+            self._latencies[endpoint].append(seconds * 1000)
+            self._counters[endpoint]['requests'] += 1
+            if error:
+                self._counters[endpoint]['errors'] += 1
+
+    def record_retry(self, endpoint):
+        with self._lock:
+            self._counters[endpoint]['retries'] += 1
+
+    def snapshot(self):
+        """Return counters and p50/p95/max latency in milliseconds per endpoint."""
+        with self._lock:
+            stats = {}
+            for endpoint, counters in self._counters.items():
+                latencies = sorted(self._latencies[endpoint])
+                stats[endpoint] = dict(counters)
+                if latencies:
+                    stats[endpoint].update({
+                        'p50_ms': round(latencies[len(latencies) // 2], 1),
+                        'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                        'max_ms': round(latencies[-1], 1)
+                    })
+            return stats
+
+    def clear(self):
+        with self._lock:
+            self._latencies.clear()
+            self._counters.clear()
+
+latency_stats = LatencyStats()
+
+def retry_after_seconds(response):
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, response=None):
+    """Full-jitter exponential backoff, or the server's Retry-After when given."""
+    if response is not None:
+        retry_after = retry_after_seconds(response)
+        if retry_after is not None:
+            return min(retry_after, HTTP_BACKOFF_MAX)
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+def get_json(url, params=None, endpoint=None):
+    """GET a JSON document through the pooled session, retrying transient failures.
+
+    Connection errors, timeouts, 429 and 5xx responses are retried up to
+    HTTP_MAX_RETRIES times. Other HTTP errors are raised immediately.
+    """
+    endpoint = endpoint or url
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        response = None
+        try:
+            response = session.get(url, params=params, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+        except (requests.ConnectionError, requests.Timeout) as e:
+            latency_stats.record(endpoint, time.perf_counter() - start, error=True)
+            if attempt >= HTTP_MAX_RETRIES:
+                raise
+            logger.warning(f"Retrying {endpoint} after error: {str(e)}")
+        else:
+            failed = response.status_code >= 400
+            latency_stats.record(endpoint, time.perf_counter() - start, error=failed)
+            if response.status_code not in RETRY_STATUSES or attempt >= HTTP_MAX_RETRIES:
+                response.raise_for_status()
+                return response.json()
+            logger.warning(f"Retrying {endpoint} after HTTP {response.status_code}")
+
+        latency_stats.record_retry(endpoint)
+        time.sleep(backoff_delay(attempt, response))
+        attempt += 1
+
+async def get_json_async(url, params=None, endpoint=None):
+    """Async version of get_json, with the same retries, on an httpx.AsyncClient."""
+    endpoint = endpoint or url
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await get_async_client().get(url, params=params)
+        except httpx.TransportError as e:
+            latency_stats.record(endpoint, time.perf_counter() - start, error=True)
+            if attempt >= HTTP_MAX_RETRIES:
+                raise
+            logger.warning(f"Retrying {endpoint} after error: {str(e)}")
+        else:
+            failed = response.status_code >= 400
+            latency_stats.record(endpoint, time.perf_counter() - start, error=failed)
+            if response.status_code not in RETRY_STATUSES or attempt >= HTTP_MAX_RETRIES:
+                response.raise_for_status()
+                return response.json()
+            logger.warning(f"Retrying {endpoint} after HTTP {response.status_code}")
+
+        latency_stats.record_retry(endpoint)
+        await asyncio.sleep(backoff_delay(attempt, response))
+        attempt += 1
@@ -0,0 +1,87 @@
+import queue
+import contextvars
+import threading
+import time
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-key lookups into batched calls.
+
+    Keys submitted within `window` seconds of each other (up to
+    `max_batch` distinct keys) are passed together to `fetch_many`, which
+    must return a dict mapping keys to results. Each caller gets back the
+    result for its own key, or None when the key is missing from the dict.
+
+    A batched call runs in the context of one of its callers, so context
+    variables such as the current trace and rate limit priority carry over
+    to the executor thread: the first caller's, or with `context_order` the
+    caller for which `context_order()` returns the smallest value.
+    """
+
+    def __init__(self, fetch_many, max_batch=50, window=0.01, max_workers=4, name='microbatch', context_order=None):
+        self.fetch_many = fetch_many
+        self.context_order = context_order
+        self.max_batch = max_batch
+        self.window = window
+        self.name = name
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._collect, name=f'{self.name}-collector', daemon=True)
+                self._thread.start()
+
+    def submit(self, key):
+        """Queue a lookup for key and return a Future for its result."""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((key, future, contextvars.copy_context()))
+        return future
+
+    def get(self, key, timeout=None):
+        """Look up key, blocking until its batch completes."""
+        return self.submit(key).result(timeout=timeout)
+
+    def _collect(self):
+        while True:
+            key, future, context = self._queue.get()
+            waiters = {key: [future]}
+            contexts = [context]
+            deadline = time.monotonic() + self.window
+
+            while len(waiters) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    key, future, context = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                waiters.setdefault(key, []).append(future)
+                contexts.append(context)
+
+            self._executor.submit(self._dispatch, waiters, contexts)
+
+    def _dispatch(self, waiters, contexts):
+        context = contexts[0]
+        if self.context_order is not None:
+            context = min(contexts, key=lambda waiter: waiter.run(self.context_order))
+        try:
+            results = context.run(self.fetch_many, list(waiters))
+        except Exception as e:
+            for futures in waiters.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+
+        for key, futures in waiters.items():
+            for future in futures:
+                future.set_result(results.get(key))
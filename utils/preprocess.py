@@ -0,0 +1,91 @@
+import os
+import re
+import logging
+from utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Cleanup applied to caption segments before they are sent for
+# summarization. SUMMARY_INPUT_TOKEN_BUDGET caps the cleaned input
+# (0 = no cap); segments are dropped evenly across the video to fit.
+SUMMARY_INPUT_TOKEN_BUDGET = int(os.environ.get("SUMMARY_INPUT_TOKEN_BUDGET", 0))
+TRANSCRIPT_STRIP_FILLERS = os.environ.get("TRANSCRIPT_STRIP_FILLERS", "1") == "1"
+
+# [Music], [Applause], (laughs), ♪ ... ♪ and similar non-speech markers
+ANNOTATION = re.compile(r'\[[^\]]{0,40}\]|\((?:music|applause|laughs?|laughter|inaudible|silence)\)|[♪♫]+', re.IGNORECASE)
+FILLER = re.compile(r'\b(?:u+m+|u+h+|e+r+m+|h+m+|mhm)\b[,.]?\s*', re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+# Longest repeated run of words looked for between consecutive captions
+MAX_OVERLAP_WORDS = 20
+
+def clean_text(text, strip_fillers=True):
+    """Remove non-speech annotations (and filler words) from one caption."""
+    text = ANNOTATION.sub(' ', text)
+    if strip_fillers:
+        text = FILLER.sub('', text)
+    return WHITESPACE.sub(' ', text).strip()
+
+def _overlap(previous, words):
+    """Number of leading words that repeat the end of the previous caption."""
+    for size in range(min(len(previous), len(words), MAX_OVERLAP_WORDS), 1, -1):
+        if [word.lower() for word in previous[-size:]] == [word.lower() for word in words[:size]]:
+            return size
+    return 0
+
+def dedupe_captions(texts):
+    """Drop repeated captions and the overlap that rolling auto-captions repeat."""
+    result = []
+    previous = []
+    for text in texts:
+        words = text.split()
+        if not words:
+            continue
+        if [word.lower() for word in words] == [word.lower() for word in previous]:
+            continue
+        words = words[_overlap(previous, words):]
+        if words:
+            result.append(' '.join(words))
+            previous = text.split()
+    return result
+
+def fit_token_budget(texts, counts, budget):
+    """Keep an evenly spread subset of texts whose token counts sum to at most budget."""
+    total = sum(counts)
+    if not budget or total <= budget:
+        return texts, total
+
+    ratio = budget / total
+    kept, used, allowance = [], 0, 0.0
+    for text, tokens in zip(texts, counts):
+        allowance += tokens * ratio
+        if tokens <= allowance and used + tokens <= budget:
+            kept.append(text)
+            used += tokens
+            allowance -= tokens
+    return kept, used
+
+def prepare_transcript(segments, budget=None, strip_fillers=None):
+    """Clean caption segments for summarization.
+
+    Returns the cleaned segment texts and a report of how many segments and
+    tokens went in and out.
+    """
+    strip_fillers = TRANSCRIPT_STRIP_FILLERS if strip_fillers is None else strip_fillers
+    budget = SUMMARY_INPUT_TOKEN_BUDGET if budget is None else budget
+
+    raw = [segment['text'] for segment in segments]
+    tokens_in = sum(count_tokens(text) for text in raw)
+
+    texts = dedupe_captions([clean_text(text, strip_fillers) for text in raw])
+    texts, tokens_out = fit_token_budget(texts, [count_tokens(text) for text in texts], budget)
+
+    report = {
+        'segments_in': len(raw),
+        'segments_out': len(texts),
+        'tokens_in': tokens_in,
+        'tokens_out': tokens_out,
+        'tokens_saved': tokens_in - tokens_out
+    }
+    logger.info(f"Transcript preprocessing saved {report['tokens_saved']} of {tokens_in} tokens")
+    return texts, report
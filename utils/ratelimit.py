@@ -0,0 +1,347 @@
+import os
+import json
+import math
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+import time
+import logging
+import tempfile
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# fcntl is only available on Unix; elsewhere budgets are kept per process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Client-side limits per provider. Budgets refill continuously; request and
+# token buckets hold at most RATE_LIMIT_BURST_SECONDS worth of budget, so
+# calls are spread evenly at the provider's ceiling instead of bursting into
+# 429s. The OpenAI token bucket still holds at least OPENAI_MAX_REQUEST_TOKENS,
+# the largest single request: a single-pass summary of
+# SUMMARY_SINGLE_PASS_TOKENS plus its prompt and a long summary. The YouTube
+# Data API quota is a daily allowance and may be spent at once. A rate of 0
+# disables that budget.
+YOUTUBE_REQUESTS_PER_MINUTE = int(os.environ.get("YOUTUBE_REQUESTS_PER_MINUTE", 600))
+YOUTUBE_QUOTA_UNITS_PER_DAY = int(os.environ.get("YOUTUBE_QUOTA_UNITS_PER_DAY", 10000))
+OPENAI_REQUESTS_PER_MINUTE = int(os.environ.get("OPENAI_REQUESTS_PER_MINUTE", 60))
+OPENAI_TOKENS_PER_MINUTE = int(os.environ.get("OPENAI_TOKENS_PER_MINUTE", 30000))
+OPENAI_MAX_REQUEST_TOKENS = int(os.environ.get("SUMMARY_SINGLE_PASS_TOKENS", 12000)) + 2000
+RATE_LIMIT_BURST_SECONDS = float(os.environ.get("RATE_LIMIT_BURST_SECONDS", 10))
+
+# Interactive calls queue for up to RATE_LIMIT_MAX_WAIT_SECONDS before
+# RateLimitExceeded is raised; background work, which no client is waiting
+# on, queues until capacity frees up. Budgets live in RATE_LIMIT_STATE_FILE,
+# shared by every worker process on the host; set it to an empty string to
+# keep them per process (as the tests do).
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.environ.get("RATE_LIMIT_MAX_WAIT_SECONDS", 120))
+RATE_LIMIT_STATE_FILE = os.environ.get(
+    "RATE_LIMIT_STATE_FILE", os.path.join(tempfile.gettempdir(), "youtube-transcriber-ratelimit.json")
+)
+RATE_LIMIT_POLL_SECONDS = 0.05
+
+# Waiters in a process are served in this order, first come first served
+# within a level
+PRIORITIES = {'interactive': 0, 'background': 1}
+_priority = contextvars.ContextVar('ratelimit_priority', default='interactive')
+_unbounded = contextvars.ContextVar('ratelimit_unbounded', default=False)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would have to wait longer than the limiter allows."""
+
+    def __init__(self, provider, retry_after):
+        self.provider = provider
+        self.retry_after = retry_after
+        super().__init__(f"{provider} rate limit reached, please try again in {max(1, round(retry_after))} seconds")
+
+
+class Budget:
+    """Token bucket refilling `rate` units per `per` seconds, holding at most `capacity`."""
+
+    def __init__(self, rate, per=60.0, capacity=None):
+        self.rate = rate
+        self.per = per
+        self.capacity = capacity or rate
+
+    def describe(self):
+        return {'rate': self.rate, 'per': self.per, 'capacity': self.capacity}
+
+
+def _take(state, name, budgets, costs, now, commit=True):
+    """Refill the provider's buckets in `state` and take `costs` if every bucket allows it.
+
+    A cost above a bucket's capacity waits for a full bucket and leaves it
+    in debt, so large requests still count in full. Returns 0 when taken,
+    otherwise the seconds until the call would fit.
+    """
+    levels = {}
+    delay = 0.0
+    for budget_name, cost in costs.items():
+        budget = budgets[budget_name]
+        tokens, updated = state.get(f"{name}.{budget_name}", (budget.capacity, now))
+        tokens = min(budget.capacity, tokens + max(0.0, now - updated) * budget.rate / budget.per)
+        levels[budget_name] = tokens
+        needed = min(cost, budget.capacity)
+        if tokens < needed:
+            delay = max(delay, (needed - tokens) * budget.per / budget.rate)
+
+    if commit:
+        for budget_name, tokens in levels.items():
+            taken = costs[budget_name] if delay == 0 else 0
+            state[f"{name}.{budget_name}"] = (tokens - taken, now)
+    return delay
+
+
+class MemoryStore:
+    """Bucket levels for this process only."""
+
+    def __init__(self):
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def take(self, name, budgets, costs):
+        with self._lock:
+            return _take(self._state, name, budgets, costs, time.monotonic())
+
+    def levels(self, name, budgets):
+        with self._lock:
+            state = dict(self._state)
+        now = time.monotonic()
+        _take(state, name, budgets, {budget_name: 0 for budget_name in budgets}, now)
+        return {budget_name: state[f"{name}.{budget_name}"][0] for budget_name in budgets}
+
+
+class FileStore:
+    """Bucket levels in a JSON file under an exclusive flock, shared by every process on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _state(self, write=True):
+        # flock is held per open file, so threads of one process also take the mutex
+        with self._lock, open(self.path, 'a+', encoding='utf-8') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            handle.seek(0)
+            try:
+                state = {key: tuple(value) for key, value in json.loads(handle.read() or '{}').items()}
+            except ValueError:
+                logger.error(f"Ignoring unreadable rate limit state in {self.path}")
+                state = {}
+            yield state
+            if write:
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps(state))
+
+    def take(self, name, budgets, costs):
+        with self._state() as state:
+            # Wall-clock time, since monotonic clocks are not comparable across processes
+            return _take(state, name, budgets, costs, time.time())
+
+    def levels(self, name, budgets):
+        with self._state(write=False) as state:
+            _take(state, name, budgets, {budget_name: 0 for budget_name in budgets}, time.time())
+            return {budget_name: state[f"{name}.{budget_name}"][0] for budget_name in budgets}
+
+
+def default_store():
+    if RATE_LIMIT_STATE_FILE and fcntl is not None:
+        return FileStore(RATE_LIMIT_STATE_FILE)
+    if RATE_LIMIT_STATE_FILE:
+        logger.warning("Rate limit budgets are per process: sharing them needs fcntl")
+    return MemoryStore()
+
+
+@contextmanager
+def priority(level):
+    """Run the block's rate-limited calls at the given priority ('interactive' or 'background')."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+@contextmanager
+def wait_for_capacity():
+    """Let the block's rate-limited calls queue past max_wait, for work that no client is blocked on.
+
+    Background priority implies this; queued jobs keep their interactive
+    priority but may wait as long as a long map-reduce run needs.
+    """
+    token = _unbounded.set(True)
+    try:
+        yield
+    finally:
+        _unbounded.reset(token)
+
+def priority_rank():
+    """Rank of the current priority in PRIORITIES; lower ranks are served first."""
+    return PRIORITIES.get(_priority.get(), 0)
+
+
+class RateLimiter:
+    """Token buckets for one provider: `rate` requests per `per` seconds plus optional other budgets.
+
+    `budgets` maps further budget names (for example 'tokens') to Budget
+    objects; acquire() takes a cost for each. Callers that cannot be served
+    yet wait in a priority queue; an interactive call that would wait longer
+    than max_wait raises RateLimitExceeded instead, while background calls
+    wait as long as it takes.
+    """
+
+    def __init__(self, rate, per=60.0, burst=None, name='default', budgets=None, store=None, max_wait=None):
+        self.name = name
+        self.budgets = {'requests': Budget(rate, per, burst)}
+        self.budgets.update(budgets or {})
+        self.store = store or MemoryStore()
+        self.max_wait = RATE_LIMIT_MAX_WAIT_SECONDS if max_wait is None else max_wait
+        self._queue = []
+        self._tickets = itertools.count()
+        self._cond = threading.Condition()
+        self._stats = {'acquired': 0, 'waited': 0, 'wait_seconds': 0.0, 'rejected': 0}
+
+    def _costs(self, requests, units):
+        costs = dict(units, requests=requests)
+        return {
+            budget_name: cost for budget_name, cost in costs.items()
+            if cost and budget_name in self.budgets and self.budgets[budget_name].rate
+        }
+
+    def _max_wait(self, timeout):
+        max_wait = math.inf if _unbounded.get() or _priority.get() == 'background' else self.max_wait
+        return max_wait if timeout is None else min(timeout, max_wait)
+
+    def _enqueue(self):
+        ticket = (priority_rank(), next(self._tickets))
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _dequeue(self, ticket):
+        with self._cond:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            self._cond.notify_all()
+
+    def _is_next(self, ticket):
+        with self._cond:
+            return self._queue[0] == ticket
+
+    def _finish(self, waited):
+        with self._cond:
+            self._stats['acquired'] += 1
+            if waited > 0:
+                self._stats['waited'] += 1
+                self._stats['wait_seconds'] += waited
+        return waited
+
+    def _reject(self, retry_after):
+        with self._cond:
+            self._stats['rejected'] += 1
+        logger.warning(f"Rate limit for {self.name} would wait {retry_after:.1f}s, rejecting call")
+        return RateLimitExceeded(self.name, retry_after)
+
+    def acquire(self, requests=1, timeout=None, **units):
+        """Block until the call fits every budget, returning the seconds spent waiting."""
+        costs = self._costs(requests, units)
+        if not costs:
+            return 0.0
+
+        max_wait = self._max_wait(timeout)
+        started = time.monotonic()
+        queued = False
+        ticket = self._enqueue()
+        try:
+            while True:
+                with self._cond:
+                    while self._queue[0] != ticket:
+                        if time.monotonic() - started >= max_wait:
+                            raise self._reject(RATE_LIMIT_POLL_SECONDS)
+                        queued = True
+                        self._cond.wait(RATE_LIMIT_POLL_SECONDS)
+
+                delay = self.store.take(self.name, self.budgets, costs)
+                waited = time.monotonic() - started if queued else 0.0
+                if delay <= 0:
+                    return self._finish(waited)
+                if waited + delay > max_wait:
+                    raise self._reject(delay)
+                queued = True
+                time.sleep(delay)
+        finally:
+            self._dequeue(ticket)
+
+    async def acquire_async(self, requests=1, timeout=None, **units):
+        """Async version of acquire; waits without blocking the event loop."""
+        costs = self._costs(requests, units)
+        if not costs:
+            return 0.0
+
+        max_wait = self._max_wait(timeout)
+        started = time.monotonic()
+        queued = False
+        ticket = self._enqueue()
+        try:
+            while True:
+                while not self._is_next(ticket):
+                    if time.monotonic() - started >= max_wait:
+                        raise self._reject(RATE_LIMIT_POLL_SECONDS)
+                    queued = True
+                    await asyncio.sleep(RATE_LIMIT_POLL_SECONDS)
+
+                delay = self.store.take(self.name, self.budgets, costs)
+                waited = time.monotonic() - started if queued else 0.0
+                if delay <= 0:
+                    return self._finish(waited)
+                if waited + delay > max_wait:
+                    raise self._reject(delay)
+                queued = True
+                await asyncio.sleep(delay)
+        finally:
+            self._dequeue(ticket)
+
+    def stats(self):
+        """Budget sizes, remaining units, queue length and wait counters."""
+        levels = self.store.levels(self.name, self.budgets)
+        with self._cond:
+            stats = dict(self._stats, queued=len(self._queue))
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        stats['budgets'] = {
+            budget_name: dict(budget.describe(), remaining=round(levels[budget_name], 2))
+            for budget_name, budget in self.budgets.items() if budget.rate
+        }
+        return stats
+
+
+def _burst(rate, per=60.0):
+    return max(1.0, rate * RATE_LIMIT_BURST_SECONDS / per)
+
+store = default_store()
+
+limiters = {
+    'youtube': RateLimiter(
+        YOUTUBE_REQUESTS_PER_MINUTE,
+        burst=_burst(YOUTUBE_REQUESTS_PER_MINUTE),
+        name='youtube',
+        budgets={'quota': Budget(YOUTUBE_QUOTA_UNITS_PER_DAY, per=86400.0)},
+        store=store
+    ),
+    'openai': RateLimiter(
+        OPENAI_REQUESTS_PER_MINUTE,
+        burst=_burst(OPENAI_REQUESTS_PER_MINUTE),
+        name='openai',
+        budgets={'tokens': Budget(
+            OPENAI_TOKENS_PER_MINUTE,
+            capacity=max(_burst(OPENAI_TOKENS_PER_MINUTE), OPENAI_MAX_REQUEST_TOKENS)
+        )},
+        store=store
+    )
+}
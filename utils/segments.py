@@ -0,0 +1,146 @@
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+import logging
+
+logger = logging.getLogger(__name__)
+
+# zstandard is optional; zlib from the standard library is always available
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+TRANSCRIPT_CODEC = os.environ.get("TRANSCRIPT_CODEC", "zstd" if zstandard else "zlib")
+
+# Packed layout, little-endian:
+#   header   magic (4s) version (B) codec (B) segment count (I)
+#   starts   float32 x count
+#   durations float32 x count
+#   offsets  uint32 x (count + 1), byte offsets into the text blob
+#   text     UTF-8 segment texts concatenated without separators
+# Everything after the header is compressed with the codec.
+MAGIC = b'YTSG'
+VERSION = 1
+HEADER = struct.Struct('<4sBBI')
+CODECS = {'none': 0, 'zlib': 1, 'zstd': 2}
+CODEC_NAMES = {value: name for name, value in CODECS.items()}
+
+def _compress(codec, payload):
+    if codec == 'zlib':
+        return zlib.compress(payload, 6)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        return zstandard.ZstdCompressor(level=6).compress(payload)
+    return payload
+
+def _decompress(codec, payload):
+    if codec == 'zlib':
+        return zlib.decompress(payload)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd decompression requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return payload
+
+def _array(typecode, values):
+    values = array(typecode, values)
+    if values.itemsize != 4:
+        raise RuntimeError(f"array type {typecode!r} is not 32-bit on this platform")
+    return values
+
+def _to_le_bytes(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _from_le_bytes(values, data):
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+def pack_segments(segments, codec=None):
+    """Pack transcript segments ({'text', 'start', 'duration'} dicts) into compact bytes."""
+    codec = codec or TRANSCRIPT_CODEC
+    starts = _array('f', (segment['start'] for segment in segments))
+    durations = _array('f', (segment['duration'] for segment in segments))
+
+    offsets = _array('I', [0])
+    encoded = []
+    position = 0
+    for segment in segments:
+        text = segment['text'].encode('utf-8')
+        encoded.append(text)
+        position += len(text)
+        offsets.append(position)
+
+    payload = b''.join([_to_le_bytes(starts), _to_le_bytes(durations), _to_le_bytes(offsets)] + encoded)
+    return HEADER.pack(MAGIC, VERSION, CODECS[codec], len(starts)) + _compress(codec, payload)
+
+
+class PackedTranscript:
+    """Read-only view over packed transcript segments.
+
+    Start times, durations and text offsets are kept as parallel arrays, so
+    slicing by time or index only decodes the text that is asked for.
+    """
+
+    def __init__(self, data):
+        magic, version, codec, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a packed transcript")
+
+        payload = _decompress(CODEC_NAMES[codec], bytes(data[HEADER.size:]))
+        self.codec = CODEC_NAMES[codec]
+        self.starts = array('f')
+        self.durations = array('f')
+        self.offsets = array('I')
+
+        width = 4 * count
+        _from_le_bytes(self.starts, payload[:width])
+        _from_le_bytes(self.durations, payload[width:2 * width])
+        _from_le_bytes(self.offsets, payload[2 * width:3 * width + 4])
+        self._text = memoryview(payload)[3 * width + 4:]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def text(self, index):
+        """Return the text of the segment at index."""
+        return str(self._text[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+
+    def segment(self, index):
+        return {
+            'text': self.text(index),
+            'start': round(self.starts[index], 3),
+            'duration': round(self.durations[index], 3)
+        }
+
+    def segments(self, start=0, stop=None):
+        """Return segments by index range as dicts."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [self.segment(index) for index in range(start, stop)]
+
+    def texts(self):
+        return [self.text(index) for index in range(len(self))]
+
+    def full_text(self):
+        """Join all segment texts the same way the plain transcript is built."""
+        return ' '.join(self.texts())
+
+    def index_at(self, seconds):
+        """Return the index of the segment playing at the given time."""
+        return max(0, bisect_right(self.starts, seconds) - 1)
+
+    def between(self, start_seconds, end_seconds):
+        """Return segments that start within [start_seconds, end_seconds)."""
+        return self.segments(bisect_left(self.starts, start_seconds), bisect_left(self.starts, end_seconds))
+
+def unpack_segments(data):
+    """Unpack bytes produced by pack_segments back into segment dicts."""
+    return PackedTranscript(data).segments()
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key becomes the leader and does the work; callers
+    arriving while it is in flight wait on the leader's Future and share its
+    result or exception. Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'leaders': 0, 'followers': 0}
+
+    def begin(self, key):
+        """Return (future, leader) for key. The leader must call finish()."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats['followers'] += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.stats['leaders'] += 1
+            return future, True
+
+    def finish(self, key, future, result=None, exception=None):
+        """Publish the leader's outcome to every waiter and forget the key."""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn, timeout=None):
+        """Run fn() once per concurrent key and return (result, shared)."""
+        future, leader = self.begin(key)
+        if not leader:
+            return future.result(timeout=timeout), True
+
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, future, exception=e)
+            raise
+        self.finish(key, future, result=result)
+        return result, False
+
+    async def wait_async(self, future, timeout=None):
+        """Await a leader's Future from a coroutine without holding a thread."""
+        # shield keeps a timed-out waiter from cancelling the shared Future
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+
+    async def do_async(self, key, fn, timeout=None):
+        """Async version of do: await fn() once per concurrent key and return (result, shared)."""
+        future, leader = self.begin(key)
+        if not leader:
+            return await self.wait_async(future, timeout), True
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            # A cancelled leader still owes its waiters an answer
+            self.finish(key, future, exception=e if isinstance(e, Exception) else Exception('Processing was cancelled'))
+            raise
+        self.finish(key, future, result=result)
+        return result, False
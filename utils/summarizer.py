@@ -1,13 +1,46 @@
 import os
-from openai import OpenAI
+import re
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import logging
+from utils.tokens import count_tokens
+from utils.extractive import extractive_summary
+from utils.ratelimit import limiters, RateLimitExceeded
+from utils.breaker import breakers, CircuitOpen
+from utils.tracing import propagate
 
 logger = logging.getLogger(__name__)
 
 # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
 # do not change this unless explicitly requested by the user
+OPENAI_MODEL = "gpt-4o"
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-openai = OpenAI(api_key=OPENAI_API_KEY)
+
+# The clients are built on first use, which keeps the openai package (most
+# of the app's import time) out of worker start-up
+openai = None
+async_openai = None
+_client_lock = threading.Lock()
+
+def openai_client():
+    global openai
+    if openai is None:
+        with _client_lock:
+            if openai is None:
+                from openai import OpenAI
+                openai = OpenAI(api_key=OPENAI_API_KEY)
+    return openai
+
+def async_openai_client():
+    global async_openai
+    if async_openai is None:
+        with _client_lock:
+            if async_openai is None:
+                from openai import AsyncOpenAI
+                async_openai = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return async_openai
 
 SUMMARY_LENGTH_TOKENS = {
     'short': 250,
@@ -15,24 +48,434 @@ SUMMARY_LENGTH_TOKENS = {
     'long': 1000
 }
 
-def generate_summary(text, length='medium'):
-    """Generate a summary of the given text using OpenAI's GPT model."""
+# Transcripts above SUMMARY_SINGLE_PASS_TOKENS are summarized map-reduce
+# style: split into chunks of at most SUMMARY_CHUNK_TOKENS, summarized in
+# parallel by up to SUMMARY_MAX_WORKERS requests, then combined.
+SUMMARY_SINGLE_PASS_TOKENS = int(os.environ.get("SUMMARY_SINGLE_PASS_TOKENS", 12000))
+SUMMARY_CHUNK_TOKENS = int(os.environ.get("SUMMARY_CHUNK_TOKENS", 6000))
+SUMMARY_MAX_WORKERS = int(os.environ.get("SUMMARY_MAX_WORKERS", 4))
+CHUNK_SUMMARY_TOKENS = 400
+
+# Backend routing. SUMMARY_BACKEND is 'openai', 'extractive' (local, no
+# network) or 'auto'. In auto mode transcripts above
+# SUMMARY_LOCAL_ABOVE_TOKENS go straight to the local engine, and OpenAI
+# gets SUMMARY_LATENCY_BUDGET_SECONDS in total before falling back to it
+# (0 disables either rule). SUMMARY_FALLBACK_BACKEND, if set, is used
+# whenever the primary backend fails.
+SUMMARY_BACKEND = os.environ.get("SUMMARY_BACKEND", "openai")
+SUMMARY_FALLBACK_BACKEND = os.environ.get("SUMMARY_FALLBACK_BACKEND", "")
+SUMMARY_LOCAL_ABOVE_TOKENS = int(os.environ.get("SUMMARY_LOCAL_ABOVE_TOKENS", 0))
+SUMMARY_LATENCY_BUDGET_SECONDS = float(os.environ.get("SUMMARY_LATENCY_BUDGET_SECONDS", 0))
+
+# Stored summaries are keyed by the summarizer that wrote them and this
+# prompt version. Bump it when the prompts or transcript preprocessing
+# change, so stored videos are summarized again instead of reused.
+SUMMARY_PROMPT_VERSION = os.environ.get("SUMMARY_PROMPT_VERSION", "1")
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+def _split_oversized(piece, max_tokens):
+    """Split a single piece that exceeds max_tokens on word boundaries."""
+    words = piece.split()
+    tokens_per_word = count_tokens(piece) / max(1, len(words))
+    words_per_part = max(1, int(max_tokens / tokens_per_word))
+    return [' '.join(words[i:i + words_per_part]) for i in range(0, len(words), words_per_part)]
+
+def chunk_transcript(transcript, max_tokens=None):
+    """Split a transcript into chunks of at most max_tokens tokens.
+
+    ``transcript`` may be a list of caption segment texts, in which case
+    chunks break only between segments, or a plain string, which is split
+    on sentence boundaries. Pieces larger than a chunk fall back to word
+    boundaries.
+    """
+    max_tokens = max_tokens or SUMMARY_CHUNK_TOKENS
+    pieces = transcript if isinstance(transcript, list) else SENTENCE_BOUNDARY.split(transcript)
+
+    chunks, current, current_tokens = [], [], 0
+    for piece in pieces:
+        piece = piece.strip()
+        if not piece:
+            continue
+
+        piece_tokens = count_tokens(piece)
+        if piece_tokens > max_tokens:
+            parts = _split_oversized(piece, max_tokens)
+        else:
+            parts = [piece]
+
+        for part in parts:
+            part_tokens = count_tokens(part)
+            if current and current_tokens + part_tokens > max_tokens:
+                chunks.append(' '.join(current))
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += part_tokens
+
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+def _timeout_options(deadline):
+    """Per-request timeout for the time left before deadline (a time.monotonic() value)."""
+    if deadline is None:
+        return {}
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("Summary latency budget exhausted")
+    return {'timeout': remaining}
+
+def _request(system_prompt, text, max_tokens, deadline=None, **options):
+    """Keyword arguments for a gpt-4o chat completion request."""
+    return dict(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": text}
+        ],
+        max_tokens=max_tokens,
+        **options,
+        **_timeout_options(deadline)
+    )
+
+def _budget(system_prompt, text, max_tokens, deadline=None):
+    """Rate limiter arguments for a request: its token cost and how long it may queue."""
+    budget = {'tokens': count_tokens(system_prompt) + count_tokens(text) + max_tokens}
+    if deadline is not None:
+        budget['timeout'] = max(0.0, deadline - time.monotonic())
+    return budget
+
+def _complete(system_prompt, text, max_tokens, deadline=None):
+    request = _request(system_prompt, text, max_tokens, deadline)
+    # An open breaker fails before the call queues for rate limit budget
+    with breakers['openai'].guard():
+        limiters['openai'].acquire(**_budget(system_prompt, text, max_tokens, deadline))
+        response = openai_client().chat.completions.create(**request)
+    return response.choices[0].message.content
+
+async def _complete_async(system_prompt, text, max_tokens, deadline=None):
+    request = _request(system_prompt, text, max_tokens, deadline)
+    with breakers['openai'].guard():
+        await limiters['openai'].acquire_async(**_budget(system_prompt, text, max_tokens, deadline))
+        response = await async_openai_client().chat.completions.create(**request)
+    return response.choices[0].message.content
+
+def _chunk_prompt(index, total):
+    return (f"You are a skilled summarizer. This is part {index} of {total} of a video transcript. "
+            "Write concise notes covering its main points and key takeaways.")
+
+def _summarize_chunk(chunk, index, total, deadline=None):
+    return _complete(_chunk_prompt(index, total), chunk, CHUNK_SUMMARY_TOKENS, deadline)
+
+def _map_chunks(chunks, deadline=None):
+    """Summarize chunks in parallel with bounded concurrency, preserving order."""
+    total = len(chunks)
+    workers = max(1, min(SUMMARY_MAX_WORKERS, total))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summarize') as executor:
+        # Each chunk keeps the caller's trace and rate limit priority
+        futures = [
+            executor.submit(propagate(_summarize_chunk), chunk, index, total, deadline)
+            for index, chunk in enumerate(chunks, 1)
+        ]
+        return [future.result() for future in futures]
+
+async def _map_chunks_async(chunks, deadline=None):
+    """Summarize chunks concurrently, at most SUMMARY_MAX_WORKERS requests at a time, preserving order."""
+    total = len(chunks)
+    semaphore = asyncio.Semaphore(max(1, SUMMARY_MAX_WORKERS))
+
+    async def summarize(chunk, index):
+        async with semaphore:
+            return await _complete_async(_chunk_prompt(index, total), chunk, CHUNK_SUMMARY_TOKENS, deadline)
+
+    tasks = [asyncio.ensure_future(summarize(chunk, index)) for index, chunk in enumerate(chunks, 1)]
     try:
-        max_tokens = SUMMARY_LENGTH_TOKENS.get(length, 500)
-        length_prompt = f"Create a {length} summary"
-
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are a skilled summarizer. {length_prompt} of the following transcript. Focus on the main points and key takeaways."
-                },
-                {"role": "user", "content": text}
-            ],
-            max_tokens=max_tokens
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        logger.error(f"Error generating summary: {str(e)}")
-        raise Exception("Failed to generate summary. Please try again later.")
\ No newline at end of file
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+def _total_tokens(text):
+    if isinstance(text, str):
+        return count_tokens(text)
+    return sum(count_tokens(piece) for piece in text)
+
+def _prepare_summary(text, length, deadline=None):
+    """Return the system prompt, user text and token limit for the final summary request.
+
+    ``text`` is the transcript as a string or as a list of caption segment
+    texts. Long transcripts are summarized chunk by chunk first, then the
+    partial summaries are reduced until they fit in a single request.
+    """
+    max_tokens = SUMMARY_LENGTH_TOKENS.get(length, 500)
+    reduced = False
+    tokens = _total_tokens(text)
+    while tokens > SUMMARY_SINGLE_PASS_TOKENS:
+        chunks = chunk_transcript(text)
+        logger.debug(f"Summarizing {tokens} tokens in {len(chunks)} chunks")
+        text = _map_chunks(chunks, deadline)
+        reduced = True
+
+        reduced_tokens = _total_tokens(text)
+        if reduced_tokens >= tokens:
+            break
+        tokens = reduced_tokens
+
+    return _final_prompt(length, reduced), _join(text, reduced), max_tokens
+
+async def _prepare_summary_async(text, length, deadline=None):
+    """Async version of _prepare_summary."""
+    max_tokens = SUMMARY_LENGTH_TOKENS.get(length, 500)
+    reduced = False
+    tokens = _total_tokens(text)
+    while tokens > SUMMARY_SINGLE_PASS_TOKENS:
+        chunks = chunk_transcript(text)
+        logger.debug(f"Summarizing {tokens} tokens in {len(chunks)} chunks")
+        text = await _map_chunks_async(chunks, deadline)
+        reduced = True
+
+        reduced_tokens = _total_tokens(text)
+        if reduced_tokens >= tokens:
+            break
+        tokens = reduced_tokens
+
+    return _final_prompt(length, reduced), _join(text, reduced), max_tokens
+
+def _final_prompt(length, reduced):
+    length_prompt = f"Create a {length} summary"
+    if reduced:
+        return f"You are a skilled summarizer. {length_prompt} of the video from the following notes on consecutive parts of its transcript. Focus on the main points and key takeaways."
+    return f"You are a skilled summarizer. {length_prompt} of the following transcript. Focus on the main points and key takeaways."
+
+ANSWER_TOKENS = 300
+ANSWER_PROMPT = ("You answer questions about a video using only the transcript excerpts below, each marked with "
+                 "its [mm:ss] start time. Cite the times you rely on. If the excerpts do not contain the answer, "
+                 "say so.")
+
+def _answer_text(question, excerpts):
+    return '\n\n'.join(excerpts) + f"\n\nQuestion: {question}"
+
+def _join(text, reduced):
+    if isinstance(text, str):
+        return text
+    return ('\n\n' if reduced else ' ').join(text)
+
+
+class Summary(str):
+    """Summary text, with the model that wrote it and whether a fallback backend answered."""
+
+    model = None
+    fallback = False
+
+    def __new__(cls, text, model=None, fallback=False):
+        summary = super().__new__(cls, text)
+        summary.model = model
+        summary.fallback = fallback
+        return summary
+
+
+class OpenAIBackend:
+    """Abstractive summaries from gpt-4o, map-reduced for long transcripts."""
+
+    name = 'openai'
+    model = OPENAI_MODEL
+
+    def summarize(self, text, length, deadline=None):
+        system_prompt, text, max_tokens = _prepare_summary(text, length, deadline)
+        return _complete(system_prompt, text, max_tokens, deadline)
+
+    def stream(self, text, length, deadline=None):
+        system_prompt, text, max_tokens = _prepare_summary(text, length, deadline)
+        request = _request(system_prompt, text, max_tokens, deadline, stream=True)
+        with breakers['openai'].guard():
+            limiters['openai'].acquire(**_budget(system_prompt, text, max_tokens, deadline))
+            for chunk in openai_client().chat.completions.create(**request):
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    async def summarize_async(self, text, length, deadline=None):
+        system_prompt, text, max_tokens = await _prepare_summary_async(text, length, deadline)
+        return await _complete_async(system_prompt, text, max_tokens, deadline)
+
+    def answer(self, question, excerpts, deadline=None):
+        return _complete(ANSWER_PROMPT, _answer_text(question, excerpts), ANSWER_TOKENS, deadline)
+
+    async def stream_async(self, text, length, deadline=None):
+        system_prompt, text, max_tokens = await _prepare_summary_async(text, length, deadline)
+        request = _request(system_prompt, text, max_tokens, deadline, stream=True)
+        with breakers['openai'].guard():
+            await limiters['openai'].acquire_async(**_budget(system_prompt, text, max_tokens, deadline))
+            async for chunk in await async_openai_client().chat.completions.create(**request):
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+
+class ExtractiveBackend:
+    """Local extractive summaries (see utils.extractive); CPU only, no network."""
+
+    name = 'extractive'
+    model = 'extractive'
+
+    def summarize(self, text, length, deadline=None):
+        return extractive_summary(text, SUMMARY_LENGTH_TOKENS.get(length, 500))
+
+    def stream(self, text, length, deadline=None):
+        yield self.summarize(text, length)
+
+    def answer(self, question, excerpts, deadline=None):
+        # Excerpts come best match first; without a model the best one is the answer
+        return excerpts[0] if excerpts else ''
+
+    async def summarize_async(self, text, length, deadline=None):
+        # CPU-bound ranking stays off the event loop
+        return await asyncio.to_thread(self.summarize, text, length)
+
+    async def stream_async(self, text, length, deadline=None):
+        yield await self.summarize_async(text, length)
+
+BACKENDS = {backend.name: backend for backend in (OpenAIBackend(), ExtractiveBackend())}
+
+def summary_models():
+    """Models whose stored summaries the configured routing would have written, primary first.
+
+    Summaries a fallback backend wrote after the primary one failed are
+    stored with their own model and marked, and are not among these.
+    """
+    if SUMMARY_BACKEND == 'extractive':
+        return ('extractive',)
+    if SUMMARY_BACKEND == 'auto' and SUMMARY_LOCAL_ABOVE_TOKENS:
+        return (OPENAI_MODEL, 'extractive')
+    return (OPENAI_MODEL,)
+
+def summary_source(summary):
+    """(model, fallback) of a summary; plain strings count as the primary model's."""
+    return getattr(summary, 'model', None) or summary_models()[0], getattr(summary, 'fallback', False)
+
+def join_summary(parts):
+    """Join streamed deltas into a Summary carrying the model that sent them."""
+    model, fallback = summary_source(parts[0]) if parts else (None, False)
+    return Summary(''.join(parts), model, fallback)
+
+_stats_lock = threading.Lock()
+backend_stats = {'requests': {name: 0 for name in BACKENDS}, 'fallbacks': 0}
+
+def route(text):
+    """Return (backend names to try in order, deadline) for a transcript."""
+    deadline = None
+    if SUMMARY_BACKEND == 'auto':
+        if SUMMARY_LOCAL_ABOVE_TOKENS and _total_tokens(text) > SUMMARY_LOCAL_ABOVE_TOKENS:
+            return ['extractive'], None
+        names = ['openai', 'extractive']
+        if SUMMARY_LATENCY_BUDGET_SECONDS:
+            deadline = time.monotonic() + SUMMARY_LATENCY_BUDGET_SECONDS
+    else:
+        names = [SUMMARY_BACKEND]
+        if SUMMARY_FALLBACK_BACKEND and SUMMARY_FALLBACK_BACKEND != SUMMARY_BACKEND:
+            names.append(SUMMARY_FALLBACK_BACKEND)
+    return names, deadline
+
+def _record(name, fallback):
+    with _stats_lock:
+        backend_stats['requests'][name] += 1
+        if fallback:
+            backend_stats['fallbacks'] += 1
+
+def _raise_failure(error):
+    # Running out of rate limit budget and open circuits are reported as such,
+    # so callers can ask clients to retry later or serve a partial result
+    if isinstance(error, (RateLimitExceeded, CircuitOpen)):
+        raise error
+    raise Exception("Failed to generate summary. Please try again later.")
+
+def generate_summary(text, length='medium'):
+    """Generate a summary of the given text with the configured backend, falling back if it fails.
+
+    Returns a Summary recording which backend's model answered.
+    """
+    names, deadline = route(text)
+    error = None
+    for attempt, name in enumerate(names):
+        try:
+            summary = BACKENDS[name].summarize(text, length, deadline)
+            _record(name, attempt > 0)
+            return Summary(summary, BACKENDS[name].model, attempt > 0)
+        except Exception as e:
+            logger.error(f"Error generating summary with {name}: {str(e)}")
+            error = e
+    _raise_failure(error)
+
+def generate_answer(question, excerpts):
+    """Answer a question from transcript excerpts (best match first) with the configured backend.
+
+    Falls back like generate_summary. Excerpts are sent in the order given.
+    """
+    names, deadline = route(excerpts)
+    error = None
+    for attempt, name in enumerate(names):
+        try:
+            answer = BACKENDS[name].answer(question, excerpts, deadline)
+            _record(name, attempt > 0)
+            return answer
+        except Exception as e:
+            logger.error(f"Error generating answer with {name}: {str(e)}")
+            error = e
+    if isinstance(error, (RateLimitExceeded, CircuitOpen)):
+        raise error
+    raise Exception("Failed to answer the question. Please try again later.")
+
+def stream_summary(text, length='medium'):
+    """Generate a summary of the given text, yielding content deltas as the backend produces them.
+
+    Falls back to the next backend only if the previous one failed before
+    sending anything, so every delta is a Summary from the same backend.
+    """
+    names, deadline = route(text)
+    error = None
+    for attempt, name in enumerate(names):
+        sent = False
+        try:
+            for delta in BACKENDS[name].stream(text, length, deadline):
+                sent = True
+                yield Summary(delta, BACKENDS[name].model, attempt > 0)
+            _record(name, attempt > 0)
+            return
+        except Exception as e:
+            logger.error(f"Error generating summary with {name}: {str(e)}")
+            error = e
+            if sent:
+                break
+    _raise_failure(error)
+
+async def generate_summary_async(text, length='medium'):
+    """Async version of generate_summary."""
+    names, deadline = route(text)
+    error = None
+    for attempt, name in enumerate(names):
+        try:
+            summary = await BACKENDS[name].summarize_async(text, length, deadline)
+            _record(name, attempt > 0)
+            return Summary(summary, BACKENDS[name].model, attempt > 0)
+        except Exception as e:
+            logger.error(f"Error generating summary with {name}: {str(e)}")
+            error = e
+    _raise_failure(error)
+
+async def stream_summary_async(text, length='medium'):
+    """Async version of stream_summary."""
+    names, deadline = route(text)
+    error = None
+    for attempt, name in enumerate(names):
+        sent = False
+        try:
+            async for delta in BACKENDS[name].stream_async(text, length, deadline):
+                sent = True
+                yield Summary(delta, BACKENDS[name].model, attempt > 0)
+            _record(name, attempt > 0)
+            return
+        except Exception as e:
+            logger.error(f"Error generating summary with {name}: {str(e)}")
+            error = e
+            if sent:
+                break
+    _raise_failure(error)
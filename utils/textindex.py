@@ -0,0 +1,93 @@
+import math
+import re
+import threading
+from collections import defaultdict, Counter
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+def tokenize(text):
+    """Lowercase word tokens of text, without stopwords."""
+    return [token for token in TOKEN_PATTERN.findall((text or '').lower()) if token not in STOPWORDS]
+
+
+class InvertedIndex:
+    """In-process inverted index with field-weighted BM25 ranking.
+
+    Used when the database has no native full-text search. Documents are
+    dicts of field name to text; `field_weights` scales each field's term
+    frequencies before scoring.
+    """
+
+    def __init__(self, field_weights, k1=1.2, b=0.75):
+        self.field_weights = field_weights
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(dict)
+        self._lengths = {}
+        self._doc_terms = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def _remove(self, doc_id):
+        if self._lengths.pop(doc_id, None) is None:
+            return
+        for term in self._doc_terms.pop(doc_id):
+            del self._postings[term][doc_id]
+            if not self._postings[term]:
+                del self._postings[term]
+
+    def add(self, doc_id, fields):
+        """Index (or re-index) a document."""
+        frequencies = Counter()
+        length = 0
+        for field, text in fields.items():
+            weight = self.field_weights.get(field, 1.0)
+            tokens = tokenize(text)
+            length += len(tokens)
+            for token in tokens:
+                frequencies[token] += weight
+
+        with self._lock:
+            self._remove(doc_id)
+            self._lengths[doc_id] = length
+            self._doc_terms[doc_id] = list(frequencies)
+            for term, frequency in frequencies.items():
+                self._postings[term][doc_id] = frequency
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def search(self, query, limit=10, offset=0):
+        """Return (total matches, [(doc_id, score), ...]) for documents containing every query term."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return 0, []
+
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            if not all(postings):
+                return 0, []
+
+            candidates = set.intersection(*(set(posting) for posting in postings))
+            documents = len(self._lengths)
+            average_length = sum(self._lengths.values()) / documents or 1
+
+            scores = {}
+            for doc_id in candidates:
+                length_norm = 1 - self.b + self.b * self._lengths[doc_id] / average_length
+                score = 0.0
+                for posting in postings:
+                    idf = math.log(1 + (documents - len(posting) + 0.5) / (len(posting) + 0.5))
+                    frequency = posting[doc_id]
+                    score += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+                scores[doc_id] = score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return len(ranked), ranked[offset:offset + limit]
@@ -0,0 +1,21 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# tiktoken is optional; without it token counts are estimated from
+# character length, which is close enough for budgeting and chunking.
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+CHARS_PER_TOKEN = 4
+
+def count_tokens(text):
+    """Count (or estimate) the number of model tokens in text."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
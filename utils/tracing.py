@@ -0,0 +1,102 @@
+import os
+import time
+import threading
+import contextvars
+import logging
+from contextlib import contextmanager
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this are logged with a per-stage breakdown (0 disables)
+SLOW_REQUEST_SECONDS = float(os.environ.get("SLOW_REQUEST_SECONDS", 5))
+
+stage_seconds = registry.histogram(
+    'ytt_stage_duration_seconds',
+    'Time spent in each pipeline stage.',
+    ['stage']
+)
+stage_errors = registry.counter(
+    'ytt_stage_errors_total',
+    'Pipeline stages that raised an exception.',
+    ['stage']
+)
+
+_current = contextvars.ContextVar('trace', default=None)
+_listeners = []
+
+
+class Trace:
+    """Stage timings for one request or job."""
+
+    def __init__(self, name, **tags):
+        self.name = name
+        self.tags = tags
+        self.started = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, error=False):
+        with self._lock:
+            self.spans.append((stage, seconds, error))
+
+    def breakdown(self):
+        with self._lock:
+            spans = list(self.spans)
+        return ' '.join(f"{stage}={seconds:.3f}s{'(error)' if error else ''}" for stage, seconds, error in spans)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+        if SLOW_REQUEST_SECONDS and self.duration >= SLOW_REQUEST_SECONDS:
+            tags = ' '.join(f"{key}={value}" for key, value in self.tags.items())
+            logger.warning(f"Slow {self.name} took {self.duration:.3f}s {tags} [{self.breakdown()}]")
+        for listener in list(_listeners):
+            try:
+                listener(self)
+            except Exception as e:
+                logger.error(f"Error in trace listener: {str(e)}")
+
+def add_listener(listener):
+    """Call listener(trace) for every finished trace (used by the load benchmark)."""
+    _listeners.append(listener)
+
+def remove_listener(listener):
+    _listeners.remove(listener)
+
+def current_trace():
+    return _current.get()
+
+@contextmanager
+def trace(name, **tags):
+    """Collect the spans recorded inside the block into one Trace."""
+    request_trace = Trace(name, **tags)
+    token = _current.set(request_trace)
+    try:
+        yield request_trace
+    finally:
+        _current.reset(token)
+        request_trace.finish()
+
+@contextmanager
+def span(stage):
+    """Time a pipeline stage, recording it in the stage histogram and the current trace."""
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        stage_seconds.observe(seconds, stage=stage)
+        request_trace = _current.get()
+        if request_trace is not None:
+            request_trace.add(stage, seconds, error)
+
+def propagate(fn):
+    """Wrap fn to run in a copy of the caller's context, so worker threads see its trace."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
@@ -0,0 +1,82 @@
+import json
+import zlib
+
+# Export formats served by /videos/<id>/transcript.<format>
+EXPORT_MIMETYPES = {
+    'txt': 'text/plain; charset=utf-8',
+    'srt': 'application/x-subrip; charset=utf-8',
+    'vtt': 'text/vtt; charset=utf-8',
+    'json': 'application/json'
+}
+
+CHUNK_SIZE = 64 * 1024
+
+def _timestamp(seconds, separator):
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+def _txt(packed):
+    for index in range(len(packed)):
+        yield (' ' if index else '') + packed.text(index)
+
+def _cues(packed, separator):
+    for index in range(len(packed)):
+        start = packed.starts[index]
+        end = start + packed.durations[index]
+        yield index, f"{_timestamp(start, separator)} --> {_timestamp(end, separator)}\n{packed.text(index)}\n\n"
+
+def _srt(packed):
+    for index, cue in _cues(packed, ','):
+        yield f"{index + 1}\n{cue}"
+
+def _vtt(packed):
+    yield "WEBVTT\n\n"
+    for _, cue in _cues(packed, '.'):
+        yield cue
+
+def _json(packed, video_id):
+    yield '{"video_id": ' + json.dumps(video_id) + ', "segments": ['
+    for index in range(len(packed)):
+        yield (', ' if index else '') + json.dumps(packed.segment(index))
+    yield ']}'
+
+def _buffered(pieces, size=CHUNK_SIZE):
+    """Join small text pieces into UTF-8 chunks of roughly `size` bytes."""
+    buffer = []
+    length = 0
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+def export_chunks(packed, export_format, video_id=None):
+    """Yield a PackedTranscript rendered in export_format as byte chunks."""
+    if export_format == 'txt':
+        pieces = _txt(packed)
+    elif export_format == 'srt':
+        pieces = _srt(packed)
+    elif export_format == 'vtt':
+        pieces = _vtt(packed)
+    elif export_format == 'json':
+        pieces = _json(packed, video_id)
+    else:
+        raise ValueError(f"Unsupported transcript format: {export_format}")
+    return _buffered(pieces)
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of byte chunks into a gzip stream."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,69 +1,365 @@
-from youtube_transcript_api import YouTubeTranscriptApi
 from urllib.parse import urlparse, parse_qs
 import os
-import requests
+import re
+import asyncio
 import logging
+import requests
+from utils.http_client import get_json, get_json_async
+from utils.microbatch import MicroBatcher
+from utils.cache import ResultCache
+from utils.segments import pack_segments, unpack_segments
+from utils.ratelimit import limiters, priority_rank, RateLimitExceeded
+from utils.breaker import breakers, CircuitOpen
 
 logger = logging.getLogger(__name__)
 
 YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
+YOUTUBE_API_BASE_URL = os.environ.get("YOUTUBE_API_BASE_URL", "https://www.googleapis.com/youtube/v3")
 
-def extract_video_id(url):
-    """Extract the video ID from a YouTube URL."""
+# The videos endpoint accepts up to 50 IDs per call. Concurrent lookups
+# arriving within YOUTUBE_BATCH_WINDOW_MS are merged into one request;
+# 0 sends every lookup on its own.
+VIDEOS_PER_REQUEST = 50
+PLAYLIST_PAGE_SIZE = 50
+YOUTUBE_BATCH_WINDOW_MS = float(os.environ.get("YOUTUBE_BATCH_WINDOW_MS", 10))
+
+# Transcript language settings. TRANSCRIPT_LANGUAGES is the preference list
+# used when a request does not send its own. A video's caption track list
+# is cached for TRANSCRIPT_TRACKS_TTL_SECONDS (its caption URLs are signed
+# and expire); fetched segments are cached per track in packed form, evicted
+# least recently used once they exceed TRANSCRIPT_CACHE_MAX_BYTES.
+TRANSCRIPT_LANGUAGES = tuple(
+    code.strip() for code in os.environ.get("TRANSCRIPT_LANGUAGES", "en").split(',') if code.strip()
+) or ('en',)
+TRANSCRIPT_MAX_LANGUAGES = 5
+TRANSCRIPT_TRACKS_CACHE_ENTRIES = int(os.environ.get("TRANSCRIPT_TRACKS_CACHE_ENTRIES", 1024))
+TRANSCRIPT_TRACKS_TTL_SECONDS = int(os.environ.get("TRANSCRIPT_TRACKS_TTL_SECONDS", 1800))
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.environ.get("TRANSCRIPT_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+TRANSCRIPT_CACHE_TTL_SECONDS = int(os.environ.get("TRANSCRIPT_CACHE_TTL_SECONDS", 3600))
+
+LANGUAGE_CODE = re.compile(r'^[A-Za-z]{2,3}(-[A-Za-z0-9]{2,8})?$')
+
+def parse_youtube_url(url):
+    """Classify a YouTube URL as (kind, value).
+
+    kind is 'video' (value is the video ID), 'playlist' (the playlist ID),
+    'channel' (a UC… channel ID), 'handle' ('@name') or 'user' (a legacy
+    username). Watch URLs that also carry a playlist are videos.
+    """
     parsed_url = urlparse(url)
 
     if parsed_url.hostname in ('youtu.be', 'www.youtu.be'):
-        return parsed_url.path[1:]
+        return 'video', parsed_url.path[1:]
 
-    if parsed_url.hostname in ('youtube.com', 'www.youtube.com'):
+    if parsed_url.hostname in ('youtube.com', 'www.youtube.com', 'm.youtube.com'):
+        parts = parsed_url.path.split('/')
         if parsed_url.path == '/watch':
-            return parse_qs(parsed_url.query)['v'][0]
-        elif parsed_url.path.startswith('/embed/'):
-            return parsed_url.path.split('/')[2]
-        elif parsed_url.path.startswith('/v/'):
-            return parsed_url.path.split('/')[2]
+            return 'video', parse_qs(parsed_url.query)['v'][0]
+        elif parts[1] in ('embed', 'v', 'shorts', 'live'):
+            return 'video', parts[2]
+        elif parsed_url.path == '/playlist':
+            return 'playlist', parse_qs(parsed_url.query)['list'][0]
+        elif parts[1] == 'channel' and parts[2]:
+            return 'channel', parts[2]
+        elif parts[1] == 'user' and parts[2]:
+            return 'user', parts[2]
+        elif parts[1].startswith('@') and len(parts[1]) > 1:
+            return 'handle', parts[1]
 
     raise ValueError("Invalid YouTube URL format")
 
+def extract_video_id(url):
+    """Extract the video ID from a YouTube URL."""
+    kind, value = parse_youtube_url(url)
+    if kind != 'video':
+        raise ValueError("This is a playlist or channel URL, not a video")
+    return value
+
+def _parse_video(video_data):
+    return {
+        'title': video_data['snippet']['title'],
+        'duration': video_data['contentDetails']['duration'],
+        'thumbnail': video_data['snippet']['thumbnails']['high']['url']
+    }
+
+def _api_get(resource, **params):
+    """One YouTube Data API list call, costing one quota unit whatever the number of results."""
+    with breakers['youtube_data'].guard():
+        limiters['youtube'].acquire(quota=1)
+        return get_json(f"{YOUTUBE_API_BASE_URL}/{resource}", params={'key': YOUTUBE_API_KEY, **params},
+                        endpoint=f'youtube.{resource}')
+
+def _list_videos(video_ids):
+    """Yield the videos resources for many IDs, 50 per call; IDs YouTube does not know are left out."""
+    video_ids = list(dict.fromkeys(video_ids))
+    for start in range(0, len(video_ids), VIDEOS_PER_REQUEST):
+        data = _api_get('videos', id=','.join(video_ids[start:start + VIDEOS_PER_REQUEST]), part='snippet,contentDetails')
+        yield from data.get('items', [])
+
+def get_videos_info(video_ids):
+    """Get video information for many video IDs, 50 per YouTube Data API call.
+
+    Returns a dict keyed by video ID; IDs that YouTube does not know about
+    are left out.
+    """
+    return {video_data['id']: _parse_video(video_data) for video_data in _list_videos(video_ids)}
+
+def get_videos_etags(video_ids):
+    """ETags of the videos' metadata by video ID, which change when the title, description or duration do."""
+    return {video_data['id']: video_data['etag'] for video_data in _list_videos(video_ids)}
+
+def get_uploads_playlist(kind, value):
+    """Return the ID of the playlist holding a channel's uploads.
+
+    kind and value are as returned by parse_youtube_url for a channel,
+    handle or user URL.
+    """
+    lookup = {'channel': 'id', 'handle': 'forHandle', 'user': 'forUsername'}[kind]
+    items = _api_get('channels', part='contentDetails', **{lookup: value}).get('items', [])
+    if not items:
+        raise ValueError("Channel not found")
+    return items[0]['contentDetails']['relatedPlaylists']['uploads']
+
+def list_playlist_page(playlist_id, page_token=None):
+    """One page of a playlist: (video IDs in playlist order, next page token or None)."""
+    params = {'playlistId': playlist_id, 'part': 'contentDetails', 'maxResults': PLAYLIST_PAGE_SIZE}
+    if page_token:
+        params['pageToken'] = page_token
+    data = _api_get('playlistItems', **params)
+    video_ids = [item['contentDetails']['videoId'] for item in data.get('items', [])]
+    return video_ids, data.get('nextPageToken')
+
+video_info_batcher = MicroBatcher(
+    get_videos_info,
+    max_batch=VIDEOS_PER_REQUEST,
+    window=YOUTUBE_BATCH_WINDOW_MS / 1000,
+    name='video-info',
+    # A batch holding an interactive lookup is not queued behind background work
+    context_order=priority_rank
+)
+
 def get_video_info(url):
     """Get video information using YouTube Data API."""
     try:
         video_id = extract_video_id(url)
-        api_url = f"https://www.googleapis.com/youtube/v3/videos"
+        if YOUTUBE_BATCH_WINDOW_MS > 0:
+            video_info = video_info_batcher.get(video_id)
+        else:
+            video_info = get_videos_info([video_id]).get(video_id)
+
+        if video_info is None:
+            raise ValueError("Video not found")
+        return video_info
+
+    except (RateLimitExceeded, CircuitOpen):
+        raise
+    except Exception as e:
+        logger.error(f"Error getting video info: {str(e)}")
+        raise Exception("Failed to get video information")
+
+async def get_videos_info_async(video_ids):
+    """Async version of get_videos_info."""
+    video_ids = list(dict.fromkeys(video_ids))
+    api_url = f"{YOUTUBE_API_BASE_URL}/videos"
+    videos = {}
+
+    for start in range(0, len(video_ids), VIDEOS_PER_REQUEST):
         params = {
             'key': YOUTUBE_API_KEY,
-            'id': video_id,
+            'id': ','.join(video_ids[start:start + VIDEOS_PER_REQUEST]),
             'part': 'snippet,contentDetails'
         }
+        with breakers['youtube_data'].guard():
+            await limiters['youtube'].acquire_async(quota=1)
+            data = await get_json_async(api_url, params=params, endpoint='youtube.videos')
+        for video_data in data.get('items', []):
+            videos[video_data['id']] = _parse_video(video_data)
 
-        response = requests.get(api_url, params=params)
-        response.raise_for_status()
-        data = response.json()
+    return videos
 
-        if not data['items']:
+async def get_video_info_async(url):
+    """Get video information using YouTube Data API without blocking the event loop."""
+    try:
+        video_id = extract_video_id(url)
+        video_info = (await get_videos_info_async([video_id])).get(video_id)
+        if video_info is None:
             raise ValueError("Video not found")
+        return video_info
 
-        video_data = data['items'][0]
-        return {
-            'title': video_data['snippet']['title'],
-            'duration': video_data['contentDetails']['duration'],
-            'thumbnail': video_data['snippet']['thumbnails']['high']['url']
-        }
-
+    except (RateLimitExceeded, CircuitOpen):
+        raise
     except Exception as e:
         logger.error(f"Error getting video info: {str(e)}")
         raise Exception("Failed to get video information")
 
-def get_video_transcript(url):
-    """Get the transcript of a YouTube video."""
+def parse_languages(value=None):
+    """Normalize a language preference ('de,en', a list, or None) to a tuple of codes."""
+    if not value:
+        return TRANSCRIPT_LANGUAGES
+    if isinstance(value, str):
+        value = value.split(',')
+    languages = tuple(dict.fromkeys(code.strip() for code in value if code and code.strip()))
+    for code in languages:
+        if not LANGUAGE_CODE.match(code):
+            raise ValueError(f"Invalid language code: {code}")
+    if len(languages) > TRANSCRIPT_MAX_LANGUAGES:
+        raise ValueError(f"At most {TRANSCRIPT_MAX_LANGUAGES} languages can be requested")
+    return languages or TRANSCRIPT_LANGUAGES
+
+def language_key(languages):
+    """Storage key for a language preference; None for the default preference."""
+    languages = parse_languages(languages)
+    return None if languages == TRANSCRIPT_LANGUAGES else ','.join(languages)
+
+# One pooled session for every watch-page and caption request
+transcript_session = requests.Session()
+
+# youtube_transcript_api is imported on first use to keep it out of worker start-up
+YouTubeTranscriptApi = None
+
+def transcript_api():
+    global YouTubeTranscriptApi
+    if YouTubeTranscriptApi is None:
+        from youtube_transcript_api import YouTubeTranscriptApi
+    return YouTubeTranscriptApi(http_client=transcript_session)
+
+transcript_lists = ResultCache(
+    max_entries=TRANSCRIPT_TRACKS_CACHE_ENTRIES,
+    ttl_seconds=TRANSCRIPT_TRACKS_TTL_SECONDS
+)
+transcript_segments = ResultCache(
+    max_entries=TRANSCRIPT_TRACKS_CACHE_ENTRIES * 4,
+    ttl_seconds=TRANSCRIPT_CACHE_TTL_SECONDS,
+    max_bytes=TRANSCRIPT_CACHE_MAX_BYTES
+)
+
+def list_transcripts(video_id):
+    """Return the video's caption track list, from the cache or one watch-page request."""
+    transcript_list = transcript_lists.get(video_id)
+    if transcript_list is None:
+        with breakers['transcripts'].guard():
+            limiters['youtube'].acquire()
+            transcript_list = transcript_api().list(video_id)
+        transcript_lists.set(video_id, transcript_list)
+    return transcript_list
+
+def describe_track(transcript, source=None):
+    """Describe a caption track. IDs look like 'de', 'de.auto' or 'en>de' for translations."""
+    if source is not None:
+        source_id = describe_track(source)['id']
+        return {
+            'id': f"{source_id}>{transcript.language_code}",
+            'language_code': transcript.language_code,
+            'language': transcript.language,
+            'kind': 'translated',
+            'source_language_code': source.language_code
+        }
+    return {
+        'id': f"{transcript.language_code}.auto" if transcript.is_generated else transcript.language_code,
+        'language_code': transcript.language_code,
+        'language': transcript.language,
+        'kind': 'generated' if transcript.is_generated else 'manual'
+    }
+
+def select_track(transcript_list, languages):
+    """Pick the caption track that best matches a language preference.
+
+    In order: a track in the first preferred language that has one (manual
+    before auto-generated), a translation into the first preferred language
+    a track can be translated to, and finally the video's own first track,
+    so videos without captions in any preferred language still get one.
+    Returns (transcript, track description).
+    """
+    tracks = sorted(transcript_list, key=lambda transcript: transcript.is_generated)
+    if not tracks:
+        raise ValueError("No transcripts available")
+
+    for code in languages:
+        for transcript in tracks:
+            if transcript.language_code == code:
+                return transcript, describe_track(transcript)
+
+    for code in languages:
+        for source in tracks:
+            if source.is_translatable and any(
+                language.language_code == code for language in source.translation_languages
+            ):
+                translated = source.translate(code)
+                return translated, describe_track(translated, source)
+
+    return tracks[0], describe_track(tracks[0])
+
+def available_tracks(video_id):
+    """List the video's caption tracks and the languages they can be translated to."""
+    transcript_list = list_transcripts(video_id)
+    tracks = []
+    for transcript in sorted(transcript_list, key=lambda transcript: transcript.is_generated):
+        track = describe_track(transcript)
+        track['translatable'] = transcript.is_translatable
+        tracks.append(track)
+
+    translation_languages = {}
+    for transcript in transcript_list:
+        if transcript.is_translatable:
+            for language in transcript.translation_languages:
+                translation_languages.setdefault(language.language_code, language.language)
+    return tracks, translation_languages
+
+def get_transcript_track(url, languages=None):
+    """Get the segments of the best caption track for a language preference.
+
+    Returns (track description, segments). Both the track list and each
+    track's segments are cached, so asking for another language of a video
+    seen before only fetches the captions that are not cached yet.
+    """
     try:
         video_id = extract_video_id(url)
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
+        transcript, track = select_track(list_transcripts(video_id), parse_languages(languages))
 
-        # Combine all transcript pieces into one text
-        full_transcript = ' '.join([entry['text'] for entry in transcript_list])
-        return full_transcript
+        packed = transcript_segments.get((video_id, track['id']))
+        if packed is not None:
+            return track, unpack_segments(packed)
 
+        with breakers['transcripts'].guard():
+            limiters['youtube'].acquire()
+            entries = transcript.fetch().to_raw_data()
+        segments = [
+            {'text': entry['text'], 'start': entry['start'], 'duration': entry['duration']}
+            for entry in entries
+        ]
+        transcript_segments.set((video_id, track['id']), pack_segments(segments))
+        return track, segments
+
+    except (RateLimitExceeded, CircuitOpen):
+        raise
     except Exception as e:
         logger.error(f"Error getting transcript: {str(e)}")
-        raise Exception("Failed to get video transcript. Please make sure the video exists and has subtitles available.")
\ No newline at end of file
+        raise Exception("Failed to get video transcript. Please make sure the video exists and has subtitles available.")
+
+def get_video_segments(url, languages=None):
+    """Get the timestamped transcript segments of a YouTube video.
+
+    Each segment is a dict with 'text', 'start' and 'duration' keys. The
+    track is chosen by get_transcript_track from the language preference.
+    """
+    return get_transcript_track(url, languages)[1]
+
+def join_segments(segments):
+    """Combine transcript segments into one text."""
+    return ' '.join([segment['text'] for segment in segments])
+
+def get_video_transcript(url, languages=None):
+    """Get the transcript of a YouTube video."""
+    return join_segments(get_video_segments(url, languages))
+
+async def get_video_segments_async(url, languages=None):
+    """Get transcript segments without blocking the event loop.
+
+    youtube-transcript-api only speaks requests, so the fetch runs in a
+    worker thread.
+    """
+    return await asyncio.to_thread(get_video_segments, url, languages)
+
+async def get_video_transcript_async(url, languages=None):
+    """Async version of get_video_transcript."""
+    return join_segments(await get_video_segments_async(url, languages))